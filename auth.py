@@ -15,7 +15,7 @@ from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
-from database_setup import get_db_connection, USERS_TABLE
+from database_setup import acquire, USERS_TABLE
 
 # =====================================================================
 # Configuration
@@ -76,36 +76,30 @@ def decode_access_token(token: str) -> Optional[Dict[str, Any]]:
 
 def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
     """Get user by email from database."""
-    conn = get_db_connection()
-    if not conn:
-        return None
-    try:
+    with acquire() as conn:
+        if not conn:
+            return None
         row = conn.execute(
             f"SELECT id, email, password_hash, role, is_active, created_at FROM {USERS_TABLE} WHERE email = ?",
             (email,),
         ).fetchone()
-        if row:
-            return dict(row)
-        return None
-    finally:
-        conn.close()
+    if row:
+        return dict(row)
+    return None
 
 
 def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
     """Get user by ID from database."""
-    conn = get_db_connection()
-    if not conn:
-        return None
-    try:
+    with acquire() as conn:
+        if not conn:
+            return None
         row = conn.execute(
             f"SELECT id, email, password_hash, role, is_active, created_at FROM {USERS_TABLE} WHERE id = ?",
             (user_id,),
         ).fetchone()
-        if row:
-            return dict(row)
-        return None
-    finally:
-        conn.close()
+    if row:
+        return dict(row)
+    return None
 
 
 # =====================================================================
@@ -0,0 +1,76 @@
+# build_kernels.py
+
+"""
+================================================================================
+Ahead-of-time build of the SignalEngine kernels (numba.pycc)
+================================================================================
+- python build_kernels.py  → trading_kernels_aot.<abi>.so next to this file
+- trading_logic imports trading_kernels_aot when present, so the serial
+  batch kernel needs no JIT compilation at startup. (The live single-bar
+  gate runs as generated Python, see trading_logic_kernels.make_gate.)
+- Without the extension, trading_logic falls back to the @njit kernels
+  (and to plain Python/NumPy when numba is missing).
+- Exported signatures are fixed (float64 / int64 / int8 / bool). The module
+  also exports source_hash(); trading_logic ignores an extension whose hash
+  doesn't match the current trading_logic_kernels.py, so a stale build falls
+  back to JIT instead of running old kernel code.
+================================================================================
+"""
+
+import sys
+from pathlib import Path
+
+AOT_MODULE = "trading_kernels_aot"  # must differ from trading_logic_kernels
+
+_BATCH_SIG = (
+    "void("
+    "f8[:], f8[:], f8[:], f8[:], f8[:], f8[:], f8[:], "   # trend..price
+    "f8[:], i8[:], f8[:], f8[:], f8[:], "                 # vol_ratio..confirm_s
+    "f8[:], "                                             # params (pack_params)
+    "i1[:], f8[:], f8[:], f8[:], f8[:]"                   # outputs
+    ")"
+)
+
+
+def build(output_dir: Path) -> None:
+    from numba.pycc import CC
+
+    from trading_logic_kernels import _gate_decide_batch_serial, source_hash
+
+    cc = CC(AOT_MODULE)
+    cc.output_dir = str(output_dir)
+    built_from = source_hash()
+
+    @cc.export("source_hash", "i8()")
+    def aot_source_hash():
+        return built_from
+
+    @cc.export("gate_decide_batch", _BATCH_SIG)
+    def gate_decide_batch(
+        trend_raw, mom_raw, mr_raw, bo_raw, adx, atr, price,
+        vol_ratio, regime, regime_scale, behavior_bias, confirm_s, params,
+        actions, aggregate_s, stops, trend_out, mr_out,
+    ):
+        _gate_decide_batch_serial(
+            trend_raw, mom_raw, mr_raw, bo_raw, adx, atr, price,
+            vol_ratio, regime, regime_scale, behavior_bias, confirm_s, params,
+            actions, aggregate_s, stops, trend_out, mr_out,
+        )
+
+    cc.compile()
+
+
+def main() -> int:
+    try:
+        import numba  # noqa: F401
+    except ImportError:
+        print("numba is not installed; skipping AOT kernel build.")
+        return 0
+    out = Path(__file__).resolve().parent
+    build(out)
+    print(f"Built {AOT_MODULE} in {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -26,6 +26,17 @@ MAX_CANDLES_CONFIRM = int(os.getenv("MAX_CANDLES_CONFIRM", "600"))
 ALLOW_INTRACANDLE = _get_bool("ALLOW_INTRACANDLE", "true")
 LIVE_POLL_SECONDS = int(os.getenv("LIVE_POLL_SECONDS", "12"))
 
+# Behavior engine input: reuse the primary-TF candles already fetched from Wallex,
+# unless multi-provider enrichment via MarketDataGateway is explicitly required
+BEHAVIOR_REQUIRES_MULTIPROVIDER = _get_bool("BEHAVIOR_REQUIRES_MULTIPROVIDER", "false")
+BEHAVIOR_CANDLES = int(os.getenv("BEHAVIOR_CANDLES", "120"))
+# Let the behavior score move the primary aggregate (weight W_BEHAVIOR). Off by
+# default: the score is still computed and logged, but the bias stays 0 as before.
+BEHAVIOR_BIAS_ENABLED = _get_bool("BEHAVIOR_BIAS_ENABLED", "false")
+
+# Reuse one DecisionContext per TF across iterations (callers must not keep references)
+POOL_DECISION_CONTEXT = _get_bool("POOL_DECISION_CONTEXT", "false")
+
 STRATEGY = {
     "weights": {
         "trend": float(os.getenv("W_TREND", "0.30")),
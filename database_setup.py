@@ -4,6 +4,10 @@ from pathlib import Path
 from typing import Dict, Any, List, Optional
 import json
 import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
 
 
 db_logger = logging.getLogger(__name__)
@@ -41,6 +45,171 @@ def get_db_connection() -> Optional[sqlite3.Connection]:
         return None
 
 
+# =====================================================================
+# Writer connection (long-lived) + PRAGMA tuning
+# =====================================================================
+
+# PRAGMAهای per-connection؛ journal_mode=WAL روی خود فایل DB ماندگار است
+WRITER_PRAGMAS = (
+    "PRAGMA journal_mode=WAL;",
+    "PRAGMA synchronous=NORMAL;",
+    "PRAGMA temp_store=MEMORY;",
+    "PRAGMA mmap_size=268435456;",
+    "PRAGMA cache_size=-65536;",
+)
+
+# اتصال‌های pool فقط خواندنی/سبک‌اند (plan lookup و ...): بدون mmap و با cache
+# کوچک، تا SQLITE_POOL_SIZE اتصال چند صد MB حافظه نگیرند
+POOL_PRAGMAS = (
+    "PRAGMA journal_mode=WAL;",
+    "PRAGMA busy_timeout=5000;",
+    "PRAGMA cache_size=-2048;",
+)
+
+_writer_conn: Optional[sqlite3.Connection] = None
+_writer_lock = threading.RLock()
+
+
+def tune_pragmas(conn: Optional[sqlite3.Connection] = None, pragmas: tuple = WRITER_PRAGMAS) -> bool:
+    """
+    اعمال WAL + synchronous=NORMAL + cache/mmap روی اتصال نویسنده
+    (یا اتصال داده‌شده، با pragmas دلخواه). بعد از ensure_schema() صدا زده می‌شود.
+    """
+    target = conn if conn is not None else get_writer_connection()
+    if target is None:
+        return False
+    try:
+        for pragma in pragmas:
+            target.execute(pragma)
+        return True
+    except Exception as e:
+        db_logger.error(f"tune_pragmas error: {e}")
+        return False
+
+
+def get_writer_connection() -> Optional[sqlite3.Connection]:
+    """
+    اتصال نویسنده‌ی ماندگار (module-level) برای insertهای bot؛
+    به‌جای باز/بسته کردن اتصال در هر insert. دسترسی با _writer_lock سریال می‌شود.
+    """
+    global _writer_conn
+    with _writer_lock:
+        if _writer_conn is None:
+            conn = get_db_connection()
+            if conn is None:
+                return None
+            tune_pragmas(conn)
+            _writer_conn = conn
+        return _writer_conn
+
+
+def close_writer_connection() -> None:
+    global _writer_conn
+    with _writer_lock:
+        if _writer_conn is not None:
+            try:
+                _writer_conn.close()
+            except Exception:
+                pass
+            _writer_conn = None
+
+
+# =====================================================================
+# Connection pool (API / web handlers)
+# =====================================================================
+
+SQLITE_POOL_SIZE = max(1, int(os.getenv("SQLITE_POOL_SIZE", "8")))
+# prepared-statement LRU per pooled connection (sqlite3 default is 128)
+SQLITE_CACHED_STATEMENTS = 256
+# acquire() gives up (yields None) after this many seconds with the pool exhausted
+SQLITE_POOL_TIMEOUT = float(os.getenv("SQLITE_POOL_TIMEOUT", "10"))
+# while waiting, re-check this often whether a dropped connection freed a slot
+SQLITE_POOL_POLL = 0.5
+
+_pool: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=SQLITE_POOL_SIZE)
+_pool_created = 0
+_pool_lock = threading.Lock()
+
+
+def _open_pooled_connection() -> Optional[sqlite3.Connection]:
+    try:
+        conn = sqlite3.connect(
+            get_db_path(),
+            check_same_thread=False,
+            cached_statements=SQLITE_CACHED_STATEMENTS,
+        )
+        conn.row_factory = sqlite3.Row
+    except Exception as e:
+        db_logger.error(f"DB pool connection error: {e}")
+        return None
+    tune_pragmas(conn, POOL_PRAGMAS)
+    return conn
+
+
+def _take_pooled_connection() -> Optional[sqlite3.Connection]:
+    """
+    Idle pooled connection, else a new one while the pool is below
+    SQLITE_POOL_SIZE, else wait for one. The wait wakes every
+    SQLITE_POOL_POLL seconds to re-check for room (a broken connection frees
+    its slot without putting anything back) and ends with None after
+    SQLITE_POOL_TIMEOUT.
+    """
+    global _pool_created
+    deadline = time.monotonic() + SQLITE_POOL_TIMEOUT
+    while True:
+        try:
+            return _pool.get_nowait()
+        except queue.Empty:
+            pass
+        with _pool_lock:
+            grow = _pool_created < SQLITE_POOL_SIZE
+            if grow:
+                _pool_created += 1
+        if grow:
+            conn = _open_pooled_connection()
+            if conn is None:
+                with _pool_lock:
+                    _pool_created -= 1
+            return conn
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            db_logger.error(f"DB pool exhausted: no connection within {SQLITE_POOL_TIMEOUT:.1f}s")
+            return None
+        try:
+            return _pool.get(timeout=min(SQLITE_POOL_POLL, remaining))
+        except queue.Empty:
+            continue
+
+
+@contextmanager
+def acquire():
+    """
+    اتصال از pool (ساخته‌شده یک‌بار با WAL/PRAGMAها) به‌جای باز/بسته کردن در هر درخواست.
+    Yields None if no connection could be opened or none became free within
+    SQLITE_POOL_TIMEOUT. Open transactions are rolled back before the
+    connection goes back to the pool.
+    """
+    global _pool_created
+    conn = _take_pooled_connection()
+
+    try:
+        yield conn
+    finally:
+        if conn is not None:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+                _pool.put_nowait(conn)
+            except Exception:
+                # broken connection: drop it and let the pool open a new one
+                with _pool_lock:
+                    _pool_created -= 1
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+
 # =====================================================================
 # جدول اصلی لاگ تحلیل
 # =====================================================================
@@ -96,6 +265,15 @@ REQUIRED_COLUMNS: Dict[str, str] = {
     "fingerprint": "TEXT",
 }
 
+# web_app reads "latest N rows WHERE <col> IS NOT NULL ORDER BY timestamp DESC";
+# partial indexes on timestamp let LIMIT stop after N entries instead of a
+# full scan + sort. (timestamp, price) also covers /api/btc_price.
+TRADING_LOGS_INDEXES: Dict[str, str] = {
+    "idx_tl_price_ts": f"{TABLE_NAME}(timestamp DESC, price) WHERE price IS NOT NULL",
+    "idx_tl_decision_ts": f"{TABLE_NAME}(timestamp DESC) WHERE decision IS NOT NULL",
+    "idx_tl_adx_atr_ts": f"{TABLE_NAME}(timestamp DESC) WHERE adx IS NOT NULL AND atr IS NOT NULL",
+}
+
 # =====================================================================
 # جدول ترید (OPEN/CLOSE)
 # =====================================================================
@@ -117,6 +295,12 @@ TRADE_EVENTS_COLS: Dict[str, str] = {
     "reason": "TEXT",
 }
 
+# WHERE event_type = ? [ORDER BY timestamp DESC]; pnl included so the
+# perf summary / daily PnL aggregates are index-only
+TRADE_EVENTS_INDEXES: Dict[str, str] = {
+    "idx_te_type_ts": f"{TRADE_EVENTS_TABLE}(event_type, timestamp DESC, pnl)",
+}
+
 # =====================================================================
 # جدول وضعیت حساب
 # =====================================================================
@@ -160,6 +344,16 @@ USER_PLANS_COLS: Dict[str, str] = {
     "ends_at": "TEXT",
     "is_active": "INTEGER NOT NULL DEFAULT 1",
     "created_at": "TEXT NOT NULL DEFAULT (datetime('now'))",
+    "ends_at_epoch": "INTEGER",  # ends_at به ثانیه‌ی epoch برای چک سریع انقضا
+}
+
+# get_user_plan: WHERE user_id=? AND is_active=1 ORDER BY created_at DESC LIMIT 1
+# → index-only seek (covers every selected column; id is the rowid)
+USER_PLANS_INDEXES: Dict[str, str] = {
+    "idx_user_plans_lookup": (
+        f"{USER_PLANS_TABLE}(user_id, is_active, created_at DESC, "
+        "plan, starts_at, ends_at, ends_at_epoch)"
+    ),
 }
 
 INSIGHTS_POSTS_TABLE = "insights_posts"
@@ -191,6 +385,24 @@ def _create_table(conn: sqlite3.Connection, table: str, cols: Dict[str, str]) ->
     conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({cols_sql});")
 
 
+def _ensure_indexes(conn: sqlite3.Connection, table: str, indexes: Dict[str, str]) -> None:
+    existing = {
+        r["name"]
+        for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?", (table,)
+        ).fetchall()
+    }
+    created = False
+    for name, spec in indexes.items():
+        if name not in existing:
+            db_logger.warning(f"[MIGRATE] Creating index: {name}")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {spec};")
+            created = True
+    if created:
+        # refresh planner stats so the new index is picked up right away
+        conn.execute(f"ANALYZE {table};")
+
+
 def _migrate_table(conn: sqlite3.Connection, table: str, cols: Dict[str, str]) -> None:
     existing = _existing_columns(conn, table)
     for col, ctype in cols.items():
@@ -211,6 +423,7 @@ def ensure_schema() -> bool:
       - account_state
     بدون حذف هیچ دیتایی (فقط ADD COLUMN در صورت لزوم)
     """
+    global _trading_log_insert
     conn = get_db_connection()
     if not conn:
         return False
@@ -219,10 +432,12 @@ def ensure_schema() -> bool:
         # trading_logs
         _create_table(conn, TABLE_NAME, REQUIRED_COLUMNS)
         _migrate_table(conn, TABLE_NAME, REQUIRED_COLUMNS)
+        _ensure_indexes(conn, TABLE_NAME, TRADING_LOGS_INDEXES)
 
         # trade_events
         _create_table(conn, TRADE_EVENTS_TABLE, TRADE_EVENTS_COLS)
         _migrate_table(conn, TRADE_EVENTS_TABLE, TRADE_EVENTS_COLS)
+        _ensure_indexes(conn, TRADE_EVENTS_TABLE, TRADE_EVENTS_INDEXES)
 
         # account_state
         _create_table(conn, ACCOUNT_STATE_TABLE, ACCOUNT_STATE_COLS)
@@ -234,11 +449,19 @@ def ensure_schema() -> bool:
 
         _create_table(conn, USER_PLANS_TABLE, USER_PLANS_COLS)
         _migrate_table(conn, USER_PLANS_TABLE, USER_PLANS_COLS)
+        # backfill ends_at_epoch for rows written before the column existed
+        conn.execute(
+            f"UPDATE {USER_PLANS_TABLE} "
+            "SET ends_at_epoch = CAST(strftime('%s', ends_at) AS INTEGER) "
+            "WHERE ends_at IS NOT NULL AND ends_at_epoch IS NULL"
+        )
+        _ensure_indexes(conn, USER_PLANS_TABLE, USER_PLANS_INDEXES)
 
         _create_table(conn, INSIGHTS_POSTS_TABLE, INSIGHTS_POSTS_COLS)
         _migrate_table(conn, INSIGHTS_POSTS_TABLE, INSIGHTS_POSTS_COLS)
 
         conn.commit()
+        _trading_log_insert = None  # columns may have changed
         return True
 
     except Exception as e:
@@ -253,90 +476,148 @@ def ensure_schema() -> bool:
 # Insert Operations
 # =====================================================================
 
+def _insert_sql(table: str, cols) -> str:
+    return f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join(':' + c for c in cols)})"
+
+
+# ستون‌ها و SQL ثابت‌اند → یک بار در import ساخته می‌شوند، نه در هر insert
+_TRADE_EVENT_INSERT_COLS = tuple(c for c in TRADE_EVENTS_COLS if c != "id")
+_TRADE_EVENT_INSERT_SQL = _insert_sql(TRADE_EVENTS_TABLE, _TRADE_EVENT_INSERT_COLS)
+
+_ACCOUNT_STATE_INSERT_COLS = tuple(c for c in ACCOUNT_STATE_COLS if c != "id")
+_ACCOUNT_STATE_INSERT_SQL = _insert_sql(ACCOUNT_STATE_TABLE, _ACCOUNT_STATE_INSERT_COLS)
+
+# trading_logs: ستون‌های واقعی جدول (ممکن است از REQUIRED_COLUMNS بیشتر باشد)؛
+# بعد از اولین PRAGMA table_info کش می‌شود و ensure_schema آن را باطل می‌کند
+_trading_log_insert = None  # type: Optional[tuple]
+
+
+def _trading_log_insert_spec(conn: sqlite3.Connection):
+    global _trading_log_insert
+    if _trading_log_insert is None:
+        cols = tuple(_existing_columns(conn, TABLE_NAME))
+        _trading_log_insert = (cols, _insert_sql(TABLE_NAME, cols))
+    return _trading_log_insert
+
+
 def insert_trade_event(event: Dict[str, Any]) -> bool:
     """
     درج یک رکورد در trade_events (OPEN / CLOSE / ...)
     """
-    conn = get_db_connection()
+    conn = get_writer_connection()
     if not conn:
         return False
     try:
-        cols = [c for c in TRADE_EVENTS_COLS if c != "id"]
-        data = {c: event.get(c) for c in cols}
-
-        sql = f"""
-            INSERT INTO {TRADE_EVENTS_TABLE}
-            ({", ".join(cols)})
-            VALUES ({", ".join(":"+c for c in cols)})
-        """
-
-        conn.execute(sql, data)
-        conn.commit()
+        data = {c: event.get(c) for c in _TRADE_EVENT_INSERT_COLS}
+        # commit on success, rollback on error (no open transaction left on the writer)
+        with _writer_lock, conn:
+            conn.execute(_TRADE_EVENT_INSERT_SQL, data)
         return True
 
     except Exception as e:
         db_logger.error(f"insert_trade_event error: {e}")
         return False
 
-    finally:
-        conn.close()
-
 
 def upsert_account_state(state: Dict[str, Any]) -> bool:
     """
     فعلاً به صورت append عمل می‌کند؛ آخرین رکورد وضعیت فعلی حساب است.
     """
-    conn = get_db_connection()
+    conn = get_writer_connection()
     if not conn:
         return False
 
     try:
-        cols = [c for c in ACCOUNT_STATE_COLS if c != "id"]
-        sql = f"""
-            INSERT INTO {ACCOUNT_STATE_TABLE}
-            ({", ".join(cols)})
-            VALUES ({", ".join(":"+c for c in cols)})
-        """
-        conn.execute(sql, {c: state.get(c) for c in cols})
-        conn.commit()
+        with _writer_lock, conn:
+            conn.execute(
+                _ACCOUNT_STATE_INSERT_SQL,
+                {c: state.get(c) for c in _ACCOUNT_STATE_INSERT_COLS},
+            )
         return True
 
     except Exception as e:
         db_logger.error(f"upsert_account_state error: {e}")
         return False
 
-    finally:
-        conn.close()
+
+def record_trade(event: Dict[str, Any], state: Dict[str, Any]) -> bool:
+    """
+    درج رویداد معامله + snapshot حساب در یک تراکنش (یک commit به‌جای دو).
+    """
+    conn = get_writer_connection()
+    if not conn:
+        return False
+
+    try:
+        with _writer_lock, conn:
+            conn.execute(
+                _TRADE_EVENT_INSERT_SQL,
+                {c: event.get(c) for c in _TRADE_EVENT_INSERT_COLS},
+            )
+            conn.execute(
+                _ACCOUNT_STATE_INSERT_SQL,
+                {c: state.get(c) for c in _ACCOUNT_STATE_INSERT_COLS},
+            )
+        return True
+
+    except Exception as e:
+        db_logger.error(f"record_trade error: {e}")
+        return False
 
 
 def insert_trading_log(row: Dict[str, Any]) -> bool:
     """
     درج یک سطر از لاگ تحلیل (DecisionContext → Row)
     """
-    conn = get_db_connection()
+    conn = get_writer_connection()
     if not conn:
         return False
 
     try:
-        existing = _existing_columns(conn, TABLE_NAME)
-        filtered = {k: row.get(k) for k in existing}
+        with _writer_lock, conn:
+            existing, sql = _trading_log_insert_spec(conn)
+            filtered = {k: row.get(k) for k in existing}
 
-        if isinstance(filtered.get("reasons_json"), list):
-            filtered["reasons_json"] = json.dumps(filtered["reasons_json"], ensure_ascii=False)
+            if isinstance(filtered.get("reasons_json"), list):
+                filtered["reasons_json"] = json.dumps(filtered["reasons_json"], ensure_ascii=False)
 
-        cols = ", ".join(filtered.keys())
-        vals = ", ".join(":"+k for k in filtered.keys())
-
-        conn.execute(f"INSERT INTO {TABLE_NAME} ({cols}) VALUES ({vals})", filtered)
-        conn.commit()
+            conn.execute(sql, filtered)
         return True
 
     except Exception as e:
         db_logger.error(f"insert_trading_log error: {e}")
         return False
 
-    finally:
-        conn.close()
+
+def insert_trading_logs_many(rows: List[Dict[str, Any]]) -> bool:
+    """
+    درج دسته‌ای سطرهای لاگ تحلیل در یک تراکنش (executemany)
+    → یک commit/fsync برای کل batch به‌جای یکی برای هر سطر
+    """
+    if not rows:
+        return True
+
+    conn = get_writer_connection()
+    if not conn:
+        return False
+
+    try:
+        with _writer_lock, conn:
+            existing, sql = _trading_log_insert_spec(conn)
+
+            params = []
+            for row in rows:
+                filtered = {k: row.get(k) for k in existing}
+                if isinstance(filtered.get("reasons_json"), list):
+                    filtered["reasons_json"] = json.dumps(filtered["reasons_json"], ensure_ascii=False)
+                params.append(filtered)
+
+            conn.executemany(sql, params)
+        return True
+
+    except Exception as e:
+        db_logger.error(f"insert_trading_logs_many error: {e}")
+        return False
 
 
 # =====================================================================
@@ -396,7 +677,7 @@ def dc_to_row(
 
         "decision": decision,
         "regime": getattr(dc_primary, "regime", None),
-        "reasons_json": getattr(dc_primary, "reasons", None),
+        "reasons_json": getattr(dc_primary, "reasons", None) or [],
         "regime_reasons": regime_reasons,
 
         "stop_price": getattr(getattr(dc_primary, "planned_position", None), "stop_price", None),
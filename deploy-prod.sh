@@ -7,6 +7,8 @@ source venv/bin/activate
 pip install -r requirements.txt
 # آپدیت دیتابیس (SaaS Tables)
 python3 -c "import database_setup; database_setup.ensure_schema()"
+# AOT build of the trading kernels (no-op when numba is not installed)
+python3 build_kernels.py
 # ری‌استارت سرویس‌های پروداکشن
 systemctl restart smarttrader-api.service
 systemctl restart smarttrader-bot.service
@@ -6,6 +6,8 @@ git reset --hard origin/staging
 source venv/bin/activate
 pip install -r requirements.txt
 python3 -c "import database_setup; database_setup.ensure_schema()"
+# AOT build of the trading kernels (no-op when numba is not installed)
+python3 build_kernels.py
 # ری‌استارت سرویس‌های استیجینگ
 systemctl restart smarttrader-api-stg.service
 systemctl restart smarttrader-bot-stg.service
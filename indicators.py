@@ -17,6 +17,8 @@ import numpy as np
 import pandas as pd
 from dataclasses import dataclass, field
 
+from numba_compat import njit
+
 _EPS = 1e-12
 
 
@@ -156,6 +158,511 @@ def donchian_channels(df: pd.DataFrame, period: int = 20) -> Tuple[pd.Series, pd
     return upper, lower
 
 
+# =====================================================================
+# Fused per-timeframe kernel (hot path of main.analyze_once)
+# =====================================================================
+
+@njit(cache=True, nogil=True)
+def _sanitize_njit(x: np.ndarray) -> np.ndarray:
+    """
+    Same contract as _safe_series: inf -> NaN, ffill, bfill, all-NaN -> 0.0.
+    """
+    n = x.shape[0]
+    out = np.empty(n, dtype=np.float64)
+    last = np.nan
+    first = np.nan
+    for i in range(n):
+        v = x[i]
+        if np.isfinite(v):
+            last = v
+            if not np.isfinite(first):
+                first = v
+        out[i] = last
+    if not np.isfinite(first):
+        first = 0.0
+    for i in range(n):
+        if np.isfinite(out[i]):
+            break
+        out[i] = first
+    return out
+
+
+@njit(cache=True, nogil=True)
+def _tf_features_njit(
+    high_raw: np.ndarray,
+    low_raw: np.ndarray,
+    close_raw: np.ndarray,
+    n_ema_fast: int = 20,
+    n_ema_slow: int = 50,
+    n_rsi: int = 14,
+    n_adx: int = 14,
+    n_atr: int = 14,
+    n_don: int = 20,
+    n_resid: int = 50,
+    n_resid_minp: int = 20,
+    n_vr_ma: int = 14,
+    n_vr_ema: int = 5,
+):
+    """
+    One pass over a timeframe's bars; returns
+    (trend, momentum, meanrev, breakout, vr, adx, atr, price).
+
+    Numerically mirrors calculate_ema / calculate_rsi / calculate_adx /
+    calculate_atr / smooth_vol_ratio / donchian_channels and the
+    residual rolling std used by main.analyze_once.
+    """
+    high = _sanitize_njit(high_raw)
+    low = _sanitize_njit(low_raw)
+    close = _sanitize_njit(close_raw)
+    n = close.shape[0]
+
+    a_fast = 2.0 / (n_ema_fast + 1.0)
+    a_slow = 2.0 / (n_ema_slow + 1.0)
+    a_rsi = 2.0 / (n_rsi + 1.0)
+    a_adx = 1.0 / n_adx
+    a_atr = 1.0 / n_atr
+    a_vr = 2.0 / (n_vr_ema + 1.0)
+    vr_minp = max(1, n_vr_ma // 2)
+
+    ema_f = close[0]
+    ema_s = close[0]
+
+    # residual (close - ema_slow) over the last n_resid bars: Welford running variance
+    w = min(n, n_resid)
+    r_start = n - w
+    r_cnt = 0
+    r_mean = 0.0
+    r_m2 = 0.0
+    if r_start == 0:
+        r_cnt = 1
+        r_mean = close[0] - ema_s
+
+    rsi_up = 0.0
+    rsi_dn = 0.0
+
+    tr0 = high[0] - low[0]
+    atr_adx = tr0          # ewm(alpha=1/n_adx) of TR (ADX internal)
+    atr = tr0              # ewm(alpha=1/n_atr) of TR
+    pdm_s = 0.0
+    mdm_s = 0.0
+    pdi = 100.0 * pdm_s / (atr_adx + _EPS)
+    mdi = 100.0 * mdm_s / (atr_adx + _EPS)
+    adx = 100.0 * abs(pdi - mdi) / (pdi + mdi + _EPS)
+
+    # vr = ewm(atr / rolling_mean(atr)), neutral 1.0 when undefined
+    atr_hist = np.empty(n, dtype=np.float64)
+    atr_hist[0] = max(atr, 0.0)
+    atr_sum = atr_hist[0]
+    vr_s = 1.0
+    if vr_minp <= 1 and abs(atr_sum) > _EPS:
+        vr_s = min(10.0, max(0.1, atr_hist[0] / atr_sum))
+
+    for i in range(1, n):
+        c = close[i]
+        h = high[i]
+        lo = low[i]
+        c_prev = close[i - 1]
+
+        ema_f = a_fast * c + (1.0 - a_fast) * ema_f
+        ema_s = a_slow * c + (1.0 - a_slow) * ema_s
+        if i >= r_start:
+            r = c - ema_s
+            r_cnt += 1
+            d = r - r_mean
+            r_mean += d / r_cnt
+            r_m2 += d * (r - r_mean)
+
+        delta = c - c_prev
+        up = delta if delta > 0.0 else 0.0
+        dn = -delta if delta < 0.0 else 0.0
+        if i == 1:
+            rsi_up = up
+            rsi_dn = dn
+        else:
+            rsi_up = a_rsi * up + (1.0 - a_rsi) * rsi_up
+            rsi_dn = a_rsi * dn + (1.0 - a_rsi) * rsi_dn
+
+        tr = max(h - lo, abs(h - c_prev), abs(lo - c_prev))
+        atr_adx = a_adx * tr + (1.0 - a_adx) * atr_adx
+        atr = a_atr * tr + (1.0 - a_atr) * atr
+
+        up_move = h - high[i - 1]
+        down_move = low[i - 1] - lo
+        pdm = up_move if up_move > 0.0 else 0.0
+        mdm = down_move if down_move > 0.0 else 0.0
+        if pdm < mdm:
+            pdm = 0.0
+        if mdm <= pdm:
+            mdm = 0.0
+        pdm_s = a_adx * pdm + (1.0 - a_adx) * pdm_s
+        mdm_s = a_adx * mdm + (1.0 - a_adx) * mdm_s
+        pdi = 100.0 * pdm_s / (atr_adx + _EPS)
+        mdi = 100.0 * mdm_s / (atr_adx + _EPS)
+        dx = 100.0 * abs(pdi - mdi) / (pdi + mdi + _EPS)
+        adx = a_adx * dx + (1.0 - a_adx) * adx
+
+        atr_c = atr if atr > 0.0 else 0.0
+        atr_hist[i] = atr_c
+        atr_sum += atr_c
+        if i >= n_vr_ma:
+            atr_sum -= atr_hist[i - n_vr_ma]
+        cnt = min(i + 1, n_vr_ma)
+        vr = 1.0
+        if cnt >= vr_minp:
+            atr_ma = atr_sum / cnt
+            if abs(atr_ma) > _EPS:
+                vr = min(10.0, max(0.1, atr_c / atr_ma))
+        vr_s = a_vr * vr + (1.0 - a_vr) * vr_s
+
+    atr_last = atr if atr > 0.0 else 0.0
+    adx_last = min(100.0, max(0.0, adx))
+    price = close_raw[n - 1]
+
+    # trend
+    trend = np.tanh((ema_f - ema_s) / (1e-9 + atr_last))
+
+    # momentum (RSI needs at least one diff)
+    momentum = 0.0
+    if n >= 2:
+        rs = rsi_up / (rsi_dn + _EPS)
+        rsi = min(100.0, max(0.0, 100.0 - (100.0 / (1.0 + rs))))
+        momentum = (rsi - 50.0) / 50.0
+
+    # meanrev: residual std over the last n_resid bars (ddof=1)
+    resid_std = 1.0
+    if w >= max(2, n_resid_minp):
+        resid_std = np.sqrt(r_m2 / (w - 1))
+        if resid_std == 0.0:
+            resid_std = 1.0
+    meanrev = -np.tanh((close[n - 1] - ema_s) / (1e-9 + resid_std))
+
+    # breakout: Donchian over the last n_don bars
+    breakout = 0.0
+    wd = min(n, n_don)
+    if wd >= max(1, n_don // 2):
+        up_ch = high[n - wd]
+        lo_ch = low[n - wd]
+        for i in range(n - wd + 1, n):
+            if high[i] > up_ch:
+                up_ch = high[i]
+            if low[i] < lo_ch:
+                lo_ch = low[i]
+        rng = up_ch - lo_ch
+        if rng == 0.0:
+            rng = 1.0
+        breakout = (price - (up_ch + lo_ch) / 2.0) / (rng + 1e-9)
+        breakout = min(1.0, max(-1.0, breakout))
+
+    return trend, momentum, meanrev, breakout, vr_s, adx_last, atr_last, price
+
+
+def tf_features(high, low, close) -> Tuple[float, float, float, float, float, float, float, float]:
+    """
+    Compute all channel inputs for one timeframe in a single compiled pass.
+    Returns (trend, momentum, meanrev, breakout, vr, adx, atr, price) as floats.
+    """
+    h = np.ascontiguousarray(high, dtype=np.float64)
+    lo = np.ascontiguousarray(low, dtype=np.float64)
+    c = np.ascontiguousarray(close, dtype=np.float64)
+    if c.shape[0] == 0:
+        raise ValueError("tf_features requires at least one bar")
+    out = _tf_features_njit(h, lo, c)
+    return tuple(float(v) for v in out)  # type: ignore[return-value]
+
+
+# =====================================================================
+# Incremental per-timeframe state (O(1) work per new bar)
+# =====================================================================
+
+# Window lengths baked into the incremental state (same defaults as tf_features)
+_INC_N_EMA_FAST = 20
+_INC_N_EMA_SLOW = 50
+_INC_N_RSI = 14
+_INC_N_ADX = 14
+_INC_N_ATR = 14
+_INC_N_DON = 20
+_INC_N_RESID = 50
+_INC_N_RESID_MINP = 20
+_INC_N_VR_MA = 14
+_INC_N_VR_EMA = 5
+
+# Layout of the scalar state vector
+_S_COUNT, _S_EMA_F, _S_EMA_S, _S_RSI_UP, _S_RSI_DN = 0, 1, 2, 3, 4
+_S_ATR_ADX, _S_ATR, _S_PDM, _S_MDM, _S_ADX = 5, 6, 7, 8, 9
+_S_ATR_SUM, _S_VR, _S_R_MEAN, _S_R_M2 = 10, 11, 12, 13
+_S_PREV_H, _S_PREV_L, _S_PREV_C = 14, 15, 16
+_S_SIZE = 17
+
+
+@njit(cache=True, nogil=True)
+def _inc_step_njit(S, atr_win, res_win, hi_win, lo_win, h, lo, c):
+    """
+    Advance the state by one bar (in place). Same recurrences as one
+    iteration of _tf_features_njit; non-finite inputs are forward-filled.
+    """
+    i = int(S[_S_COUNT])
+    if i > 0:
+        if not np.isfinite(h):
+            h = S[_S_PREV_H]
+        if not np.isfinite(lo):
+            lo = S[_S_PREV_L]
+        if not np.isfinite(c):
+            c = S[_S_PREV_C]
+    else:
+        if not np.isfinite(h):
+            h = 0.0
+        if not np.isfinite(lo):
+            lo = 0.0
+        if not np.isfinite(c):
+            c = 0.0
+
+    a_fast = 2.0 / (_INC_N_EMA_FAST + 1.0)
+    a_slow = 2.0 / (_INC_N_EMA_SLOW + 1.0)
+    a_rsi = 2.0 / (_INC_N_RSI + 1.0)
+    a_adx = 1.0 / _INC_N_ADX
+    a_atr = 1.0 / _INC_N_ATR
+    a_vr = 2.0 / (_INC_N_VR_EMA + 1.0)
+    m = _INC_N_VR_MA
+    vr_minp = max(1, m // 2)
+    w = _INC_N_RESID
+
+    if i == 0:
+        ema_s = c
+        S[_S_EMA_F] = c
+        S[_S_EMA_S] = c
+        S[_S_RSI_UP] = 0.0
+        S[_S_RSI_DN] = 0.0
+        tr0 = h - lo
+        S[_S_ATR_ADX] = tr0
+        S[_S_ATR] = tr0
+        S[_S_PDM] = 0.0
+        S[_S_MDM] = 0.0
+        S[_S_ADX] = 0.0  # +DI = -DI = 0 on the first bar
+        atr_c = max(tr0, 0.0)
+        atr_win[0] = atr_c
+        S[_S_ATR_SUM] = atr_c
+        S[_S_VR] = 1.0  # rolling ATR mean needs vr_minp (> 1) bars
+    else:
+        c_prev = S[_S_PREV_C]
+        S[_S_EMA_F] = a_fast * c + (1.0 - a_fast) * S[_S_EMA_F]
+        ema_s = a_slow * c + (1.0 - a_slow) * S[_S_EMA_S]
+        S[_S_EMA_S] = ema_s
+
+        delta = c - c_prev
+        up = delta if delta > 0.0 else 0.0
+        dn = -delta if delta < 0.0 else 0.0
+        if i == 1:
+            S[_S_RSI_UP] = up
+            S[_S_RSI_DN] = dn
+        else:
+            S[_S_RSI_UP] = a_rsi * up + (1.0 - a_rsi) * S[_S_RSI_UP]
+            S[_S_RSI_DN] = a_rsi * dn + (1.0 - a_rsi) * S[_S_RSI_DN]
+
+        tr = max(h - lo, abs(h - c_prev), abs(lo - c_prev))
+        atr_adx = a_adx * tr + (1.0 - a_adx) * S[_S_ATR_ADX]
+        atr = a_atr * tr + (1.0 - a_atr) * S[_S_ATR]
+        S[_S_ATR_ADX] = atr_adx
+        S[_S_ATR] = atr
+
+        up_move = h - S[_S_PREV_H]
+        down_move = S[_S_PREV_L] - lo
+        pdm = up_move if up_move > 0.0 else 0.0
+        mdm = down_move if down_move > 0.0 else 0.0
+        if pdm < mdm:
+            pdm = 0.0
+        if mdm <= pdm:
+            mdm = 0.0
+        pdm_s = a_adx * pdm + (1.0 - a_adx) * S[_S_PDM]
+        mdm_s = a_adx * mdm + (1.0 - a_adx) * S[_S_MDM]
+        S[_S_PDM] = pdm_s
+        S[_S_MDM] = mdm_s
+        pdi = 100.0 * pdm_s / (atr_adx + _EPS)
+        mdi = 100.0 * mdm_s / (atr_adx + _EPS)
+        dx = 100.0 * abs(pdi - mdi) / (pdi + mdi + _EPS)
+        S[_S_ADX] = a_adx * dx + (1.0 - a_adx) * S[_S_ADX]
+
+        atr_c = atr if atr > 0.0 else 0.0
+        old = atr_win[i % m]
+        atr_win[i % m] = atr_c
+        atr_sum = S[_S_ATR_SUM] + atr_c
+        if i >= m:
+            atr_sum -= old
+        S[_S_ATR_SUM] = atr_sum
+        cnt = min(i + 1, m)
+        vr = 1.0
+        if cnt >= vr_minp:
+            atr_ma = atr_sum / cnt
+            if abs(atr_ma) > _EPS:
+                vr = min(10.0, max(0.1, atr_c / atr_ma))
+        S[_S_VR] = a_vr * vr + (1.0 - a_vr) * S[_S_VR]
+
+    # residual window: Welford add while filling, add/remove once full
+    r = c - ema_s
+    k = i % w
+    if i < w:
+        d = r - S[_S_R_MEAN]
+        S[_S_R_MEAN] += d / (i + 1)
+        S[_S_R_M2] += d * (r - S[_S_R_MEAN])
+    else:
+        r_old = res_win[k]
+        mean_old = S[_S_R_MEAN]
+        mean_new = mean_old + (r - r_old) / w
+        S[_S_R_M2] += (r - r_old) * (r - mean_new + r_old - mean_old)
+        S[_S_R_MEAN] = mean_new
+    res_win[k] = r
+
+    hi_win[i % _INC_N_DON] = h
+    lo_win[i % _INC_N_DON] = lo
+
+    S[_S_PREV_H] = h
+    S[_S_PREV_L] = lo
+    S[_S_PREV_C] = c
+    S[_S_COUNT] = i + 1
+
+
+@njit(cache=True, nogil=True)
+def _inc_seed_njit(S, atr_win, res_win, hi_win, lo_win, high, low, close):
+    for i in range(close.shape[0]):
+        _inc_step_njit(S, atr_win, res_win, hi_win, lo_win, high[i], low[i], close[i])
+
+
+@njit(cache=True, nogil=True)
+def _inc_finish_njit(S, res_win, hi_win, lo_win, price):
+    """Channel values from the state (mirrors the tail of _tf_features_njit)."""
+    n = int(S[_S_COUNT])
+    ema_s = S[_S_EMA_S]
+    atr = S[_S_ATR]
+    atr_last = atr if atr > 0.0 else 0.0
+    adx_last = min(100.0, max(0.0, S[_S_ADX]))
+
+    trend = np.tanh((S[_S_EMA_F] - ema_s) / (1e-9 + atr_last))
+
+    momentum = 0.0
+    if n >= 2:
+        rs = S[_S_RSI_UP] / (S[_S_RSI_DN] + _EPS)
+        rsi = min(100.0, max(0.0, 100.0 - (100.0 / (1.0 + rs))))
+        momentum = (rsi - 50.0) / 50.0
+
+    w = min(n, _INC_N_RESID)
+    resid_std = 1.0
+    if w >= max(2, _INC_N_RESID_MINP):
+        m2 = S[_S_R_M2]
+        resid_std = np.sqrt(m2 / (w - 1)) if m2 > 0.0 else 0.0
+        if resid_std == 0.0:
+            resid_std = 1.0
+    meanrev = -np.tanh((S[_S_PREV_C] - ema_s) / (1e-9 + resid_std))
+
+    breakout = 0.0
+    wd = min(n, _INC_N_DON)
+    if wd >= max(1, _INC_N_DON // 2):
+        up_ch = hi_win[0]
+        lo_ch = lo_win[0]
+        for j in range(1, wd):
+            if hi_win[j] > up_ch:
+                up_ch = hi_win[j]
+            if lo_win[j] < lo_ch:
+                lo_ch = lo_win[j]
+        rng = up_ch - lo_ch
+        if rng == 0.0:
+            rng = 1.0
+        breakout = (price - (up_ch + lo_ch) / 2.0) / (rng + 1e-9)
+        breakout = min(1.0, max(-1.0, breakout))
+
+    return trend, momentum, meanrev, breakout, S[_S_VR], adx_last, atr_last, price
+
+
+class IncrementalIndicators:
+    """
+    Persistent tf_features() state for one timeframe.
+
+    The state covers closed bars only and is keyed by the timestamp of the
+    last closed bar. Each call commits the bars that closed since the
+    previous call (normally one, O(1) each) and then applies the forming
+    bar transiently, so intracandle ticks never mutate the state.
+    A gap, a rewind or a first call re-seeds from the full window.
+    """
+
+    __slots__ = ("tf", "state", "atr_win", "res_win", "hi_win", "lo_win", "last_ts")
+
+    def __init__(self, tf: str):
+        self.tf = tf
+        self.reset()
+
+    def reset(self) -> None:
+        self.state = np.zeros(_S_SIZE, dtype=np.float64)
+        self.atr_win = np.zeros(_INC_N_VR_MA, dtype=np.float64)
+        self.res_win = np.zeros(_INC_N_RESID, dtype=np.float64)
+        self.hi_win = np.zeros(_INC_N_DON, dtype=np.float64)
+        self.lo_win = np.zeros(_INC_N_DON, dtype=np.float64)
+        self.last_ts = None
+
+    def _buffers(self):
+        return self.state, self.atr_win, self.res_win, self.hi_win, self.lo_win
+
+    def update(self, h: float, lo: float, c: float, ts: int, commit: bool = True):
+        """
+        Apply one bar. commit=True advances the stored state (closed bar);
+        commit=False works on a copy and leaves the state untouched (live bar).
+        Returns the tf_features() tuple after the bar.
+        """
+        bufs = self._buffers() if commit else tuple(b.copy() for b in self._buffers())
+        _inc_step_njit(*bufs, float(h), float(lo), float(c))
+        if commit:
+            self.last_ts = int(ts)
+        S, _atr_win, res_win, hi_win, lo_win = bufs
+        out = _inc_finish_njit(S, res_win, hi_win, lo_win, float(c))
+        return tuple(float(v) for v in out)
+
+    def features(self, high, low, close, times) -> Tuple[float, float, float, float, float, float, float, float]:
+        """
+        Drop-in for tf_features() on a chronological window whose last bar is
+        the forming one. Returns (trend, momentum, meanrev, breakout, vr, adx, atr, price).
+        """
+        t = np.asarray(times)
+        n = t.shape[0]
+        if n == 0:
+            raise ValueError("IncrementalIndicators.features requires at least one bar")
+
+        start = -1
+        if self.last_ts is not None and n >= 2:
+            pos = int(np.searchsorted(t, self.last_ts))
+            if pos < n - 1 and int(t[pos]) == self.last_ts:
+                start = pos + 1
+
+        if start < 0:
+            self.reset()
+            if n >= 2:
+                _inc_seed_njit(
+                    *self._buffers(),
+                    _sanitize_njit(np.ascontiguousarray(high[:-1], dtype=np.float64)),
+                    _sanitize_njit(np.ascontiguousarray(low[:-1], dtype=np.float64)),
+                    _sanitize_njit(np.ascontiguousarray(close[:-1], dtype=np.float64)),
+                )
+                self.last_ts = int(t[n - 2])
+        else:
+            for i in range(start, n - 1):
+                _inc_step_njit(*self._buffers(), float(high[i]), float(low[i]), float(close[i]))
+                self.last_ts = int(t[i])
+
+        return self.update(high[n - 1], low[n - 1], close[n - 1], int(t[n - 1]), commit=False)
+
+
+def warmup_kernels(n: int = 64) -> None:
+    """
+    Run every compiled kernel once on a synthetic window with the live
+    argument types, so the JIT compile / on-disk cache load happens at
+    startup instead of inside the first analysis tick.
+    """
+    c = 100.0 + np.cumsum(np.sin(np.arange(n, dtype=np.float64)))
+    h = c + 1.0
+    lo = c - 1.0
+    t = np.arange(n, dtype=np.int64) * 60
+    tf_features(h, lo, c)
+    inc = IncrementalIndicators("warmup")
+    inc.features(h[:-1], lo[:-1], c[:-1], t[:-1])  # seed path
+    inc.features(h, lo, c, t)  # step path
+
+
 @dataclass
 class IndicatorCache:
     """
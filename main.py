@@ -28,25 +28,27 @@ NOTE (compat):
 """
 
 import time
+import atexit
+import signal
 import json
 import logging
 from typing import Optional, Tuple, Any
 from datetime import datetime, timezone
-import uuid
-from collections import deque
+import os
+import itertools
+import hashlib
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
-import pandas as pd
 
 import config as cfg
 import database_setup
-from wallex_client import WallexClient
-from indicators import (
-    calculate_ema, calculate_rsi, calculate_adx, calculate_atr,
-    donchian_channels, IndicatorCache, smooth_vol_ratio,
-)
+from wallex_client import WallexClient, soa_to_candles
+from indicators import IndicatorCache, IncrementalIndicators, warmup_kernels
+from numba_compat import NUMBA_AVAILABLE
 from trading_logic import (
-    SignalEngine, StrategyParams, DecisionContext,
+    SignalEngine, StrategyParams, DecisionContext, DecisionContextPool,
     Account, Position, position_size_by_risk,
 )
 from telegram_client import TelegramClient
@@ -136,8 +138,13 @@ def now_iso() -> str:
     # ISO بدون microsecond و با Z – سازگار با JS و UI
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
 
+# pid + process start time make the prefix unique across restarts; counter within the process
+_TRADE_ID_PREFIX = f"{os.getpid() & 0xFFFFFFFF:08x}{int(time.time()) & 0xFFFFFFFF:08x}"
+_trade_counter = itertools.count(1)
+
+
 def new_trade_id() -> str:
-    return uuid.uuid4().hex
+    return f"{_TRADE_ID_PREFIX}{next(_trade_counter):08x}"
 
 def compute_regime(trend_val: float, adx_val: float, vol_ratio: float) -> Tuple[str, list]:
     """
@@ -163,22 +170,197 @@ def compute_regime(trend_val: float, adx_val: float, vol_ratio: float) -> Tuple[
     return regime, reasons
 
 def make_fingerprint(dc_240: DecisionContext, dc_60: Optional[DecisionContext], price: float) -> str:
-    parts = [
-        round(float(getattr(dc_240, "aggregate_s", 0.0)), 3),
-        round(float(getattr(dc_240, "trend", 0.0)), 3),
-        round(float(getattr(dc_240, "momentum", 0.0)), 3),
-        round(float(getattr(dc_240, "meanrev", 0.0)), 3),
-        round(float(getattr(dc_240, "breakout", 0.0)), 3),
-        round(float(price), -4) if price else 0,
-    ]
-    if dc_60:
-        parts.append(round(float(getattr(dc_60, "aggregate_s", 0.0)), 3))
-    return "|".join(map(str, parts))
+    """
+    Dedupe key for DB/log output: post-gate channels rounded to 3 decimals,
+    price rounded to 1e4, hashed to a short blake2b hex digest.
+    """
+    arr = np.array(
+        [
+            dc_240.aggregate_s,
+            dc_240.trend,
+            dc_240.momentum,
+            dc_240.meanrev,
+            dc_240.breakout,
+            dc_60.aggregate_s if dc_60 else np.nan,
+            price or 0.0,
+        ],
+        dtype=np.float64,
+    )
+    arr[:6] = np.round(arr[:6], 3)
+    arr[6] = np.round(arr[6], -4)
+    arr += 0.0  # fold -0.0 into 0.0
+    return hashlib.blake2b(arr.tobytes(), digest_size=8).hexdigest()
+
+# --------------------------------------------------------
+# Candle ring buffers (per-TF hot path)
+# --------------------------------------------------------
+_CANDLE_KEYS = ("time", "open", "high", "low", "close", "volume")
+_CANDLE_KEYS_SHORT = ("t", "o", "h", "l", "c", "v")
+
+
+class CandleRing:
+    """
+    Fixed-capacity OHLCV ring backed by preallocated C-contiguous float64 arrays.
+
+    - push(rows) only writes bars that are new since the previous call
+      (the last, still-forming bar is overwritten in place); push_soa() is
+      the same for column arrays (WallexClient.get_candles_soa).
+    - last(n) returns the newest n bars in chronological order; when the
+      window does not wrap these are zero-copy views into the buffers.
+    """
+
+    __slots__ = ("o", "h", "l", "c", "v", "t", "n", "cap", "head")
+
+    def __init__(self, capacity: int):
+        cap = max(1, int(capacity))
+        self.cap = cap
+        self.o = np.empty(cap, dtype=np.float64)
+        self.h = np.empty(cap, dtype=np.float64)
+        self.l = np.empty(cap, dtype=np.float64)
+        self.c = np.empty(cap, dtype=np.float64)
+        self.v = np.empty(cap, dtype=np.float64)
+        self.t = np.empty(cap, dtype=np.int64)
+        self.n = 0
+        self.head = 0  # next write index
+
+    def clear(self) -> None:
+        self.n = 0
+        self.head = 0
+
+    def last_index(self) -> int:
+        return (self.head - 1) % self.cap
+
+    def push(self, rows: list) -> int:
+        """Ingest a candle window (oldest → newest). Returns number of bars written."""
+        if not rows:
+            return 0
+        kt, ko, kh, kl, kc, kv = _CANDLE_KEYS if "close" in rows[0] else _CANDLE_KEYS_SHORT
+
+        start = 0
+        if self.n:
+            li = self.last_index()
+            last_t = int(self.t[li])
+            if int(rows[0][kt]) > last_t:
+                # window no longer overlaps what we hold → rebuild
+                self.clear()
+            else:
+                start = len(rows)
+                while start > 0 and int(rows[start - 1][kt]) >= last_t:
+                    start -= 1
+                if start < len(rows) and int(rows[start][kt]) == last_t:
+                    # re-write the bar that was live on the previous call
+                    self.head = li
+                    self.n -= 1
+
+        cap = self.cap
+        o, h, l, c, v, t = self.o, self.h, self.l, self.c, self.v, self.t
+        i = self.head
+        for r in rows[start:]:
+            t[i] = int(r[kt])
+            o[i] = r[ko]
+            h[i] = r[kh]
+            l[i] = r[kl]
+            c[i] = r[kc]
+            v[i] = r.get(kv) or 0.0
+            i = (i + 1) % cap
+        written = len(rows) - start
+        self.head = i
+        self.n = min(cap, self.n + written)
+        return written
+
+    def push_soa(self, soa: dict) -> int:
+        """push() for {time, open, high, low, close, volume} column arrays (oldest → newest)."""
+        ts = soa["time"]
+        m = len(ts)
+        if m == 0:
+            return 0
+
+        start = 0
+        if self.n:
+            li = self.last_index()
+            last_t = int(self.t[li])
+            if int(ts[0]) > last_t:
+                # window no longer overlaps what we hold → rebuild
+                self.clear()
+            else:
+                older = np.flatnonzero(ts < last_t)
+                start = int(older[-1]) + 1 if older.size else 0
+                if start < m and int(ts[start]) == last_t:
+                    # re-write the bar that was live on the previous call
+                    self.head = li
+                    self.n -= 1
+
+        cap = self.cap
+        written = m - start
+        skip = max(0, written - cap)  # only the newest cap bars survive the wrap
+        idx = (self.head + np.arange(skip, written)) % cap
+        src = slice(start + skip, m)
+        self.t[idx] = ts[src]
+        self.o[idx] = soa["open"][src]
+        self.h[idx] = soa["high"][src]
+        self.l[idx] = soa["low"][src]
+        self.c[idx] = soa["close"][src]
+        self.v[idx] = soa["volume"][src]
+        self.head = (self.head + written) % cap
+        self.n = min(cap, self.n + written)
+        return written
+
+    def override_last_close(self, price: float) -> None:
+        """Apply a live ticker price to the forming bar (close, and widen high/low)."""
+        li = self.last_index()
+        self.c[li] = price
+        if price > self.h[li]:
+            self.h[li] = price
+        if price < self.l[li]:
+            self.l[li] = price
+
+    def last(self, n: Optional[int] = None):
+        """Return (o, h, l, c, v, t) for the newest n bars as C-contiguous arrays."""
+        n = self.n if n is None else min(int(n), self.n)
+        start = (self.head - n) % self.cap
+        if start + n <= self.cap:
+            sl = slice(start, start + n)
+            return self.o[sl], self.h[sl], self.l[sl], self.c[sl], self.v[sl], self.t[sl]
+        idx = np.arange(start, start + n) % self.cap
+        return (
+            self.o.take(idx), self.h.take(idx), self.l.take(idx),
+            self.c.take(idx), self.v.take(idx), self.t.take(idx),
+        )
+
+# (buy, sell) increments per action; anything else counts as neither
+_CONFIRM_DELTA = {"BUY": (1, 0), "SELL": (0, 1)}
+
+
+class ConfirmCounter:
+    """
+    Sliding window over the last n actions with running BUY/SELL tallies
+    (O(1) push instead of scanning a deque with count()).
+    """
+
+    __slots__ = ("buf", "head", "buy", "sell")
+
+    def __init__(self, n: int = 5):
+        self.buf = [(0, 0)] * n
+        self.head = 0
+        self.buy = 0
+        self.sell = 0
+
+    def push(self, action: str) -> None:
+        old_b, old_s = self.buf[self.head]
+        new_b, new_s = _CONFIRM_DELTA.get(action, (0, 0))
+        self.buf[self.head] = (new_b, new_s)
+        self.head = (self.head + 1) % len(self.buf)
+        self.buy += new_b - old_b
+        self.sell += new_s - old_s
+
+_NUM_FORMATS = {2: "{:.2f}".format, 3: "{:.3f}".format}
+
 
 def format_number(x: Any, nd: int = 3) -> str:
+    fmt = _NUM_FORMATS.get(nd)
     try:
-        return f"{float(x):.{nd}f}"
-    except Exception:
+        return fmt(x) if fmt is not None else f"{float(x):.{nd}f}"
+    except (TypeError, ValueError):
         return str(x)
 
 # --------------------------------------------------------
@@ -186,6 +368,7 @@ def format_number(x: Any, nd: int = 3) -> str:
 # --------------------------------------------------------
 logger.info("Initializing database...")
 database_setup.ensure_schema()
+database_setup.tune_pragmas()
 
 wl = WallexClient(
     base_url=cfg.WALLEX["base_url"],
@@ -223,6 +406,7 @@ signal_engine = SignalEngine(
         vr_adapt_k=cfg.STRATEGY.get("vr_adapt_k", 0.25),
         vr_adapt_clamp=cfg.STRATEGY.get("vr_adapt_clamp", 0.08),
         impulse_only_high=cfg.STRATEGY.get("impulse_only_high", True),
+        verbose_reasons=True,  # reasons go to the SMART ANALYSIS log and the DB
     )
 )
 
@@ -234,7 +418,133 @@ last_db_fingerprint: Optional[str] = None
 tg: Optional[TelegramClient] = None
 last_executed_candle_ts: Optional[int] = None
 
-signal_buffer = deque(maxlen=5)
+signal_confirm = ConfirmCounter(5)
+
+# trading_logs rows are written in batches (one transaction per flush), at most
+# LOG_FLUSH_SECONDS behind so the dashboard's latest row stays current
+LOG_FLUSH_ROWS = 32
+LOG_FLUSH_SECONDS = 5.0
+# Rows kept for retry while the DB is failing; the oldest are dropped beyond this
+LOG_QUEUE_MAX = 1000
+_log_queue: list[dict] = []
+_last_log_flush = time.monotonic()
+
+
+def flush_trading_logs() -> bool:
+    """
+    Write queued trading_logs rows in one transaction. The queue is cleared
+    (and last_db_fingerprint advanced) only after a successful write; on
+    failure the rows stay queued and the next flush retries them.
+    """
+    global _last_log_flush, last_db_fingerprint
+    _last_log_flush = time.monotonic()
+    if not _log_queue:
+        return True
+    ok = database_setup.insert_trading_logs_many(_log_queue)
+    if not ok:
+        logger.error(f"Failed to insert {len(_log_queue)} trading log row(s); will retry")
+        return False
+    last_db_fingerprint = _log_queue[-1].get("fingerprint")
+    _log_queue.clear()
+    return True
+
+
+# atexit runs LIFO: flush the queue first, then close the writer connection
+atexit.register(database_setup.close_writer_connection)
+atexit.register(flush_trading_logs)
+
+
+def _exit_on_sigterm(signum, frame):
+    # systemd stop/restart sends SIGTERM; atexit handlers only run on a normal
+    # interpreter exit, so turn it into SystemExit to drain the log queue
+    raise SystemExit(0)
+
+
+ring240 = CandleRing(cfg.MAX_CANDLES_PRIMARY)
+ring60 = CandleRing(cfg.MAX_CANDLES_CONFIRM)
+
+# Closed-bar indicator state per TF (O(1) per new bar; live bar applied transiently)
+inc240 = IncrementalIndicators(cfg.PRIMARY_TF)
+inc60 = IncrementalIndicators(cfg.CONFIRM_TF)
+if NUMBA_AVAILABLE:
+    _t0 = time.perf_counter()
+    warmup_kernels()
+    logger.info(f"Indicator kernels ready in {time.perf_counter() - _t0:.2f}s")
+
+# Both TF fetches (I/O) and, with numba (nogil kernels), the confirm-TF indicators run here
+_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="st-md")
+
+# Optional DecisionContext pooling (see cfg.POOL_DECISION_CONTEXT): one slot per TF
+_DC_SLOT_PRIMARY = 0
+_DC_SLOT_CONFIRM = 1
+_dc_pool: Optional[DecisionContextPool] = (
+    DecisionContextPool(2) if getattr(cfg, "POOL_DECISION_CONTEXT", False) else None
+)
+
+
+def _new_dc(slot: int, **fields) -> DecisionContext:
+    return _dc_pool.get(slot, **fields) if _dc_pool is not None else DecisionContext(**fields)
+
+@lru_cache(maxsize=8)
+def _gateway_candles(symbol: str, tf: str, candle_ts: int) -> dict:
+    """
+    Multi-provider candles for the behavior engine, cached per (symbol, tf, candle):
+    intracandle ticks of the same bar do not re-hit the providers.
+    Raises when no data is returned so that failures are not cached.
+    """
+    res = md_gateway.get_candles(symbol=symbol, tf=tf, limit=cfg.BEHAVIOR_CANDLES)
+    if isinstance(res, dict):
+        data = res.get("data")
+        providers = res.get("providers_used", []) or []
+    else:  # MarketDataResponse
+        data = getattr(res, "data", None)
+        provider = getattr(res, "provider", None)
+        providers = [provider] if provider and provider != "none" else []
+    if not data:
+        raise ValueError(getattr(res, "error", None) or "no market data from gateway")
+    return {"data": data, "providers_used": providers}
+
+
+def _behavior_market_data(candles: dict, candle_ts: int) -> Optional[dict]:
+    if not getattr(cfg, "BEHAVIOR_REQUIRES_MULTIPROVIDER", False):
+        tail = {k: col[-cfg.BEHAVIOR_CANDLES:] for k, col in candles.items()}
+        return {"data": soa_to_candles(tail), "providers_used": ["wallex"]}
+    if md_gateway is None:
+        return None
+    return _gateway_candles(cfg.SYMBOL, cfg.PRIMARY_TF, candle_ts)
+
+
+# Behavior result + its JSON are reused while the input window is unchanged
+# (same newest bar, same close/volume): the identical dict object is returned,
+# so the serialized form can be memoized by identity.
+_behavior_key: Optional[tuple] = None
+_behavior_last: Optional[dict] = None
+_behavior_json_src: Optional[dict] = None
+_behavior_json_text: Optional[str] = None
+
+
+def _behavior_score_for(md: dict) -> dict:
+    global _behavior_key, _behavior_last
+    data = md["data"]
+    last = data[-1]
+    key = (
+        len(data), last.get("time"), last.get("close"), last.get("volume"),
+        tuple(md.get("providers_used") or ()),
+    )
+    if key != _behavior_key or _behavior_last is None:
+        _behavior_last = compute_behavior_score(symbol=cfg.SYMBOL, market_data=data)
+        _behavior_key = key
+    return _behavior_last
+
+
+def _behavior_json(details: Optional[dict]) -> Optional[str]:
+    """json.dumps(details) memoized on object identity (a reference is held, so ids cannot be recycled)."""
+    global _behavior_json_src, _behavior_json_text
+    if details is not _behavior_json_src:
+        _behavior_json_text = json.dumps(details, ensure_ascii=False) if details else None
+        _behavior_json_src = details
+    return _behavior_json_text
+
 
 def _format_position_state(price: float) -> Optional[str]:
     """
@@ -306,23 +616,37 @@ def _tg_ping():
 tg = _build_tg_client()
 _tg_ping()
 
+def tg_enqueue(kind: str, text: str, level: str = "INFO") -> bool:
+    """
+    Queue a Telegram message ("analysis" or "msg") on the client's background
+    sender, so the trading loop never waits on the HTTPS RTT.
+    """
+    if tg is None or not tg.available():
+        return False
+    if kind == "analysis":
+        return tg.send_smart_analysis_async(text)
+    return tg.send_async(text, level)
+
 # --------------------------------------------------------
 # Persistence helpers
 # --------------------------------------------------------
+def _account_state() -> dict:
+    return {
+        "timestamp": now_iso(),
+        "symbol": cfg.SYMBOL,
+        "equity": float(account.equity),
+        "balance": float(account.balance),
+        "position_side": account.position.side if account.position else None,
+        "position_qty": float(account.position.qty) if account.position else None,
+        "position_entry": float(account.position.entry_price) if account.position else None,
+        "position_stop": float(account.position.stop_price)
+        if (account.position and account.position.stop_price)
+        else None,
+    }
+
 def _persist_account_snapshot():
     try:
-        state = {
-            "timestamp": now_iso(),
-            "symbol": cfg.SYMBOL,
-            "equity": float(account.equity),
-            "balance": float(account.balance),
-            "position_side": account.position.side if account.position else None,
-            "position_qty": float(account.position.qty) if account.position else None,
-            "position_entry": float(account.position.entry_price) if account.position else None,
-            "position_stop": float(account.position.stop_price)
-            if (account.position and account.position.stop_price)
-            else None,
-        }
+        state = _account_state()
         if hasattr(database_setup, "upsert_account_state"):
             database_setup.upsert_account_state(state)
         else:
@@ -345,6 +669,25 @@ def _log_trade_event(event_type: str, details: dict):
     except Exception as e:
         logger.exception(f"Failed to insert trade event: {e}")
 
+def _record_trade(event_type: str, details: dict):
+    """
+    Trade event + account snapshot in one DB transaction (one commit per trade).
+    """
+    if not hasattr(database_setup, "record_trade"):
+        _log_trade_event(event_type, details)
+        _persist_account_snapshot()
+        return
+    try:
+        event = {
+            "timestamp": now_iso(),
+            "symbol": cfg.SYMBOL,
+            "event_type": event_type,
+            **details,
+        }
+        database_setup.record_trade(event, _account_state())
+    except Exception as e:
+        logger.exception(f"Failed to record trade event/account state: {e}")
+
 # --------------------------------------------------------
 # Close helpers
 # --------------------------------------------------------
@@ -384,7 +727,7 @@ def _close_position(current_price: float, reason: str):
 
     trade_id = getattr(pos, "trade_id", None)
 
-    _log_trade_event(
+    _record_trade(
         "CLOSE",
         {
             "trade_id": trade_id,
@@ -399,18 +742,18 @@ def _close_position(current_price: float, reason: str):
     )
     logger.info(f"🛑 Closed {side} @ {current_price:.2f} pnl={pnl:.2f} ({reason})")
 
-    if tg:
-        try:
-            tg.send(
-                f"🛑 <b>Closed</b> {cfg.SYMBOL} {side} "
-                f"qty={qty:.6f} @ {current_price:.2f}\n"
-                f"PnL: {pnl:.2f} ({reason})",
-                "INFO",
-            )
-        except Exception as e:
-            logger.exception(f"Failed to send Telegram close message: {e}")
+    if tg and tg.available():
+        tg_enqueue(
+            "msg",
+            f"🛑 <b>Closed</b> {cfg.SYMBOL} {side} "
+            f"qty={qty:.6f} @ {current_price:.2f}\n"
+            f"PnL: {pnl:.2f} ({reason})",
+        )
+
+# R-multiple exit levels
+_TP_R = 0.7    # حدود +1R همه پوزیشن را ببند
+_BE_R = 0.35   # حدود +0.4R استاپ را روی BE بیاور
 
-    _persist_account_snapshot()
 
 def _maybe_close_position(current_price: float):
     """
@@ -419,12 +762,10 @@ def _maybe_close_position(current_price: float):
       - Take-profit در حدود +1R (TP_HIT)
       - Move stop to breakeven در حدود +0.4R
     """
-    if not account.position:
-        return
-    if current_price is None:
+    pos = account.position
+    if not pos or current_price is None:
         return
 
-    pos = account.position
     entry = float(pos.entry_price)
     qty = float(pos.qty)
     stop = pos.stop_price
@@ -432,55 +773,45 @@ def _maybe_close_position(current_price: float):
     if qty <= 0.0 or entry <= 0.0:
         return
 
+    direction = float(pos.direction)
+
+    # 1) مدیریت R-multiple (TP و BE) فقط اگر stop تعریف شده باشد
     # اگر استاپ نداریم، فعلاً فقط REVERSE_SIGNAL ما را می‌بندد
     if stop is not None:
         risk_per_unit = abs(entry - float(stop))
-    else:
-        risk_per_unit = 0.0
-
-    # 1) مدیریت R-multiple (TP و BE) فقط اگر stop تعریف شده باشد
-    if risk_per_unit > 0.0:
-        direction = 1.0 if pos.side == "LONG" else -1.0
-        r_mult = ((current_price - entry) * direction) / risk_per_unit
-
-        # نسبت‌های جدید
-        tp_r_level = 0.7   # حدود +1R همه پوزیشن را ببند
-        be_r_level = 0.35  # حدود +0.4R استاپ را روی BE بیاور
-
-        # 1.a) Take-profit کامل روی 1R
-        if r_mult >= tp_r_level:
-            logger.info(
-                f"🎯 TP hit for {pos.side} trade_id={getattr(pos, 'trade_id', None)} "
-                f"R={r_mult:.2f} (>= {tp_r_level:.2f})"
-            )
-            _close_position(current_price, "TP_HIT")
-            return
+        if risk_per_unit > 0.0:
+            r_mult = (current_price - entry) * direction / risk_per_unit
+
+            # 1.a) Take-profit کامل روی 1R
+            if r_mult >= _TP_R:
+                logger.info(
+                    f"🎯 TP hit for {pos.side} trade_id={pos.trade_id} "
+                    f"R={r_mult:.2f} (>= {_TP_R:.2f})"
+                )
+                _close_position(current_price, "TP_HIT")
+                return
 
-        # 1.b) انتقال استاپ به break-even
-        if r_mult >= be_r_level and not getattr(pos, "breakeven_armed", False):
-            pos.stop_price = entry
-            pos.breakeven_armed = True
-            logger.info(
-                f"🔒 Move stop to breakeven for {pos.side} "
-                f"trade_id={getattr(pos, 'trade_id', None)} "
-                f"R={r_mult:.2f} (>= {be_r_level:.2f})"
-            )
+            # 1.b) انتقال استاپ به break-even
+            if r_mult >= _BE_R and not pos.breakeven_armed:
+                pos.stop_price = entry
+                pos.breakeven_armed = True
+                logger.info(
+                    f"🔒 Move stop to breakeven for {pos.side} "
+                    f"trade_id={pos.trade_id} "
+                    f"R={r_mult:.2f} (>= {_BE_R:.2f})"
+                )
 
     # 2) Hard stop check (STOP_HIT) – بعد از مدیریت TP/BE
     if pos.stop_price is None:
         return
 
     stop_now = float(pos.stop_price)
-    breached = (
-        (pos.side == "LONG" and current_price <= stop_now)
-        or (pos.side == "SHORT" and current_price >= stop_now)
-    )
-
-    if not breached:
+    # LONG: price <= stop, SHORT: price >= stop
+    if (current_price - stop_now) * direction > 0.0:
         return
 
     logger.info(
-        f"⛔ Stop breached for {pos.side} trade_id={getattr(pos, 'trade_id', None)} "
+        f"⛔ Stop breached for {pos.side} trade_id={pos.trade_id} "
         f"price={current_price:.2f}, stop={stop_now:.2f}"
     )
     _close_position(current_price, "STOP_HIT")
@@ -489,31 +820,29 @@ def _maybe_close_position(current_price: float):
 # Core loop
 # --------------------------------------------------------
 def analyze_once(iteration: int):
-    global last_log_fingerprint, last_db_fingerprint, last_executed_candle_ts
+    global last_log_fingerprint, last_executed_candle_ts
 
-    candles_240 = wl.get_candles(cfg.SYMBOL, cfg.PRIMARY_TF, cfg.MAX_CANDLES_PRIMARY)
-    candles_60 = wl.get_candles(cfg.SYMBOL, cfg.CONFIRM_TF, cfg.MAX_CANDLES_CONFIRM)
+    f240 = _pool.submit(wl.get_candles_soa, cfg.SYMBOL, cfg.PRIMARY_TF, cfg.MAX_CANDLES_PRIMARY)
+    f60 = _pool.submit(wl.get_candles_soa, cfg.SYMBOL, cfg.CONFIRM_TF, cfg.MAX_CANDLES_CONFIRM)
+    candles_240, candles_60 = f240.result(), f60.result()
 
-    if not candles_240:
+    if candles_240 is None or not len(candles_240["time"]):
         logger.warning("No primary TF candles received")
         return
 
-    df240 = pd.DataFrame(candles_240)
-    df60 = pd.DataFrame(candles_60) if candles_60 else pd.DataFrame()
+    ring240.push_soa(candles_240)
 
-    # Normalize columns
-    for df in (df240, df60):
-        if df is None or df.empty:
-            continue
-        rename_map = {"c": "close", "h": "high", "l": "low", "o": "open", "t": "time", "v": "volume"}
-        df.rename(columns=rename_map, inplace=True)
-        for col in ("open", "high", "low", "close", "volume"):
-            if col in df.columns:
-                df[col] = df[col].astype(float)
-        if "time" in df.columns:
-            df["time"] = df["time"].astype(int)
+    # Confirm-TF kernel releases the GIL under numba → overlap it with the primary TF work
+    have60 = candles_60 is not None and len(candles_60["time"]) > 0
+    feat60_future = None
+    if have60:
+        ring60.push_soa(candles_60)
+        _o60, h60, l60, c60, _v60, t60 = ring60.last(cfg.MAX_CANDLES_CONFIRM)
+        if NUMBA_AVAILABLE:
+            feat60_future = _pool.submit(inc60.features, h60, l60, c60, t60)
 
-    current_ts = int(df240["time"].iloc[-1])
+    li240 = ring240.last_index()
+    current_ts = int(ring240.t[li240])
 
     if not cfg.STRATEGY["allow_intracandle"]:
         if last_executed_candle_ts == current_ts:
@@ -531,14 +860,10 @@ def analyze_once(iteration: int):
 
     candle_is_live = (live_price is not None)
     if live_price is not None:
-        prev_close = df240["close"].iloc[-1]
+        prev_close = float(ring240.c[li240])
         if abs(prev_close - live_price) > 1e-6:
             logger.info(f"💹 Live price override: {prev_close:.2f} → {live_price:.2f}")
-            df240.at[df240.index[-1], "close"] = live_price
-            df240.at[df240.index[-1], "high"] = max(df240["high"].iloc[-1], live_price)
-            df240.at[df240.index[-1], "low"] = min(df240["low"].iloc[-1], live_price)
-
-    latest_candle_data = df240.iloc[-1].to_dict()
+            ring240.override_last_close(live_price)
 
     # ================= Behavior Intelligence (Option C) =================
     behavior_score = None
@@ -546,14 +871,14 @@ def analyze_once(iteration: int):
     behavior_details = None
     behavior_providers = []
 
-    if md_gateway is not None and compute_behavior_score is not None:
+    if compute_behavior_score is not None:
         try:
-            md = md_gateway.get_candles(symbol=cfg.SYMBOL, tf=cfg.PRIMARY_TF, limit=120)
+            md = _behavior_market_data(candles_240, current_ts)
             if md and md.get("data"):
-                behavior = compute_behavior_score(symbol=cfg.SYMBOL, market_data=md["data"])
+                behavior = _behavior_score_for(md)
 
                 behavior_score = behavior.get("behavior_score")
-                if behavior_score is not None:
+                if behavior_score is not None and getattr(cfg, "BEHAVIOR_BIAS_ENABLED", False):
                     behavior_bias = max(-1.0, min(1.0, (float(behavior_score) - 50.0) / 25.0))
 
                 behavior_details = behavior
@@ -561,46 +886,32 @@ def analyze_once(iteration: int):
         except Exception as e:
             logger.warning(f"Behavior engine failed: {e}")
 
-    # 240 TF indicators and channels
-    close240 = df240["close"]
-    ema_fast = calculate_ema(close240, 20)
-    ema_slow = calculate_ema(close240, 50)
-    rsi240 = calculate_rsi(close240, 14)
-    adx240 = calculate_adx(df240, 14)
-    atr240 = calculate_atr(df240, 14)
+    # 240 TF indicators and channels (incremental over closed bars + live bar)
+    _o240, h240, l240, c240, _v240, t240 = ring240.last(cfg.MAX_CANDLES_PRIMARY)
+    (
+        trend_240, momentum_240, meanrev_240, breakout_240,
+        vr_240, adx_val_240, atr_240, price_240,
+    ) = inc240.features(h240, l240, c240, t240)
 
-    vr_240 = float(smooth_vol_ratio(atr240).iloc[-1])
-
-    trend_240 = float(np.tanh((ema_fast.iloc[-1] - ema_slow.iloc[-1]) / (1e-9 + atr240.iloc[-1])))
-    momentum_240 = float((rsi240.iloc[-1] - 50.0) / 50.0)
-
-    residual = close240 - ema_slow
-    residual_std = float(residual.rolling(50, min_periods=20).std().iloc[-1] or 1.0)
-    meanrev_240 = float(-np.tanh(residual.iloc[-1] / (1e-9 + residual_std)))
-
-    up, lo = donchian_channels(df240, 20)
-    rng = float((up.iloc[-1] - lo.iloc[-1]) or 1.0)
-    breakout_240 = float(np.clip((close240.iloc[-1] - (up.iloc[-1] + lo.iloc[-1]) / 2) / (rng + 1e-9), -1, 1))
-
-    adx_val_240 = float(adx240.iloc[-1])
     regime, regime_reasons = compute_regime(trend_240, adx_val_240, vr_240)
 
     ts_now = now_iso()
 
-    dc240 = DecisionContext(
+    dc240 = _new_dc(
+        _DC_SLOT_PRIMARY,
         trend_raw=trend_240,
         momentum_raw=momentum_240,
         meanrev_raw=meanrev_240,
         breakout_raw=breakout_240,
         adx=adx_val_240,
-        atr=float(atr240.iloc[-1]),
-        price=float(close240.iloc[-1]),
+        atr=atr_240,
+        price=price_240,
         tf=cfg.PRIMARY_TF,
         regime=regime,
         vol_ratio=vr_240,
         timestamp=ts_now,
     )
-    dc240.reasons.extend(regime_reasons)
+    dc240.get_reasons().extend(regime_reasons)
 
     # inject behavior first
     dc240.behavior_score = behavior_score
@@ -613,35 +924,29 @@ def analyze_once(iteration: int):
 
     # Confirm TF
     dc60: Optional[DecisionContext] = None
-    if not df60.empty:
-        close60 = df60["close"]
-        ema_fast60 = calculate_ema(close60, 20)
-        ema_slow60 = calculate_ema(close60, 50)
-        rsi60 = calculate_rsi(close60, 14)
-        adx60 = calculate_adx(df60, 14)
-        atr60 = calculate_atr(df60, 14)
-
-        trend_60 = float(np.tanh((ema_fast60.iloc[-1] - ema_slow60.iloc[-1]) / (1e-9 + atr60.iloc[-1])))
-        momentum_60 = float((rsi60.iloc[-1] - 50.0) / 50.0)
-        residual60 = close60 - ema_slow60
-        residual_std60 = float(residual60.rolling(50, min_periods=20).std().iloc[-1] or 1.0)
-        meanrev_60 = float(-np.tanh(residual60.iloc[-1] / (1e-9 + residual_std60)))
-        up60, lo60 = donchian_channels(df60, 20)
-        rng60 = float((up60.iloc[-1] - lo60.iloc[-1]) or 1.0)
-        breakout_60 = float(np.clip((close60.iloc[-1] - (up60.iloc[-1] + lo60.iloc[-1]) / 2) / (rng60 + 1e-9), -1, 1))
-
-        dc60 = DecisionContext(
+    if have60:
+        (
+            trend_60, momentum_60, meanrev_60, breakout_60,
+            _vr_60, adx_60, atr_60, price_60,
+        ) = (
+            feat60_future.result() if feat60_future is not None
+            else inc60.features(h60, l60, c60, t60)
+        )
+
+        dc60 = _new_dc(
+            _DC_SLOT_CONFIRM,
             trend_raw=trend_60,
             momentum_raw=momentum_60,
             meanrev_raw=meanrev_60,
             breakout_raw=breakout_60,
-            adx=float(adx60.iloc[-1]),
-            atr=float(atr60.iloc[-1]),
-            price=float(close60.iloc[-1]),
+            adx=adx_60,
+            atr=atr_60,
+            price=price_60,
             tf=cfg.CONFIRM_TF,
             regime=regime,
             vol_ratio=vr_240,
             timestamp=ts_now,
+            collect_reasons=False,  # only dc240's reasons are logged / stored
         )
         dc60 = signal_engine.gate_and_weight(dc60)
 
@@ -651,22 +956,25 @@ def analyze_once(iteration: int):
     if cfg.STRATEGY.get("allow_intracandle", True) and candle_is_live and action in ("BUY", "SELL"):
         min_vr_live = float(cfg.STRATEGY.get("min_vr_intracandle", 0.95))
         if (vr_240 is not None) and (vr_240 < min_vr_live) and (dc240.regime != "HIGH"):
-            dc240.reasons.append(f"VOL_EXPAND_GUARD: vr={vr_240:.3f} < {min_vr_live:.3f} (live) → HOLD")
+            dc240.get_reasons().append(f"VOL_EXPAND_GUARD: vr={vr_240:.3f} < {min_vr_live:.3f} (live) → HOLD")
             action, trade = "HOLD", None
 
-    signal_buffer.append(action)
-    if action == "BUY" and signal_buffer.count("BUY") < 3:
+    signal_confirm.push(action)
+    if action == "BUY" and signal_confirm.buy < 3:
         return
-    if action == "SELL" and signal_buffer.count("SELL") < 3:
+    if action == "SELL" and signal_confirm.sell < 3:
         return
 
+    # one fingerprint per tick, shared by DB and log dedupe
+    fp = make_fingerprint(dc240, dc60, dc240.price or 0)
+
     # ---------------- DB logging (dedupe by fingerprint) ---------------- #
     try:
-        from database_setup import dc_to_row, insert_trading_log
-
-        fingerprint = make_fingerprint(dc240, dc60, dc240.price or 0)
+        from database_setup import dc_to_row
 
-        if fingerprint != last_db_fingerprint:
+        # dedupe against the newest queued row, else the newest persisted one
+        pending_fp = _log_queue[-1].get("fingerprint") if _log_queue else last_db_fingerprint
+        if fp != pending_fp:
             row = dc_to_row(
                 decision=action,
                 dc_primary=dc240,
@@ -676,53 +984,52 @@ def analyze_once(iteration: int):
                 pos_size=(trade or {}).get("qty") if isinstance(trade, dict) else None,
                 risk_amount=None,
                 tp_price=(trade or {}).get("tp_price") if isinstance(trade, dict) else None,
-                fingerprint=fingerprint,
+                fingerprint=fp,
                 regime_reasons="; ".join(regime_reasons) if regime_reasons else None,
             )
-            row.update(
-                {
-                    "open": latest_candle_data.get("open"),
-                    "high": latest_candle_data.get("high"),
-                    "low": latest_candle_data.get("low"),
-                    "volume": latest_candle_data.get("volume", 0.0),
-                    "timestamp": dc240.timestamp or ts_now,
-                }
-            )
-            row.update({
-                "behavior_score": getattr(dc240, "behavior_score", None),
-                "behavior_bias": getattr(dc240, "behavior_bias", None),
-                "behavior_json": json.dumps(getattr(dc240, "behavior_details", None), ensure_ascii=False)
-                if getattr(dc240, "behavior_details", None) else None,
-                "behavior_providers": ",".join(getattr(dc240, "behavior_providers", []) or []),
-            })
-
-            ok = insert_trading_log(row)
-            if not ok:
-                logger.error("Failed to insert trading log row")
-            else:
-                last_db_fingerprint = fingerprint
+            # latest primary-TF bar (after any live price override)
+            row["open"] = float(ring240.o[li240])
+            row["high"] = float(ring240.h[li240])
+            row["low"] = float(ring240.l[li240])
+            row["volume"] = float(ring240.v[li240])
+            row["timestamp"] = dc240.timestamp or ts_now
+
+            row["behavior_score"] = dc240.behavior_score
+            row["behavior_bias"] = dc240.behavior_bias
+            row["behavior_json"] = _behavior_json(behavior_details)
+            row["behavior_providers"] = ",".join(dc240.behavior_providers or [])
+
+            _log_queue.append(row)
+            if len(_log_queue) > LOG_QUEUE_MAX:
+                dropped = len(_log_queue) - LOG_QUEUE_MAX
+                del _log_queue[:dropped]
+                logger.error(f"trading_logs queue full: dropped {dropped} oldest unwritten row(s)")
+
+        if len(_log_queue) >= LOG_FLUSH_ROWS or (time.monotonic() - _last_log_flush) >= LOG_FLUSH_SECONDS:
+            flush_trading_logs()
     except Exception as e:
         logger.error(f"Failed to log analysis to database: {e}")
 
     # ---------------- SMART ANALYSIS log / Telegram ---------------- #
-    fp = make_fingerprint(dc240, dc60, dc240.price or 0)
     repeated = fp == last_log_fingerprint
 
     if not (candle_is_live and repeated):
         last_log_fingerprint = fp
 
-        trade_preview = ""
-        if isinstance(trade, dict):
-            trade_preview = f"Trade: {trade}"
-        elif isinstance(trade, Position):
-            trade_preview = (
-                f"Trade: Position(side='{trade.side}', qty={trade.qty}, "
-                f"entry_price={trade.entry_price}, stop_price={trade.stop_price})"
-            )
+        # nothing below is built unless it will actually be emitted somewhere
+        if logger.isEnabledFor(logging.INFO) or (tg is not None and tg.available()):
+            trade_preview = ""
+            if isinstance(trade, dict):
+                trade_preview = f"Trade: {trade}"
+            elif isinstance(trade, Position):
+                trade_preview = (
+                    f"Trade: Position(side='{trade.side}', qty={trade.qty}, "
+                    f"entry_price={trade.entry_price}, stop_price={trade.stop_price})"
+                )
 
-        pos_state_text = _format_position_state(dc240.price) or ""
+            pos_state_text = _format_position_state(dc240.price) or ""
 
-        block = f"""
+            block = f"""
 ====================================
 
 ========== SMART ANALYSIS ==========
@@ -745,18 +1052,13 @@ Decision: {action}
 {pos_state_text}
 
 Reasons:
-  - {(chr(10) + "  - ").join(dc240.reasons)}
+  - {(chr(10) + "  - ").join(dc240.reasons or ())}
 ====================================
 """.rstrip()
 
-        logger.info(block)
-        if tg:
-            try:
-                sent = tg.send_smart_analysis(block)
-                if not sent:
-                    telegram_logger.warning("SMART ANALYSIS telegram send failed.")
-            except Exception as e:
-                telegram_logger.exception(f"SMART ANALYSIS send exception: {e}")
+            logger.info(block)
+            if tg and tg.available():
+                tg_enqueue("analysis", block)
 
     # ---------------- Risk / Execution layer ---------------- #
     # 1) TP/SL
@@ -776,7 +1078,7 @@ Reasons:
     execute_now = True
     if not cfg.STRATEGY.get("allow_intracandle", True) and candle_is_live and action in ("BUY", "SELL"):
         execute_now = False
-        dc240.reasons.append("Intracandle disabled: live candle → skip trade")
+        dc240.get_reasons().append("Intracandle disabled: live candle → skip trade")
 
     # Only one open position at a time
     if account.position:
@@ -787,13 +1089,15 @@ Reasons:
     if execute_now and action in ("BUY", "SELL"):
         if action == "SELL" and not getattr(cfg, "ALLOW_SHORT", True):
             return
-        if dc240.price is None or dc240.price <= 0:
+        price = dc240.price
+        if price is None or price <= 0:
             logger.info("Skipping trade: invalid price")
             return
+        price = float(price)
 
-        account.update_equity(dc240.price)
+        account.update_equity(price)
 
-        if not account.can_trade(min_trade_value, dc240.price):
+        if not account.can_trade(min_trade_value, price):
             logger.info("Skipping trade: insufficient balance or below min notional")
             return
 
@@ -810,42 +1114,44 @@ Reasons:
         if stop_price is None:
             default_stop_pct = getattr(cfg, "DEFAULT_STOP_PCT", 0.01)
             if side == "LONG":
-                stop_price = dc240.price * (1.0 - default_stop_pct)
+                stop_price = price * (1.0 - default_stop_pct)
             else:
-                stop_price = dc240.price * (1.0 + default_stop_pct)
+                stop_price = price * (1.0 + default_stop_pct)
+
+        # a zero stop means "no stop" (same as before); cast once
+        sp = float(stop_price) if stop_price else None
 
         # position sizing by risk
-        if stop_price:
+        if sp is not None:
             qty = position_size_by_risk(
                 account.equity,
                 cfg.STRATEGY["max_risk_per_trade"],
-                dc240.price,
-                float(stop_price),
+                price,
+                sp,
             )
         else:
-            qty = max(min_trade_value / dc240.price, 0.0)
+            qty = max(min_trade_value / price, 0.0)
 
         qty = float(qty or 0.0)
         if qty <= 0:
             logger.info("Skipping trade: computed qty <= 0")
             return
 
-        notional = qty * dc240.price
+        notional = qty * price
         if notional < min_trade_value:
-            need_qty = min_trade_value / dc240.price
-            if side == "LONG" and (need_qty * dc240.price) > account.balance:
+            qty = min_trade_value / price
+            notional = qty * price
+            if side == "LONG" and notional > account.balance:
                 logger.info("Skipping trade: cannot scale to reach MIN_TRADE_VALUE due to balance")
                 return
-            qty = need_qty
-            notional = qty * dc240.price
 
         trade_id = new_trade_id()
 
         account.position = Position(
             side=side,
             qty=qty,
-            entry_price=dc240.price,
-            stop_price=float(stop_price) if stop_price else None,
+            entry_price=price,
+            stop_price=sp,
             trade_id=trade_id,
             opened_at_ts=int(time.time()),
         )
@@ -853,37 +1159,40 @@ Reasons:
         if side == "LONG":
             account.balance -= notional
 
-        account.update_equity(dc240.price)
+        account.update_equity(price)
 
-        _log_trade_event(
+        _record_trade(
             "OPEN",
             {
                 "trade_id": trade_id,
                 "side": side,
-                "qty": float(qty),
-                "entry_price": float(dc240.price),
-                "stop_price": float(stop_price) if stop_price else None,
+                "qty": qty,
+                "entry_price": price,
+                "stop_price": sp,
             },
         )
-        _persist_account_snapshot()
 
         logger.info(
-            f"📈 Executed {action} qty={qty:.6f} at {dc240.price:.2f} "
-            f"(notional={notional:.2f}) stop={stop_price}"
+            f"📈 Executed {action} qty={qty:.6f} at {price:.2f} "
+            f"(notional={notional:.2f}) stop={sp}"
         )
-        if tg:
-            try:
-                tg.send(
-                    f"<b>Trade</b> {action} {cfg.SYMBOL} qty={qty:.6f} @ {dc240.price:.2f}\n"
-                    f"Notional: {notional:.2f}\nStop: {stop_price}",
-                    "INFO",
-                )
-            except Exception as e:
-                logger.exception(f"Failed to send Telegram trade message: {e}")
+        if tg and tg.available():
+            tg_enqueue(
+                "msg",
+                f"<b>Trade</b> {action} {cfg.SYMBOL} qty={qty:.6f} @ {price:.2f}\n"
+                f"Notional: {notional:.2f}\nStop: {sp}",
+            )
 
 def main():
     logger.info("Re-checking database initialization...")
     database_setup.ensure_schema()
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
+
+    period = max(1, cfg.LIVE_POLL_SECONDS)
+    # the first tick runs right away; later ticks land on wall-clock multiples
+    # of the poll period (candle closes). Start one period back so the first
+    # "+= period" below yields the next aligned boundary.
+    next_deadline = time.monotonic() + (-time.time()) % period - period
 
     iteration = 0
     while True:
@@ -892,7 +1201,13 @@ def main():
             analyze_once(iteration)
         except Exception as e:
             logger.exception(f"Error in main loop: {e}")
-        time.sleep(cfg.LIVE_POLL_SECONDS)
+        # drift-corrected: period is measured between deadlines, not after the work
+        next_deadline += period
+        now = time.monotonic()
+        if next_deadline < now:
+            # overran one or more ticks: skip them instead of bursting
+            next_deadline += ((now - next_deadline) // period + 1) * period
+        time.sleep(next_deadline - now)
 
 if __name__ == "__main__":
     main()
@@ -5,26 +5,167 @@ SmartTrader Market Data Provider Interface
 - Fallback mechanism (wallex → coingecko → coincap)
 """
 
-import os
 import logging
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta, timezone
-from dataclasses import dataclass
-
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from wallex_client import WallexClient, soa_to_candles
+
+try:
+    import orjson  # type: ignore
+
+    def _json_loads(content: bytes) -> Any:
+        return orjson.loads(content)
+except ImportError:  # pragma: no cover - orjson is optional
+    import json
 
-from wallex_client import WallexClient
+    def _json_loads(content: bytes) -> Any:
+        return json.loads(content)
 
 logger = logging.getLogger(__name__)
 
+# =====================================================================
+# Shared HTTP session (keep-alive + connection pool for public providers)
+# =====================================================================
+
+_http_session: Optional[requests.Session] = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """
+    One pooled requests.Session shared by the CoinGecko/CoinCap providers,
+    so TCP/TLS connections are reused across calls and provider instances.
+    """
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=4,
+                    pool_maxsize=10,
+                    max_retries=Retry(
+                        total=3,
+                        backoff_factor=0.3,
+                        status_forcelist=[429, 500, 502, 503, 504],
+                        allowed_methods=["GET"],
+                    ),
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({
+                    "Accept": "application/json",
+                    "User-Agent": "SmartTrader/1.0",
+                    "Accept-Encoding": "gzip",
+                })
+                _http_session = session
+    return _http_session
+
+
+# =====================================================================
+# Column (SoA) candle layout
+# =====================================================================
+
+# Price/volume columns are float64, "time" is int64 (unix seconds).
+_SOA_PRICE_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+def candles_to_soa(candles: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Build {time, open, high, low, close, volume} column arrays from normalized
+    candle dicts in one pass (contiguous arrays for the indicator kernels).
+    """
+    n = len(candles)
+    soa = {"time": np.empty(n, dtype=np.int64)}
+    for key in _SOA_PRICE_FIELDS:
+        soa[key] = np.empty(n, dtype=np.float64)
+    t, o, h, l, c, v = (soa["time"], soa["open"], soa["high"],
+                        soa["low"], soa["close"], soa["volume"])
+    for i, row in enumerate(candles):
+        t[i] = row["time"]
+        o[i] = row["open"]
+        h[i] = row["high"]
+        l[i] = row["low"]
+        c[i] = row["close"]
+        v[i] = row.get("volume") or 0.0
+    return soa
+
+
+# =====================================================================
+# Static symbol / timeframe maps
+# =====================================================================
+
+# CoinGecko /ohlc "days" window per timeframe (smallest window that covers it)
+_CG_TF_TO_DAYS = {"1": 1, "5": 1, "60": 7, "240": 30, "D": 365}
+_CC_INTERVAL_MAP = {"1": "m1", "5": "m5", "60": "h1", "240": "h4", "D": "d1"}
+
+
+@lru_cache(maxsize=128)
+def _resolve_coin_id(symbol: str) -> str:
+    """CoinGecko/CoinCap asset id for a trading symbol (simplified: BTC only)."""
+    if "BTC" in symbol.upper():
+        return "bitcoin"
+    return "bitcoin"  # Default to BTC
+
+
 # =====================================================================
 # Provider Interface
 # =====================================================================
 
 
+# Adaptive per-provider timeouts (EWMA of call latency) and fail-streak blackout
+PROVIDER_TIMEOUT_DEFAULT = (3.0, 10.0)  # (connect, read) seconds before any sample
+PROVIDER_TIMEOUT_FLOOR = (1.0, 2.0)
+PROVIDER_LATENCY_ALPHA = 0.2
+PROVIDER_BLACKOUT_MAX = 60.0
+
+
 class MarketDataProvider:
     """Base interface for market data providers."""
 
+    # health state; assigned per instance on first record_call()
+    _latency_ewma: Optional[float] = None
+    _fail_streak: int = 0
+    _blackout_until: float = 0.0
+
+    def request_timeout(self) -> Tuple[float, float]:
+        """(connect, read) timeout derived from the latency EWMA, capped at the defaults."""
+        ewma = self._latency_ewma
+        if ewma is None:
+            return PROVIDER_TIMEOUT_DEFAULT
+        return (
+            min(PROVIDER_TIMEOUT_DEFAULT[0], max(PROVIDER_TIMEOUT_FLOOR[0], ewma * 2)),
+            min(PROVIDER_TIMEOUT_DEFAULT[1], max(PROVIDER_TIMEOUT_FLOOR[1], ewma * 3)),
+        )
+
+    def record_call(self, elapsed: float, ok: bool) -> None:
+        """Update latency EWMA (successful calls) and the consecutive-failure blackout."""
+        if ok:
+            ewma = self._latency_ewma
+            self._latency_ewma = elapsed if ewma is None else (
+                (1 - PROVIDER_LATENCY_ALPHA) * ewma + PROVIDER_LATENCY_ALPHA * elapsed
+            )
+            self._fail_streak = 0
+            self._blackout_until = 0.0
+        else:
+            self._fail_streak += 1
+            self._blackout_until = time.time() + min(PROVIDER_BLACKOUT_MAX, 2.0 ** self._fail_streak)
+
+    def available(self) -> bool:
+        """False while the provider is in a fail-streak blackout."""
+        return time.time() >= self._blackout_until
+
     def get_candles(self, symbol: str, tf: str, limit: int) -> Optional[List[Dict[str, Any]]]:
         """Get OHLCV candles. Returns normalized format: [{time, open, high, low, close, volume}]"""
         raise NotImplementedError
@@ -59,10 +200,17 @@ class WallexProvider(MarketDataProvider):
 
     def get_candles(self, symbol: str, tf: str, limit: int) -> Optional[List[Dict[str, Any]]]:
         """Get candles from Wallex."""
-        candles = self.client.get_candles(symbol, tf, limit)
-        if not candles:
+        soa = self.get_candles_soa(symbol, tf, limit)
+        if soa is None:
             return None
-        return [self.normalize_candle(c) for c in candles]
+        return soa_to_candles(soa)
+
+    def get_candles_soa(self, symbol: str, tf: str, limit: int) -> Optional[Dict[str, np.ndarray]]:
+        """Get candles from Wallex as column arrays (time:int64, OHLCV:float64)."""
+        soa = self.client.get_candles_soa(symbol, tf, limit)
+        if soa is None or not len(soa["time"]):
+            return None
+        return soa
 
     def get_ticker(self, symbol: str) -> Optional[Dict[str, Any]]:
         """Get ticker from Wallex."""
@@ -90,55 +238,78 @@ class CoinGeckoProvider(MarketDataProvider):
 
     BASE_URL = "https://api.coingecko.com/api/v3"
 
+    def __init__(self):
+        self.session = get_http_session()
+        # (url, days) -> (ETag, Last-Modified, decoded OHLC array) for conditional GETs
+        self._http_cache: Dict[tuple, Tuple[str, str, np.ndarray]] = {}
+
+    def _get_ohlc(self, coin_id: str, days: int) -> Optional[np.ndarray]:
+        """
+        OHLC rows as a float64 (n, 5) array. Sends If-None-Match/If-Modified-Since
+        from the previous response; a 304 reuses the cached array without re-parsing.
+        """
+        url = f"{self.BASE_URL}/coins/{coin_id}/ohlc"
+        params = {"vs_currency": "usd", "days": days}
+        key = (url, days)
+        cached = self._http_cache.get(key)
+        headers = {}
+        if cached:
+            if cached[0]:
+                headers["If-None-Match"] = cached[0]
+            if cached[1]:
+                headers["If-Modified-Since"] = cached[1]
+
+        resp = self.session.get(url, params=params, headers=headers, timeout=self.request_timeout())
+        if resp.status_code == 304 and cached:
+            return cached[2]
+        resp.raise_for_status()
+        data = _json_loads(resp.content)
+        if not data:
+            return None
+
+        arr = np.asarray(data, dtype=np.float64)
+        etag = resp.headers.get("ETag", "")
+        last_modified = resp.headers.get("Last-Modified", "")
+        if etag or last_modified:
+            self._http_cache[key] = (etag, last_modified, arr)
+        return arr
+
     def get_candles(self, symbol: str, tf: str, limit: int) -> Optional[List[Dict[str, Any]]]:
         """Get candles from CoinGecko."""
         # Map symbol to CoinGecko ID (simplified: assume BTC)
-        coin_id = "bitcoin"  # Default to BTC
-        if "BTC" in symbol.upper():
-            coin_id = "bitcoin"
-
-        # Map timeframe
-        tf_map = {"1": "1m", "5": "5m", "60": "1h", "240": "4h", "D": "1d"}
-        days = max(1, limit // 1440)  # Rough estimate
+        coin_id = _resolve_coin_id(symbol)
+        days = _CG_TF_TO_DAYS.get(tf, 1)
 
         try:
-            url = f"{self.BASE_URL}/coins/{coin_id}/ohlc"
-            params = {"vs_currency": "usd", "days": min(days, 365)}
-            resp = requests.get(url, params=params, timeout=10)
-            resp.raise_for_status()
-            data = resp.json()
-
-            if not data:
+            ohlc = self._get_ohlc(coin_id, days)
+            if ohlc is None:
                 return None
 
             # CoinGecko format: [timestamp, open, high, low, close]
-            candles = []
-            for row in data[-limit:]:
-                candles.append({
-                    "time": row[0] // 1000,  # Convert ms to seconds
-                    "open": row[1],
-                    "high": row[2],
-                    "low": row[3],
-                    "close": row[4],
-                    "volume": 0.0,  # CoinGecko OHLC doesn't include volume
-                })
-            return candles
+            arr = ohlc[-limit:]
+            soa = {
+                "time": (arr[:, 0].astype(np.int64) // 1000),  # Convert ms to seconds
+                "open": arr[:, 1],
+                "high": arr[:, 2],
+                "low": arr[:, 3],
+                "close": arr[:, 4],
+                "volume": np.zeros(len(arr)),  # CoinGecko OHLC doesn't include volume
+            }
+            return soa_to_candles(soa)
         except Exception as e:
             logger.warning(f"CoinGecko provider error: {e}")
             return None
 
     def get_ticker(self, symbol: str) -> Optional[Dict[str, Any]]:
         """Get ticker from CoinGecko."""
-        coin_id = "bitcoin"
-        if "BTC" in symbol.upper():
-            coin_id = "bitcoin"
+        coin_id = _resolve_coin_id(symbol)
 
         try:
             url = f"{self.BASE_URL}/simple/price"
             params = {"ids": coin_id, "vs_currencies": "usd"}
-            resp = requests.get(url, params=params, timeout=10)
+            resp = self.session.get(url, params=params, timeout=self.request_timeout())
             resp.raise_for_status()
-            data = resp.json()
+            data = _json_loads(resp.content)
             price = data.get(coin_id, {}).get("usd")
             if price:
                 return {"last": price, "close": price}
@@ -162,55 +333,63 @@ class CoinCapProvider(MarketDataProvider):
 
     BASE_URL = "https://api.coincap.io/v2"
 
+    def __init__(self):
+        self.session = get_http_session()
+
     def get_candles(self, symbol: str, tf: str, limit: int) -> Optional[List[Dict[str, Any]]]:
         """Get candles from CoinCap."""
+        soa = self.get_candles_soa(symbol, tf, limit)
+        if soa is None:
+            return None
+        return soa_to_candles(soa)
+
+    def get_candles_soa(self, symbol: str, tf: str, limit: int) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Get CoinCap history as column arrays. History points are price-only,
+        so open/high/low/close alias the same price array (treat as read-only).
+        """
         # CoinCap uses asset IDs
-        asset_id = "bitcoin"  # Default
-        if "BTC" in symbol.upper():
-            asset_id = "bitcoin"
+        asset_id = _resolve_coin_id(symbol)
 
         try:
             # CoinCap doesn't have direct OHLC endpoint in free tier
             # Use history endpoint instead
             url = f"{self.BASE_URL}/assets/{asset_id}/history"
-            interval_map = {"1": "m1", "5": "m5", "60": "h1", "240": "h4", "D": "d1"}
-            interval = interval_map.get(tf, "h1")
+            interval = _CC_INTERVAL_MAP.get(tf, "h1")
             params = {"interval": interval}
-            resp = requests.get(url, params=params, timeout=10)
+            resp = self.session.get(url, params=params, timeout=self.request_timeout())
             resp.raise_for_status()
-            data = resp.json()
+            data = _json_loads(resp.content)
 
             if not data or "data" not in data:
                 return None
 
             history = data["data"][-limit:]
-            candles = []
-            for h in history:
-                price = float(h.get("priceUsd", 0))
-                candles.append({
-                    "time": int(h.get("time", 0)) // 1000,
-                    "open": price,
-                    "high": price,
-                    "low": price,
-                    "close": price,
-                    "volume": float(h.get("volumeUsd", 0)),
-                })
-            return candles
+            n = len(history)
+            t = np.fromiter((int(h.get("time", 0)) // 1000 for h in history), dtype=np.int64, count=n)
+            price = np.fromiter((float(h.get("priceUsd", 0)) for h in history), dtype=np.float64, count=n)
+            volume = np.fromiter((float(h.get("volumeUsd", 0)) for h in history), dtype=np.float64, count=n)
+            return {
+                "time": t,
+                "open": price,
+                "high": price,
+                "low": price,
+                "close": price,
+                "volume": volume,
+            }
         except Exception as e:
             logger.warning(f"CoinCap provider error: {e}")
             return None
 
     def get_ticker(self, symbol: str) -> Optional[Dict[str, Any]]:
         """Get ticker from CoinCap."""
-        asset_id = "bitcoin"
-        if "BTC" in symbol.upper():
-            asset_id = "bitcoin"
+        asset_id = _resolve_coin_id(symbol)
 
         try:
             url = f"{self.BASE_URL}/assets/{asset_id}"
-            resp = requests.get(url, timeout=10)
+            resp = self.session.get(url, timeout=self.request_timeout())
             resp.raise_for_status()
-            data = resp.json()
+            data = _json_loads(resp.content)
             if "data" in data:
                 price = float(data["data"].get("priceUsd", 0))
                 return {"last": price, "close": price}
@@ -224,6 +403,26 @@ class CoinCapProvider(MarketDataProvider):
         return raw
 
 
+# =====================================================================
+# Provider registry (process-wide instances)
+# =====================================================================
+
+_PROVIDER_CLASSES = {
+    "wallex": WallexProvider,
+    "coingecko": CoinGeckoProvider,
+    "coincap": CoinCapProvider,
+}
+
+
+@lru_cache(maxsize=None)
+def _provider_instance(name: str) -> MarketDataProvider:
+    """
+    Shared provider instance per name, so WallexClient (rate limiter, session)
+    and the pooled HTTP session survive across calls instead of being rebuilt.
+    """
+    return _PROVIDER_CLASSES[name]()
+
+
 # =====================================================================
 # Unified Fetcher
 # =====================================================================
@@ -241,16 +440,12 @@ def get_market_data(
     """
     providers = []
     if provider:
-        provider_map = {
-            "wallex": WallexProvider,
-            "coingecko": CoinGeckoProvider,
-            "coincap": CoinCapProvider,
-        }
-        if provider.lower() in provider_map:
-            providers = [provider_map[provider.lower()]()]
+        name = provider.lower()
+        if name in _PROVIDER_CLASSES:
+            providers = [_provider_instance(name)]
     else:
         # Auto-select with fallback
-        providers = [WallexProvider(), CoinGeckoProvider(), CoinCapProvider()]
+        providers = [_provider_instance(name) for name in ("wallex", "coingecko", "coincap")]
 
     for prov in providers:
         try:
@@ -271,7 +466,7 @@ def get_market_data(
 # =====================================================================
 
 
-@dataclass
+@dataclass(slots=True)
 class MarketDataResponse:
     """Structured response from market data gateway."""
     data: Optional[List[Dict[str, Any]]]
@@ -281,23 +476,134 @@ class MarketDataResponse:
     error: Optional[str] = None
 
 
+# Worker threads for hedged provider requests (one per provider)
+_GATEWAY_POOL = ThreadPoolExecutor(max_workers=3, thread_name_prefix="md-gw")
+# Outer per-timeframe tasks of get_candles_multi (kept apart from _GATEWAY_POOL,
+# whose workers those tasks wait on)
+_MULTI_TF_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="md-tf")
+
+# ---------------------------------------------------------------------
+# Response cache (process-wide; gateways are created per request in web_app)
+# ---------------------------------------------------------------------
+GATEWAY_CANDLE_TTL_MAX = 300.0   # seconds; caps tf/4 for long timeframes
+GATEWAY_TICKER_TTL = 5.0
+# symbol comes straight from the public ?symbol= query: bound the entry count
+GATEWAY_CACHE_MAX_ENTRIES = 256
+
+_TF_SECONDS = {"1": 60, "5": 300, "15": 900, "30": 1800, "60": 3600, "240": 14400, "D": 86400}
+
+# key -> (expires_at, response), least recently used first
+_cache: "OrderedDict[tuple, Tuple[float, MarketDataResponse]]" = OrderedDict()
+_cache_lock = threading.Lock()
+# key -> [lock, waiters]; removed again once the last waiter is done
+_inflight: Dict[tuple, list] = {}
+
+
+def _candle_ttl(tf: str) -> float:
+    """60 s for 1m candles, tf/4 otherwise (capped at GATEWAY_CANDLE_TTL_MAX)."""
+    tf_sec = _TF_SECONDS.get(str(tf), 3600)
+    if tf_sec <= 60:
+        return 60.0
+    return min(tf_sec / 4.0, GATEWAY_CANDLE_TTL_MAX)
+
+
+def _cache_get(key: tuple) -> Optional[MarketDataResponse]:
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None or entry[0] <= time.time():
+            return None
+        _cache.move_to_end(key)
+        return entry[1]
+
+
+def _cache_put(key: tuple, expires_at: float, resp: MarketDataResponse) -> None:
+    with _cache_lock:
+        now = time.time()
+        for k in [k for k, (exp, _) in _cache.items() if exp <= now]:
+            del _cache[k]
+        _cache[key] = (expires_at, resp)
+        _cache.move_to_end(key)
+        while len(_cache) > GATEWAY_CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+
+def _cached_fetch(key: tuple, ttl: float, fetch) -> MarketDataResponse:
+    """
+    Return a fresh cached response for key (same time bucket) or call fetch().
+    Concurrent callers for the same key wait on one in-flight request.
+    Failed/empty responses are not cached.
+    """
+    hit = _cache_get(key)
+    if hit is None:
+        with _cache_lock:
+            slot = _inflight.setdefault(key, [threading.Lock(), 0])
+            slot[1] += 1
+        try:
+            with slot[0]:
+                hit = _cache_get(key)
+                if hit is None:
+                    resp = fetch()
+                    if not resp.data:
+                        return resp
+                    # entries expire at the end of the current ttl bucket
+                    _cache_put(key, (time.time() // ttl + 1) * ttl, resp)
+                    hit = resp
+        finally:
+            with _cache_lock:
+                slot[1] -= 1
+                if slot[1] == 0:
+                    del _inflight[key]
+    # callers get their own list; the cached one is never handed out
+    return replace(hit, data=list(hit.data))
+
+
 class MarketDataGateway:
     """
     Unified gateway for market data with explicit provider tracking and logging.
     Used by API endpoints. Trading engine (main.py) continues using WallexClient directly.
     """
 
+    # seconds the primary provider gets before fallbacks are hedged in parallel
+    hedge_delay: float = 0.4
+
+    # Auto-select order and the confidence reported for each position
+    _ORDER: Tuple[str, ...] = ("wallex", "coingecko", "coincap")
+    _CONFIDENCE: Tuple[float, ...] = (1.0, 0.8, 0.6)
+
     def __init__(self, preferred_provider: Optional[str] = None):
         """
         Initialize gateway.
         preferred_provider: "wallex" | "coingecko" | "coincap" | None (auto-select)
         """
         self.preferred_provider = preferred_provider
-        self._providers = {
-            "wallex": WallexProvider,
-            "coingecko": CoinGeckoProvider,
-            "coincap": CoinCapProvider,
-        }
+        self._providers = dict(_PROVIDER_CLASSES)
+        self._instances: Dict[str, MarketDataProvider] = {}
+
+    def _get(self, name: str) -> MarketDataProvider:
+        """Provider instance for name, created once (shared process-wide for the built-in classes)."""
+        prov = self._instances.get(name)
+        if prov is None:
+            cls = self._providers[name]
+            prov = _provider_instance(name) if cls is _PROVIDER_CLASSES.get(name) else cls()
+            self._instances[name] = prov
+        return prov
+
+    @staticmethod
+    def _call(prov: MarketDataProvider, method: str, *args):
+        """Call prov.<method>(*args), feeding latency/failure into the provider's health state."""
+        t0 = time.monotonic()
+        ok = False
+        try:
+            result = getattr(prov, method)(*args)
+            ok = bool(result)
+            return result
+        finally:
+            prov.record_call(time.monotonic() - t0, ok)
+
+    def _auto_order(self) -> List[int]:
+        """Indices into _ORDER that are not blacked out (all of them if every provider is)."""
+        order = [idx for idx, name in enumerate(self._ORDER) if self._get(name).available()]
+        return order or list(range(len(self._ORDER)))
 
     def get_candles(
         self,
@@ -309,12 +615,45 @@ class MarketDataGateway:
         """
         Get candles with explicit provider tracking and fallback logging.
         Returns MarketDataResponse with provider metadata.
+        Successful responses are cached per (provider, symbol, tf, limit) for _candle_ttl(tf).
+        """
+        provider_name = required_provider or self.preferred_provider
+        return _cached_fetch(
+            ("candles", (provider_name or "auto").lower(), symbol, str(tf), int(limit)),
+            _candle_ttl(tf),
+            lambda: self._get_candles_uncached(symbol, tf, limit, required_provider),
+        )
+
+    def get_candles_multi(
+        self,
+        symbol: str,
+        tfs: List[str],
+        limit: int,
+        required_provider: Optional[str] = None,
+    ) -> Dict[str, MarketDataResponse]:
         """
+        Fetch several timeframes concurrently; wall time is the slowest TF, not the sum.
+        Wallex requests stay within quota via the client's shared RateLimiter.
+        """
+        futures = {
+            tf: _MULTI_TF_POOL.submit(self.get_candles, symbol, tf, limit, required_provider)
+            for tf in dict.fromkeys(tfs)
+        }
+        return {tf: fut.result() for tf, fut in futures.items()}
+
+    def _get_candles_uncached(
+        self,
+        symbol: str,
+        tf: str,
+        limit: int,
+        required_provider: Optional[str] = None,
+    ) -> MarketDataResponse:
         provider_name = required_provider or self.preferred_provider
 
         if provider_name:
             # Single provider requested
-            if provider_name.lower() not in self._providers:
+            name = provider_name.lower()
+            if name not in self._providers:
                 logger.error(f"Unknown provider requested: {provider_name}")
                 return MarketDataResponse(
                     data=None,
@@ -325,14 +664,14 @@ class MarketDataGateway:
                 )
 
             try:
-                prov = self._providers[provider_name.lower()]()
+                prov = self._get(name)
                 logger.info(f"[Gateway] Attempting {provider_name} for {symbol} {tf}")
-                candles = prov.get_candles(symbol, tf, limit)
+                candles = self._call(prov, "get_candles", symbol, tf, limit)
                 if candles:
                     logger.info(f"[Gateway] ✓ {provider_name} succeeded: {len(candles)} candles")
                     return MarketDataResponse(
                         data=candles,
-                        provider=provider_name.lower(),
+                        provider=name,
                         confidence=1.0,
                         fallback_used=False,
                     )
@@ -340,7 +679,7 @@ class MarketDataGateway:
                     logger.warning(f"[Gateway] ✗ {provider_name} returned no data")
                     return MarketDataResponse(
                         data=None,
-                        provider=provider_name.lower(),
+                        provider=name,
                         confidence=0.0,
                         fallback_used=False,
                         error=f"{provider_name} returned no data",
@@ -349,47 +688,74 @@ class MarketDataGateway:
                 logger.error(f"[Gateway] ✗ {provider_name} failed: {e}")
                 return MarketDataResponse(
                     data=None,
-                    provider=provider_name.lower(),
+                    provider=name,
                     confidence=0.0,
                     fallback_used=False,
                     error=str(e),
                 )
 
-        # Auto-select with fallback (wallex → coingecko → coincap)
-        providers_order = ["wallex", "coingecko", "coincap"]
+        # Auto-select with hedged fallback (wallex → coingecko → coincap):
+        # primary gets a head start; if it has not answered within hedge_delay
+        # (or failed), the fallbacks are fired in parallel and the first
+        # non-empty answer wins. Providers in a fail-streak blackout are skipped.
+        providers_order = self._ORDER
+        order = self._auto_order()
         attempted = []
 
-        for idx, prov_name in enumerate(providers_order):
-            try:
-                prov = self._providers[prov_name]()
-                logger.info(f"[Gateway] Attempting {prov_name} (attempt {idx + 1}/{len(providers_order)}) for {symbol} {tf}")
-                attempted.append(prov_name)
-
-                candles = prov.get_candles(symbol, tf, limit)
-                if candles:
-                    confidence = 1.0 - (idx * 0.2)  # Primary = 1.0, first fallback = 0.8, second = 0.6
-                    fallback_used = idx > 0
-
-                    if fallback_used:
-                        logger.warning(
-                            f"[Gateway] ✓ {prov_name} succeeded (FALLBACK, attempt {idx + 1}). "
-                            f"Previous attempts: {', '.join(attempted[:-1])}"
-                        )
-                    else:
-                        logger.info(f"[Gateway] ✓ {prov_name} succeeded (PRIMARY)")
-
-                    return MarketDataResponse(
-                        data=candles,
-                        provider=prov_name,
-                        confidence=confidence,
-                        fallback_used=fallback_used,
+        def _fetch(prov_name: str):
+            return self._call(self._get(prov_name), "get_candles", symbol, tf, limit)
+
+        pending = {}
+        first = order[0]
+        logger.info(f"[Gateway] Attempting {providers_order[first]} (primary) for {symbol} {tf}")
+        attempted.append(providers_order[first])
+        pending[_GATEWAY_POOL.submit(_fetch, providers_order[first])] = first
+        hedged = False
+
+        while pending:
+            timeout = None if hedged else self.hedge_delay
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for fut in done:
+                idx = pending.pop(fut)
+                prov_name = providers_order[idx]
+                try:
+                    candles = fut.result()
+                except Exception as e:
+                    logger.warning(f"[Gateway] ✗ {prov_name} failed: {e}")
+                    continue
+                if not candles:
+                    logger.warning(f"[Gateway] ✗ {prov_name} returned no data")
+                    continue
+
+                for other in pending:
+                    other.cancel()
+
+                confidence = self._CONFIDENCE[idx]
+                fallback_used = idx > 0
+                if fallback_used:
+                    logger.warning(
+                        f"[Gateway] ✓ {prov_name} succeeded (FALLBACK). "
+                        f"Attempted: {', '.join(attempted)}"
                     )
                 else:
-                    logger.warning(f"[Gateway] ✗ {prov_name} returned no data, trying next...")
+                    logger.info(f"[Gateway] ✓ {prov_name} succeeded (PRIMARY)")
 
-            except Exception as e:
-                logger.warning(f"[Gateway] ✗ {prov_name} failed: {e}, trying next...")
-                continue
+                return MarketDataResponse(
+                    data=candles,
+                    provider=prov_name,
+                    confidence=confidence,
+                    fallback_used=fallback_used,
+                )
+
+            if not hedged:
+                # primary slow or failed → hedge to the fallbacks
+                hedged = True
+                for idx in order[1:]:
+                    prov_name = providers_order[idx]
+                    logger.info(f"[Gateway] Hedging to {prov_name} for {symbol} {tf}")
+                    attempted.append(prov_name)
+                    pending[_GATEWAY_POOL.submit(_fetch, prov_name)] = idx
 
         # All providers failed
         logger.error(
@@ -412,11 +778,25 @@ class MarketDataGateway:
         """
         Get ticker with explicit provider tracking.
         Returns MarketDataResponse with ticker data in .data field.
+        Successful responses are cached for GATEWAY_TICKER_TTL seconds.
         """
         provider_name = required_provider or self.preferred_provider
+        return _cached_fetch(
+            ("ticker", (provider_name or "auto").lower(), symbol),
+            GATEWAY_TICKER_TTL,
+            lambda: self._get_ticker_uncached(symbol, required_provider),
+        )
+
+    def _get_ticker_uncached(
+        self,
+        symbol: str,
+        required_provider: Optional[str] = None,
+    ) -> MarketDataResponse:
+        provider_name = required_provider or self.preferred_provider
 
         if provider_name:
-            if provider_name.lower() not in self._providers:
+            name = provider_name.lower()
+            if name not in self._providers:
                 return MarketDataResponse(
                     data=None,
                     provider="none",
@@ -426,12 +806,12 @@ class MarketDataGateway:
                 )
 
             try:
-                prov = self._providers[provider_name.lower()]()
-                ticker = prov.get_ticker(symbol)
+                prov = self._get(name)
+                ticker = self._call(prov, "get_ticker", symbol)
                 if ticker:
                     return MarketDataResponse(
                         data=[ticker],  # Wrap in list for consistency
-                        provider=provider_name.lower(),
+                        provider=name,
                         confidence=1.0,
                         fallback_used=False,
                     )
@@ -439,15 +819,16 @@ class MarketDataGateway:
                 logger.error(f"[Gateway] Ticker fetch from {provider_name} failed: {e}")
 
         # Fallback chain
-        for idx, prov_name in enumerate(["wallex", "coingecko", "coincap"]):
+        for idx in self._auto_order():
+            prov_name = self._ORDER[idx]
             try:
-                prov = self._providers[prov_name]()
-                ticker = prov.get_ticker(symbol)
+                prov = self._get(prov_name)
+                ticker = self._call(prov, "get_ticker", symbol)
                 if ticker:
                     return MarketDataResponse(
                         data=[ticker],
                         provider=prov_name,
-                        confidence=1.0 - (idx * 0.2),
+                        confidence=self._CONFIDENCE[idx],
                         fallback_used=idx > 0,
                     )
             except Exception:
@@ -0,0 +1,32 @@
+# numba_compat.py
+
+"""
+================================================================================
+Optional Numba support
+================================================================================
+- If numba is installed, njit/prange are re-exported unchanged.
+- Otherwise njit becomes a no-op decorator and prange falls back to range,
+  so every kernel still runs (slower) as plain Python/NumPy code.
+================================================================================
+"""
+
+try:
+    from numba import njit, prange  # type: ignore
+
+    NUMBA_AVAILABLE = True
+except Exception:  # pragma: no cover - depends on the deploy environment
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """
+        No-op replacement for numba.njit.
+        Supports both @njit and @njit(cache=True, ...) forms.
+        """
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def _wrap(fn):
+            return fn
+
+        return _wrap
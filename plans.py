@@ -6,14 +6,19 @@ SmartTrader Plans Module
 - FastAPI dependencies for plan checks
 """
 
+import logging
+import threading
+import time
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, List, Tuple
 
 from fastapi import Depends, HTTPException, status
 
-from database_setup import get_db_connection, USER_PLANS_TABLE
+from database_setup import acquire, USER_PLANS_TABLE
 from auth import get_current_user
 
+logger = logging.getLogger(__name__)
+
 # =====================================================================
 # Plan Hierarchy
 # =====================================================================
@@ -24,39 +29,133 @@ PLAN_LEVELS = {
     "PROFESSIONAL": 2,
 }
 
+# _PLAN_ACCESS[user_plan][required_plan] -> bool, built once from PLAN_LEVELS
+_PLAN_ACCESS = {
+    user: {required: level >= req_level for required, req_level in PLAN_LEVELS.items()}
+    for user, level in PLAN_LEVELS.items()
+}
+
 # =====================================================================
 # Plan Management
 # =====================================================================
 
 
+# SQL built once at import; the same str objects hit the per-connection statement cache
+_SELECT_ACTIVE_PLAN_SQL = (
+    "SELECT id, user_id, plan, starts_at, ends_at, is_active, created_at, ends_at_epoch "
+    f"FROM {USER_PLANS_TABLE} "
+    "WHERE user_id = ? AND is_active = 1 "
+    "ORDER BY created_at DESC "
+    "LIMIT 1"
+)
+# Latest active plan per user for a batch of ids ({} = "?,?,...")
+_SELECT_ACTIVE_PLANS_SQL = (
+    "SELECT id, user_id, plan, starts_at, ends_at, is_active, created_at, ends_at_epoch FROM ("
+    "SELECT id, user_id, plan, starts_at, ends_at, is_active, created_at, ends_at_epoch, "
+    "ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY created_at DESC) AS rn "
+    f"FROM {USER_PLANS_TABLE} "
+    "WHERE is_active = 1 AND user_id IN ({})"
+    ") WHERE rn = 1"
+)
+# SQLite's default host-parameter limit is 999
+PLAN_BATCH_CHUNK = 500
+
+_DEACTIVATE_PLANS_SQL = f"UPDATE {USER_PLANS_TABLE} SET is_active = 0 WHERE user_id = ? AND is_active = 1"
+_INSERT_PLAN_SQL = (
+    f"INSERT INTO {USER_PLANS_TABLE} (user_id, plan, starts_at, ends_at, ends_at_epoch, is_active) "
+    "VALUES (?, ?, ?, ?, ?, 1)"
+)
+
+# In-process cache of the active-plan row per user (plans change rarely).
+# set_user_plan invalidates locally; other workers see the change within the TTL.
+PLAN_CACHE_TTL = 120.0
+PLAN_CACHE_MAX = 10_000
+
+_plan_cache: Dict[int, Tuple[Optional[Dict[str, Any]], float]] = {}
+_plan_cache_lock = threading.Lock()
+
+
+def _load_user_plan(user_id: int) -> Optional[Dict[str, Any]]:
+    with acquire() as conn:
+        if not conn:
+            return None
+        row = conn.execute(_SELECT_ACTIVE_PLAN_SQL, (user_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def invalidate_user_plan(user_id: int) -> None:
+    with _plan_cache_lock:
+        _plan_cache.pop(user_id, None)
+
+
+def _cache_plan(user_id: int, plan: Optional[Dict[str, Any]], now: float) -> None:
+    with _plan_cache_lock:
+        if len(_plan_cache) >= PLAN_CACHE_MAX:
+            _plan_cache.pop(next(iter(_plan_cache)), None)
+        _plan_cache[user_id] = (plan, now + PLAN_CACHE_TTL)
+
+
 def get_user_plan(user_id: int) -> Optional[Dict[str, Any]]:
     """Get active plan for user."""
-    conn = get_db_connection()
-    if not conn:
-        return None
-    try:
-        row = conn.execute(
-            f"""
-            SELECT id, user_id, plan, starts_at, ends_at, is_active, created_at
-            FROM {USER_PLANS_TABLE}
-            WHERE user_id = ? AND is_active = 1
-            ORDER BY created_at DESC
-            LIMIT 1
-            """,
-            (user_id,),
-        ).fetchone()
-        if row:
-            plan = dict(row)
-            # Check if plan has expired
-            if plan.get("ends_at"):
-                ends_at = datetime.fromisoformat(plan["ends_at"].replace("Z", "+00:00"))
-                if ends_at < datetime.now(timezone.utc):
-                    # Plan expired, return FREE
-                    return {"plan": "FREE", "is_active": True}
-            return plan
-        return None
-    finally:
-        conn.close()
+    now = time.monotonic()
+    hit = _plan_cache.get(user_id)
+    if hit is not None and hit[1] > now:
+        plan = hit[0]
+    else:
+        plan = _load_user_plan(user_id)
+        _cache_plan(user_id, plan, now)
+    return _effective_plan(plan)
+
+
+def get_user_plans(user_ids: Iterable[int]) -> Dict[int, Optional[Dict[str, Any]]]:
+    """
+    Active plan for many users at once (same result per user as get_user_plan).
+    Cache misses are loaded with one SELECT per PLAN_BATCH_CHUNK ids.
+    """
+    now = time.monotonic()
+    rows: Dict[int, Optional[Dict[str, Any]]] = {}
+    missing: List[int] = []
+    for uid in dict.fromkeys(user_ids):
+        hit = _plan_cache.get(uid)
+        if hit is not None and hit[1] > now:
+            rows[uid] = hit[0]
+        else:
+            missing.append(uid)
+
+    if missing:
+        loaded: Dict[int, Dict[str, Any]] = {}
+        with acquire() as conn:
+            if conn:
+                for i in range(0, len(missing), PLAN_BATCH_CHUNK):
+                    chunk = missing[i:i + PLAN_BATCH_CHUNK]
+                    sql = _SELECT_ACTIVE_PLANS_SQL.format(",".join("?" * len(chunk)))
+                    for row in conn.execute(sql, chunk).fetchall():
+                        loaded[row["user_id"]] = dict(row)
+        for uid in missing:
+            plan = loaded.get(uid)
+            rows[uid] = plan
+            if conn:
+                _cache_plan(uid, plan, now)
+
+    return {uid: _effective_plan(plan) for uid, plan in rows.items()}
+
+
+def _effective_plan(plan: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if plan:
+        # Check if plan has expired (evaluated on every call, cached or not)
+        ends_at_epoch = plan.get("ends_at_epoch")
+        if ends_at_epoch is not None:
+            expired = ends_at_epoch < time.time()
+        elif plan.get("ends_at"):
+            ends_at = datetime.fromisoformat(plan["ends_at"].replace("Z", "+00:00"))
+            expired = ends_at < datetime.now(timezone.utc)
+        else:
+            expired = False
+        if expired:
+            # Plan expired, return FREE
+            return {"plan": "FREE", "is_active": True}
+        return dict(plan)
+    return None
 
 
 def assign_default_plan(user_id: int) -> bool:
@@ -72,38 +171,31 @@ def set_user_plan(user_id: int, plan: str, duration_days: Optional[int] = None)
     if plan not in PLAN_LEVELS:
         return False
 
-    conn = get_db_connection()
-    if not conn:
-        return False
-
-    try:
-        # Deactivate existing active plans
-        conn.execute(
-            f"UPDATE {USER_PLANS_TABLE} SET is_active = 0 WHERE user_id = ? AND is_active = 1",
-            (user_id,),
-        )
+    with acquire() as conn:
+        if not conn:
+            return False
 
         # Calculate ends_at
-        starts_at = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+        now = datetime.now(timezone.utc)
+        starts_at = now.isoformat().replace("+00:00", "Z")
         ends_at = None
+        ends_at_epoch = None
         if duration_days is not None:
-            ends_at = (datetime.now(timezone.utc) + timedelta(days=duration_days)).isoformat().replace("+00:00", "Z")
-
-        # Insert new plan
-        conn.execute(
-            f"""
-            INSERT INTO {USER_PLANS_TABLE} (user_id, plan, starts_at, ends_at, is_active)
-            VALUES (?, ?, ?, ?, 1)
-            """,
-            (user_id, plan, starts_at, ends_at),
-        )
-        conn.commit()
-        return True
-    except Exception as e:
-        print(f"Error setting user plan: {e}")
-        return False
-    finally:
-        conn.close()
+            ends = now + timedelta(days=duration_days)
+            ends_at = ends.isoformat().replace("+00:00", "Z")
+            ends_at_epoch = int(ends.timestamp())
+
+        try:
+            # One write transaction: take the write lock up front, deactivate, insert, commit
+            conn.execute("BEGIN IMMEDIATE")
+            with conn:
+                conn.execute(_DEACTIVATE_PLANS_SQL, (user_id,))
+                conn.execute(_INSERT_PLAN_SQL, (user_id, plan, starts_at, ends_at, ends_at_epoch))
+            invalidate_user_plan(user_id)
+            return True
+        except Exception:
+            logger.exception("set_user_plan failed for user=%s plan=%s", user_id, plan)
+            return False
 
 
 def has_plan_access(user_plan: Optional[Dict[str, Any]], required_plan: str) -> bool:
@@ -111,11 +203,9 @@ def has_plan_access(user_plan: Optional[Dict[str, Any]], required_plan: str) ->
     if not user_plan:
         return required_plan == "FREE"
 
-    user_plan_name = user_plan.get("plan", "FREE")
-    user_level = PLAN_LEVELS.get(user_plan_name, 0)
-    required_level = PLAN_LEVELS.get(required_plan, 0)
-
-    return user_level >= required_level
+    # unknown user plan counts as FREE; unknown required plan as level 0
+    row = _PLAN_ACCESS.get(user_plan.get("plan", "FREE"), _PLAN_ACCESS["FREE"])
+    return row.get(required_plan, True)
 
 
 # =====================================================================
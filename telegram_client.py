@@ -1,11 +1,48 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Dict, Optional, Any
-import html
+import json
+import queue
+import threading
+import time
+from functools import lru_cache
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Circuit breaker: after a failure, skip sends for min(60 * 2**failures, 3600) seconds
+BACKOFF_BASE_SECONDS = 60
+BACKOFF_MAX_SECONDS = 3600
+
+# Background sender: bounded queue (drop-oldest) and burst coalescing
+SEND_QUEUE_MAX = 1024
+COALESCE_MAX_MESSAGES = 10
+COALESCE_MAX_CHARS = 4000  # sendMessage text limit is 4096
+
+@lru_cache(maxsize=8)
+def _send_message_url(token: str) -> str:
+    return f"https://api.telegram.org/bot{token}/sendMessage"
+
+# sendMessage body: static part serialized once per chat_id, text spliced in per send
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+@lru_cache(maxsize=8)
+def _payload_prefix(chat_id) -> bytes:
+    return (
+        b'{"chat_id":' + json.dumps(chat_id).encode("utf-8") +
+        b',"parse_mode":"HTML","disable_web_page_preview":true,"text":'
+    )
+
+def _payload(chat_id, message: str) -> bytes:
+    return _payload_prefix(chat_id) + json.dumps(message, ensure_ascii=False).encode("utf-8") + b"}"
+
+# &, <, > -> entities in one pass (same output as html.escape(s, quote=False))
+_HTML_TABLE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
 
 def _escape_html(s: str) -> str:
     # Safe escaping for Telegram HTML parse_mode
-    return html.escape(str(s), quote=False)
+    if not isinstance(s, str):
+        s = str(s)
+    return s.translate(_HTML_TABLE)
 
 def format_smart_analysis(block: str) -> str:
     """
@@ -19,6 +56,40 @@ def format_smart_analysis(block: str) -> str:
 class TelegramClient:
     cfg: Dict[str, Any]
     logger: Optional[object] = None
+    enabled: bool = True
+    _failure_count: int = field(default=0, init=False, repr=False)
+    _next_try_ts: float = field(default=0.0, init=False, repr=False)
+    session: requests.Session = field(default_factory=requests.Session, repr=False)
+    _queue: "queue.Queue" = field(
+        default_factory=lambda: queue.Queue(maxsize=SEND_QUEUE_MAX), init=False, repr=False
+    )
+    _worker: Optional[threading.Thread] = field(default=None, init=False, repr=False)
+    _worker_lock: Any = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self):
+        # keep-alive HTTPS pool to api.telegram.org. Retries cover connection
+        # errors only: sendMessage is a POST, so it is not replayed on a
+        # read error or bad status (no duplicate messages).
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(total=2, backoff_factor=0.3),
+        )
+        self.session.mount("https://", adapter)
+
+    def available(self) -> bool:
+        """Cheap pre-check so callers can skip building messages while disabled or backing off."""
+        return self.enabled and time.time() >= self._next_try_ts
+
+    def _record_failure(self):
+        self._failure_count += 1
+        delay = min(BACKOFF_BASE_SECONDS * 2 ** self._failure_count, BACKOFF_MAX_SECONDS)
+        self._next_try_ts = time.time() + delay
+        self._log("warning", f"Telegram unreachable ({self._failure_count} failures); pausing sends for {delay}s.")
+
+    def _record_success(self):
+        self._failure_count = 0
+        self._next_try_ts = 0.0
 
     def _log(self, level: str, msg: str):
         if self.logger:
@@ -32,32 +103,33 @@ class TelegramClient:
                     pass
 
     def send(self, message: str, level: str = "INFO") -> bool:
+        if not self.available():
+            return False
         token = self.cfg.get("bot_token")
         chat_id = self.cfg.get("chat_id")
         if not token or not chat_id:
             self._log("warning", "TelegramClient.send skipped: missing token or chat_id.")
             return False
 
-        url = f"https://api.telegram.org/bot{token}/sendMessage"
-        payload = {
-            "chat_id": chat_id,
-            "text": message,
-            "parse_mode": "HTML",
-            "disable_web_page_preview": True,
-        }
+        url = _send_message_url(token)
         try:
-            resp = requests.post(url, json=payload, timeout=10)
+            body = _payload(chat_id, message)
+            resp = self.session.post(url, data=body, headers=_JSON_HEADERS, timeout=10)
             if resp.status_code != 200:
                 self._log("error", f"Telegram send failed [{resp.status_code}]: {resp.text}")
+                if resp.status_code == 429 or resp.status_code >= 500:
+                    self._record_failure()
                 return False
             data = resp.json()
             if not data.get("ok", False):
                 self._log("error", f"Telegram API error: {data}")
                 return False
+            self._record_success()
             self._log("info", f"Telegram message sent: level={level}")
             return True
         except requests.RequestException as e:
             self._log("exception", f"Telegram network error: {e}")
+            self._record_failure()
             return False
         except Exception as e:
             self._log("exception", f"Telegram unexpected error: {e}")
@@ -69,3 +141,69 @@ class TelegramClient:
         """
         msg = format_smart_analysis(raw_block)
         return self.send(msg, level="INFO")
+
+    # ------------------------------------------------------------------
+    # Non-blocking sends (background worker)
+    # ------------------------------------------------------------------
+
+    def send_async(self, message: str, level: str = "INFO") -> bool:
+        """
+        Queue a message for the background sender and return immediately.
+        When the queue is full the oldest pending message is dropped.
+        """
+        if not self.available():
+            return False
+        self._ensure_worker()
+        item = (message, level)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            self._log("warning", "Telegram send queue full; dropped the oldest message.")
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                return False
+        return True
+
+    def send_smart_analysis_async(self, raw_block: str) -> bool:
+        return self.send_async(format_smart_analysis(raw_block), level="INFO")
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._worker_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._drain, name="st-telegram", daemon=True)
+                    self._worker.start()
+
+    def _drain(self):
+        while True:
+            batch = [self._queue.get()]
+            # coalesce whatever piled up behind it into as few POSTs as possible
+            while len(batch) < COALESCE_MAX_MESSAGES:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for text, level in _coalesce(batch):
+                try:
+                    self.send(text, level)
+                except Exception as e:
+                    self._log("exception", f"Telegram background send error: {e}")
+
+
+def _coalesce(batch):
+    """Join consecutive (text, level) items into messages of at most COALESCE_MAX_CHARS."""
+    parts, size, level = [], 0, "INFO"
+    for text, lvl in batch:
+        if parts and size + 2 + len(text) > COALESCE_MAX_CHARS:
+            yield "\n\n".join(parts), level
+            parts, size = [], 0
+        parts.append(text)
+        size += len(text) + (2 if len(parts) > 1 else 0)
+        level = lvl
+    if parts:
+        yield "\n\n".join(parts), level
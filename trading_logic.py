@@ -5,19 +5,40 @@ Trading logic: decision engine, risk, and account model
 ================================================================================
 """
 
-from dataclasses import dataclass, field
-from typing import Dict, Optional, Tuple, List
+from dataclasses import dataclass, field, fields, MISSING
+from enum import IntEnum
+from typing import Dict, NamedTuple, Optional, Tuple, List
 import math
 
+import numpy as np
+
+from numba_compat import NUMBA_AVAILABLE
+from trading_logic_kernels import (
+    make_gate, pack_params, _gate_decide_batch, _gate_decide_batch_serial, _gate_decide_batch_numpy,
+    BATCH_PARALLEL_MIN_ROWS, regime_code, Regime, N_REGIMES, ACTION_HOLD, ACTION_BUY, ACTION_SELL,
+    REGIME_CODES, REGIME_HIGH, REGIME_OTHER, source_hash,
+)
+
+# AOT-built kernels (python build_kernels.py); no JIT work at startup when present.
+# An extension built from a different trading_logic_kernels.py is ignored, as
+# is a stale build from before the source_hash() export (*.so files are
+# gitignored, so a deploy's git reset leaves them in place).
+try:
+    import trading_kernels_aot as _aot  # type: ignore
+
+    _aot_hash = getattr(_aot, "source_hash", None)
+    KERNELS_AOT = _aot_hash is not None and _aot_hash() == source_hash()
+except ImportError:
+    KERNELS_AOT = False
+_gate_decide_rows = _aot.gate_decide_batch if KERNELS_AOT else _gate_decide_batch_serial
+
 
 def _clamp(x: float, lo: float, hi: float) -> float:
-    try:
-        return max(lo, min(hi, float(x)))
-    except Exception:
-        return lo
+    # callers pass floats; same expression as the kernels' clamp
+    return max(lo, min(hi, x))
 
 
-@dataclass
+@dataclass(slots=True)
 class DecisionContext:
     # Raw channels
     trend_raw: float
@@ -47,15 +68,138 @@ class DecisionContext:
     confirm_adx: float = 0.0
     confirm_rsi: float = 0.0
 
-    reasons: List[str] = field(default_factory=list)
+    # Regime ordinal of `regime` (trading_logic_kernels.Regime), set at gate time
+    regime_code: int = REGIME_OTHER
+
+    # None until the first reason is added (see get_reasons()); most contexts never get one
+    reasons: Optional[List[str]] = None
+    # False: SignalEngine skips formatting reasons for this context even with
+    # params.verbose_reasons (e.g. a confirm TF whose reasons nobody reads)
+    collect_reasons: bool = True
     # === Behavior Intelligence (Option C) ===
     behavior_score: Optional[float] = None        # 0..100
     behavior_bias: float = 0.0                    # [-1 .. +1]
     behavior_details: Optional[dict] = None
     behavior_providers: Optional[List[str]] = None
 
+    def get_reasons(self) -> List[str]:
+        """The reasons list, allocated on first use."""
+        reasons = self.reasons
+        if reasons is None:
+            reasons = self.reasons = []
+        return reasons
+
+    def reset(self, **kwargs) -> "DecisionContext":
+        """
+        Re-initialise a pooled instance in place: every field goes back to its
+        default (required fields to None), an existing reasons list is cleared
+        and reused, then kwargs are applied. Works on instances created via
+        __new__ too.
+        """
+        reasons = getattr(self, "reasons", None)
+        for name, default in _DC_RESET_DEFAULTS:
+            setattr(self, name, default)
+        if reasons is not None:
+            reasons.clear()
+        self.reasons = reasons
+        for name, value in kwargs.items():
+            setattr(self, name, value)
+        return self
+
+
+_DC_RESET_DEFAULTS = tuple(
+    (f.name, None if f.default is MISSING else f.default)
+    for f in fields(DecisionContext)
+    if f.name != "reasons"
+)
+
+
+class DecisionContextPool:
+    """
+    Fixed set of reusable DecisionContext slots (one per symbol / TF).
+    get(slot, ...) resets that slot in place and returns it, so a bot that
+    evaluates the same N streams every bar allocates no contexts. A slot's
+    context is only valid until the next get() on the same slot.
+    """
+
+    __slots__ = ("_slots",)
+
+    def __init__(self, size: int):
+        self._slots: List[DecisionContext] = [
+            DecisionContext.__new__(DecisionContext) for _ in range(size)
+        ]
 
-@dataclass
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def get(self, slot: int, **kwargs) -> DecisionContext:
+        return self._slots[slot].reset(**kwargs)
+
+
+# =====================================================================
+# Batch (column / SoA) layout for backtests
+# =====================================================================
+
+# DecisionBatch.flags bits (decoded to reason strings only on demand)
+GATE_TREND_DOWNSCALED = 1
+GATE_MR_CONFLICT = 2
+
+
+@dataclass(slots=True)
+class DecisionBatch:
+    """
+    N decision rows as column arrays (one entry per bar). Inputs mirror the
+    raw DecisionContext fields; post-gate columns and flags are filled by
+    SignalEngine.gate_and_weight_batch().
+    """
+    trend_raw: np.ndarray
+    momentum_raw: np.ndarray
+    meanrev_raw: np.ndarray
+    breakout_raw: np.ndarray
+    adx: np.ndarray
+    atr: np.ndarray
+    price: np.ndarray
+    regime: np.ndarray                      # int64 Regime codes (see regime_code())
+    vol_ratio: Optional[np.ndarray] = None  # NaN = not provided
+    behavior_bias: Optional[np.ndarray] = None
+
+    # Post-gate values
+    trend: Optional[np.ndarray] = None
+    momentum: Optional[np.ndarray] = None
+    meanrev: Optional[np.ndarray] = None
+    breakout: Optional[np.ndarray] = None
+    aggregate_s: Optional[np.ndarray] = None
+    flags: Optional[np.ndarray] = None
+    entry: Optional[np.ndarray] = None      # decide_batch: entry price, NaN on HOLD
+
+    def __len__(self) -> int:
+        return int(self.price.shape[0])
+
+    @classmethod
+    def from_contexts(cls, dcs: List[DecisionContext]) -> "DecisionBatch":
+        def col(name):
+            return np.fromiter((getattr(dc, name) for dc in dcs), dtype=np.float64, count=len(dcs))
+
+        return cls(
+            trend_raw=col("trend_raw"),
+            momentum_raw=col("momentum_raw"),
+            meanrev_raw=col("meanrev_raw"),
+            breakout_raw=col("breakout_raw"),
+            adx=col("adx"),
+            atr=col("atr"),
+            price=col("price"),
+            regime=np.fromiter((regime_code(dc.regime) for dc in dcs), dtype=np.int64, count=len(dcs)),
+            vol_ratio=np.fromiter(
+                (np.nan if dc.vol_ratio is None else dc.vol_ratio for dc in dcs),
+                dtype=np.float64, count=len(dcs),
+            ),
+            behavior_bias=np.fromiter(
+                (dc.behavior_bias or 0.0 for dc in dcs), dtype=np.float64, count=len(dcs)
+            ),
+        )
+
+
+@dataclass(slots=True)
 class StrategyParams:
     weights: Dict[str, float]
     s_buy: float
@@ -77,11 +221,19 @@ class StrategyParams:
     impulse_only_high: bool = True      # fast-path only in HIGH regime
     # --- Behavior weight (Option C) ---
     behavior_weight: float = 0.15
+    # Diagnostic strings in dc.reasons (live path turns this on; backtests leave it off)
+    verbose_reasons: bool = False
+
+
+class Side(IntEnum):
+    """Position direction; Position.direction holds the PnL sign."""
+    LONG = 1
+    SHORT = -1
 
 
-@dataclass
+@dataclass(slots=True)
 class Position:
-    side: str  # LONG or SHORT
+    side: str  # LONG or SHORT (string is what the DB / logs carry)
     qty: float
     entry_price: float
     stop_price: Optional[float] = None
@@ -91,9 +243,14 @@ class Position:
     breakeven_armed: bool = False  # آیا استاپ به BE منتقل شده؟
     tp_hit: bool = False           # اگر TP بسته شد، True
     opened_at_ts: Optional[int] = None
+    direction: int = field(default=0, init=False, repr=False)  # +1 LONG / -1 SHORT
 
+    def __post_init__(self):
+        # مثل قبل: هر چیزی غیر از "LONG" سمت فروش حساب می‌شود
+        self.direction = int(Side.LONG if self.side == "LONG" else Side.SHORT)
 
-@dataclass
+
+@dataclass(slots=True)
 class Account:
     equity: float
     balance: float
@@ -101,8 +258,7 @@ class Account:
 
     def update_equity(self, mark_price: float):
         if self.position:
-            direction = 1 if self.position.side == "LONG" else -1
-            pnl = (mark_price - self.position.entry_price) * self.position.qty * direction
+            pnl = (mark_price - self.position.entry_price) * self.position.qty * self.position.direction
         else:
             pnl = 0.0
         self.equity = self.balance + pnl
@@ -111,8 +267,29 @@ class Account:
         return self.balance >= max(min_notional, 0.0) and price > 0.0
 
 
+def _sanitize_inputs(dc: DecisionContext) -> None:
+    """
+    One validation pass over the fields decide() reads: adx non-finite -> 0.0,
+    atr / price non-finite or negative -> 0.0, vol_ratio non-finite -> None
+    (regime fallback), regime label -> regime_code (the only string lookup).
+    Raw channels are left alone (NaN still means HOLD).
+    """
+    dc.regime_code = REGIME_CODES.get(dc.regime, REGIME_OTHER)
+    adx = dc.adx
+    if not math.isfinite(adx):
+        dc.adx = 0.0
+    atr = dc.atr
+    dc.atr = atr if 0.0 <= atr < math.inf else 0.0
+    price = dc.price
+    dc.price = price if 0.0 <= price < math.inf else 0.0
+    vr = dc.vol_ratio
+    if vr is not None and not math.isfinite(vr):
+        dc.vol_ratio = None
+
+
 def _is_finite_positive(x: float) -> bool:
-    return isinstance(x, (int, float)) and math.isfinite(x) and x > 0.0
+    # NaN fails both comparisons, +inf fails the upper bound
+    return 0.0 < x < math.inf
 
 
 def position_size_by_risk(equity: float, max_risk_frac: float, entry: float, stop: Optional[float]) -> float:
@@ -131,92 +308,405 @@ def position_size_by_risk(equity: float, max_risk_frac: float, entry: float, sto
     return float(qty)
 
 
+def _is_finite_positive_vec(x: np.ndarray) -> np.ndarray:
+    # elementwise _is_finite_positive (NaN / +inf / <= 0 -> False)
+    return (x > 0.0) & (x < np.inf)
+
+
+def position_size_by_risk_batch(
+    equity, max_risk_frac: float, entry: np.ndarray, stop: np.ndarray
+) -> np.ndarray:
+    """
+    position_size_by_risk() over arrays (e.g. decide_batch entries/stops):
+    equity may be a scalar or per-row, NaN stop = no stop, 0.0 where no size.
+    """
+    entry = np.asarray(entry, dtype=np.float64)
+    stop = np.asarray(stop, dtype=np.float64)
+    equity = np.asarray(equity, dtype=np.float64)
+    if not math.isfinite(max_risk_frac):
+        return np.zeros(entry.shape)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        risk_per_unit = np.abs(entry - stop)
+        qty = np.maximum(equity, 0.0) * max(max_risk_frac, 0.0) / risk_per_unit
+        valid = (
+            _is_finite_positive_vec(entry) &
+            np.isfinite(equity) &
+            (risk_per_unit > 0.0) &
+            _is_finite_positive_vec(qty)
+        )
+    return np.where(valid, qty, 0.0)
+
+
+# gate constants shared by the scalar and batch paths
+_LOW_ADX_TREND_SCALE = 0.4
+_MR_CONFLICT_LEVEL = 0.40
+_MR_CONFLICT_SCALE = 0.2
+# vr assumed per regime when the context carries no vol_ratio
+_REGIME_FALLBACK_VR = {"LOW": 0.85, "NEUTRAL": 1.0, "HIGH": 1.15}
+
+
+class _FrozenParams(NamedTuple):
+    """Read-only snapshot of StrategyParams as plain floats/bools (see refresh_params)."""
+    min_adx: float
+    s_buy: float
+    s_sell: float
+    decision_buffer: float
+    base_buy_th: float          # s_buy - buffer
+    base_sell_th: float         # s_sell - buffer
+    vr_adapt_k: float
+    vr_adapt_clamp: float
+    min_vr_trade: float
+    atr_mult: float
+    atr_mult_ok: bool           # finite and > 0 (else no stop is ever built)
+    require_mtf: bool
+    mtf_confirm_bar: float
+    veto_bar: float
+    impulse_only_high: bool
+    verbose_reasons: bool
+    regime_scale: Dict[str, float]   # label -> finite scale (labels outside Regime)
+    regime_scale_codes: Tuple[float, ...]  # Regime code -> scale (scalar path)
+    regime_scale_arr: np.ndarray     # Regime code -> scale (batch paths)
+    # Regime code -> (vr, vr_shift, buy_th, sell_th) when vol_ratio is missing
+    regime_thresholds: Tuple[Tuple[float, float, float, float], ...]
+
+
 class SignalEngine:
     """
     Encapsulates gating, aggregation، MTF confirmation و ساخت سیگنال نهایی.
     """
 
+    # ترتیب ستون‌های وزن/مؤلفه در مسیر برداری
+    WEIGHT_KEYS = ("trend", "momentum", "meanrev", "breakout", "behavior")
+
     def __init__(self, params: StrategyParams):
         self.params = params
+        self._w_src: Optional[Dict[str, float]] = None
+        self._w_tuple: Tuple[float, ...] = ()
+        self._w: Optional[np.ndarray] = None
+        self._p: Optional[_FrozenParams] = None
+        self._gate_fn = None
+        self._kernel_params: Optional[np.ndarray] = None
+        self.refresh_params()
+
+    def refresh_params(self) -> None:
+        """
+        Freeze params into self._p (floats, base thresholds, MTF veto bar,
+        regime scales) and rebuild the weight cache. Call it after mutating
+        params in place; gate/decide read only the snapshot.
+        """
+        p = self.params
+        self.refresh_weights()
+        buf = float(p.decision_buffer) if math.isfinite(p.decision_buffer) else 0.0
+        regime_scale = {
+            name: (float(v) if math.isfinite(v) else 1.0) for name, v in p.regime_scale.items()
+        }
+        regime_scale_arr = np.ones(N_REGIMES, dtype=np.float64)
+        for r in Regime:
+            if r is not Regime.OTHER:
+                regime_scale_arr[r] = regime_scale.get(r.name, 1.0)
+        self._p = _FrozenParams(
+            min_adx=float(p.min_adx_for_trend),
+            s_buy=float(p.s_buy),
+            s_sell=float(p.s_sell),
+            decision_buffer=float(p.decision_buffer),
+            base_buy_th=float(p.s_buy) - max(buf, 0.0),
+            base_sell_th=float(p.s_sell) - max(buf, 0.0),
+            vr_adapt_k=float(p.vr_adapt_k),
+            vr_adapt_clamp=float(p.vr_adapt_clamp),
+            min_vr_trade=float(p.min_vr_trade),
+            atr_mult=float(p.atr_stop_mult),
+            atr_mult_ok=math.isfinite(p.atr_stop_mult) and p.atr_stop_mult > 0.0,
+            require_mtf=bool(p.require_mtf_agreement),
+            mtf_confirm_bar=float(p.mtf_confirm_bar),
+            veto_bar=max(float(p.decision_buffer) * 2.0, float(p.mtf_confirm_bar) * 0.35, 0.05),
+            impulse_only_high=bool(getattr(p, "impulse_only_high", True)),
+            verbose_reasons=bool(p.verbose_reasons),
+            regime_scale=regime_scale,
+            regime_scale_codes=tuple(float(v) for v in regime_scale_arr),
+            regime_scale_arr=regime_scale_arr,
+            regime_thresholds=self._regime_thresholds(p, buf),
+        )
+        self._specialize_gate()
+
+    @staticmethod
+    def _regime_thresholds(p: StrategyParams, buf: float) -> Tuple[Tuple[float, float, float, float], ...]:
+        base_buy_th = float(p.s_buy) - max(buf, 0.0)
+        base_sell_th = float(p.s_sell) - max(buf, 0.0)
+        out = []
+        for r in Regime:
+            # unknown labels (OTHER) use the NEUTRAL fallback
+            vr = _REGIME_FALLBACK_VR.get(r.name, _REGIME_FALLBACK_VR["NEUTRAL"])
+            vr_shift = _clamp(
+                (vr - 1.0) * float(p.vr_adapt_k),
+                -float(p.vr_adapt_clamp),
+                float(p.vr_adapt_clamp),
+            )
+            out.append((vr, vr_shift, base_buy_th - vr_shift, base_sell_th - vr_shift))
+        return tuple(out)
 
     def _safe_get_weight(self, name: str) -> float:
-        try:
-            w = float(self.params.weights.get(name, 0.0))
-            return w if math.isfinite(w) else 0.0
-        except Exception:
-            return 0.0
+        w = self.params.weights.get(name, 0.0)
+        if type(w) is not float:
+            # ints, numpy scalars, strings from env/JSON: only these need converting
+            try:
+                w = float(w)
+            except Exception:
+                return 0.0
+        return w if math.isfinite(w) else 0.0
+
+    def refresh_weights(self) -> None:
+        """
+        Rebuild the cached weight vector. Called automatically when
+        params.weights is replaced; call it after editing that dict in place.
+        """
+        self._w_tuple = tuple(self._safe_get_weight(k) for k in self.WEIGHT_KEYS)
+        self._w = np.array(self._w_tuple, dtype=np.float64)
+        self._w_src = self.params.weights
+        if self._p is not None:
+            self._specialize_gate()
+
+    def _specialize_gate(self) -> None:
+        # gate_and_weight()'s kernel with min_adx + weights baked in (make_gate),
+        # and the same snapshot packed for the batch kernels (pack_params)
+        fp = self._p
+        self._gate_fn = make_gate(fp.min_adx, *self._w_tuple)
+        self._kernel_params = pack_params(
+            fp.min_adx, *self._w_tuple,
+            fp.s_buy, fp.s_sell, fp.decision_buffer,
+            fp.vr_adapt_k, fp.vr_adapt_clamp, fp.min_vr_trade,
+            fp.require_mtf, fp.veto_bar,
+            fp.impulse_only_high, fp.atr_mult,
+        )
 
-    # ---------------- Gating & Aggregation ---------------- #
+    def _weights(self) -> Tuple[float, ...]:
+        if self.params.weights is not self._w_src:
+            self.refresh_weights()
+        return self._w_tuple
 
-    def gate_and_weight(self, dc: DecisionContext) -> DecisionContext:
-        p = self.params
+    def aggregate_batch(self, components: np.ndarray, regime_scales=None) -> np.ndarray:
+        """
+        Vectorised aggregate for N post-gate rows: components is (N, 5) in
+        WEIGHT_KEYS order (trend, momentum, meanrev, breakout, behavior_bias).
+        Returns (components @ w) * regime_scales.
+        """
+        self._weights()
+        scores = np.asarray(components, dtype=np.float64) @ self._w
+        if regime_scales is not None:
+            scores = scores * np.asarray(regime_scales, dtype=np.float64)
+        return scores
 
-        adx_val = dc.adx if math.isfinite(dc.adx) else 0.0
+    # ---------------- Gating & Aggregation ---------------- #
 
-        # 1) ADX-aware gating روی ترند (نرم)
-        trend_component = dc.trend_raw
-        if adx_val < p.min_adx_for_trend:
-            trend_component *= 0.4
-            dc.reasons.append(f"Trend downscaled (ADX<{p.min_adx_for_trend:.1f})")
+    def gate_and_weight(self, dc: DecisionContext) -> DecisionContext:
+        """
+        Post-gate channels + aggregate. Inputs are sanitised once here
+        (_sanitize_inputs), so decide() reads them without re-validating.
+        """
+        fp = self._p
+        _sanitize_inputs(dc)
+        adx_val = dc.adx
+
+        # 1-5) ADX gating، تضاد Trend/MeanRev، regime scale و aggregate در kernel
+        #      (trading_logic_kernels._gate via make_gate؛ همان kernel مسیر batch)
+        code = dc.regime_code
+        if code != REGIME_OTHER:
+            regime_scale = fp.regime_scale_codes[code]
         else:
-            dc.reasons.append(f"Trend active (ADX>={p.min_adx_for_trend:.1f})")
-
-        # 2) سایر کانال‌ها
-        mom = dc.momentum_raw
-        mr = dc.meanrev_raw
-        bo = dc.breakout_raw
-
-        # 2.5) تضاد Trend vs Mean-Reversion:
-        conflict = False
-        mr_conf_level = 0.40
-
-        if dc.trend_raw > 0.0 and dc.meanrev_raw < -mr_conf_level:
-            conflict = True
-        elif dc.trend_raw < 0.0 and dc.meanrev_raw > mr_conf_level:
-            conflict = True
-
-        if conflict:
-            mr *= 0.2
-            dc.reasons.append(
-                f"Trend/MeanRev conflict: trend_raw={dc.trend_raw:.3f}, "
-                f"meanrev_raw={dc.meanrev_raw:.3f} → meanrev suppressed"
+            regime_scale = fp.regime_scale.get(dc.regime, 1.0)
+        behavior_bias = float(dc.behavior_bias or 0.0)
+        self._weights()  # re-specialises the gate if params.weights was replaced
+        _, trend, mr, aggregate_s, low_adx, conflict = self._gate_fn(
+            dc.trend_raw, dc.momentum_raw, dc.meanrev_raw, dc.breakout_raw,
+            adx_val, regime_scale, behavior_bias,
+        )
+        dc.trend = trend
+        dc.momentum = float(dc.momentum_raw)
+        dc.meanrev = mr
+        dc.breakout = float(dc.breakout_raw)
+        dc.aggregate_s = aggregate_s
+
+        if fp.verbose_reasons and dc.collect_reasons:
+            if low_adx:
+                dc.get_reasons().append(f"Trend downscaled (ADX<{fp.min_adx:.1f})")
+            else:
+                dc.get_reasons().append(f"Trend active (ADX>={fp.min_adx:.1f})")
+            if conflict:
+                dc.get_reasons().append(
+                    f"Trend/MeanRev conflict: trend_raw={dc.trend_raw:.3f}, "
+                    f"meanrev_raw={dc.meanrev_raw:.3f} → meanrev suppressed"
+                )
+            dc.get_reasons().append(
+                f"Aggregate={dc.aggregate_s:.3f} "
+                f"(regime_scale={regime_scale:.2f}, behavior_bias={behavior_bias:.3f})"
             )
+        return dc
 
-        # 3) Regime scaling
-        regime_scale = p.regime_scale.get(dc.regime, 1.0)
-        if not math.isfinite(regime_scale):
-            regime_scale = 1.0
+    def gate_and_weight_batch(self, b: DecisionBatch) -> DecisionBatch:
+        """
+        Column version of gate_and_weight() for N rows: same gates and
+        weights, computed with array ops; reasons are kept as flag bits
+        (see gate_reasons()). Aggregates may differ from the scalar path in
+        the last ulp (matmul summation order).
+        """
+        fp = self._p
+        n = len(b)
 
-        # 4) Weights
-        w_trend = self._safe_get_weight("trend")
-        w_mom = self._safe_get_weight("momentum")
-        w_mr = self._safe_get_weight("meanrev")
-        w_bo = self._safe_get_weight("breakout")
+        adx = np.where(np.isfinite(b.adx), b.adx, 0.0)
+        low_adx = adx < fp.min_adx
+        trend = np.where(low_adx, b.trend_raw * _LOW_ADX_TREND_SCALE, b.trend_raw)
 
-        # 5) مقدارهای post-gate
-        dc.trend = float(trend_component)
-        dc.momentum = float(mom)
-        dc.meanrev = float(mr)
-        dc.breakout = float(bo)
+        conflict = (
+            ((b.trend_raw > 0.0) & (b.meanrev_raw < -_MR_CONFLICT_LEVEL)) |
+            ((b.trend_raw < 0.0) & (b.meanrev_raw > _MR_CONFLICT_LEVEL))
+        )
+        meanrev = np.where(conflict, b.meanrev_raw * _MR_CONFLICT_SCALE, b.meanrev_raw)
 
-        # --- Behavior bias (Option C) ---
-        behavior_bias = float(dc.behavior_bias or 0.0)
-        w_behavior = self._safe_get_weight("behavior")
-
-        aggregate = (
-            w_trend * dc.trend +
-            w_mom * dc.momentum +
-            w_mr * dc.meanrev +
-            w_bo * dc.breakout +
-            w_behavior * behavior_bias
+        scales = fp.regime_scale_arr[b.regime]
+
+        bias = b.behavior_bias if b.behavior_bias is not None else np.zeros(n)
+        comps = np.column_stack((trend, b.momentum_raw, meanrev, b.breakout_raw, bias))
+
+        b.trend = trend
+        b.momentum = b.momentum_raw.astype(np.float64, copy=True)
+        b.meanrev = meanrev
+        b.breakout = b.breakout_raw.astype(np.float64, copy=True)
+        b.aggregate_s = self.aggregate_batch(comps, scales)
+        b.flags = (
+            low_adx.astype(np.uint8) * GATE_TREND_DOWNSCALED |
+            conflict.astype(np.uint8) * GATE_MR_CONFLICT
         )
+        return b
+
+    def gate_reasons(self, b: DecisionBatch, i: int) -> List[str]:
+        """Decode row i of a gated batch into the reasons gate_and_weight() would log."""
+        fp = self._p
+        flags = int(b.flags[i])
+        reasons = []
+        if flags & GATE_TREND_DOWNSCALED:
+            reasons.append(f"Trend downscaled (ADX<{fp.min_adx:.1f})")
+        else:
+            reasons.append(f"Trend active (ADX>={fp.min_adx:.1f})")
+        if flags & GATE_MR_CONFLICT:
+            reasons.append(
+                f"Trend/MeanRev conflict: trend_raw={b.trend_raw[i]:.3f}, "
+                f"meanrev_raw={b.meanrev_raw[i]:.3f} → meanrev suppressed"
+            )
+        regime_scale = fp.regime_scale_arr[b.regime[i]]
+        bias = float(b.behavior_bias[i]) if b.behavior_bias is not None else 0.0
+        reasons.append(
+            f"Aggregate={b.aggregate_s[i]:.3f} "
+            f"(regime_scale={regime_scale:.2f}, behavior_bias={bias:.3f})"
+        )
+        return reasons
 
-        dc.aggregate_s = float(aggregate) * float(regime_scale)
-        dc.reasons.append(
-            f"Aggregate={dc.aggregate_s:.3f} "
-            f"(regime_scale={regime_scale:.2f}, behavior_bias={behavior_bias:.3f})"
+    def decide_batch(
+        self,
+        b: DecisionBatch,
+        confirm_s: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        gate_and_weight() + decide() for every row of b in one compiled pass
+        (trading_logic_kernels._gate_decide_batch, parallel over rows; serial,
+        or the AOT build, below BATCH_PARALLEL_MIN_ROWS); without any compiled
+        kernel the same columns go through whole-array NumPy ops instead.
+        confirm_s: per-row confirm-TF aggregate (NaN = missing), or None.
+        Fills b.trend/momentum/meanrev/breakout/aggregate_s and b.entry (the
+        Position.entry_price decide() would use, NaN on HOLD) and returns
+        (actions int8: 1 BUY / -1 SELL / 0 HOLD, stops float64: NaN = no stop).
+        Reasons are not produced; use gate_reasons() / decide() for a single bar.
+        """
+        fp = self._p
+        n = len(b)
+        self._weights()  # re-packs _kernel_params if params.weights was replaced
+
+        regimes = np.ascontiguousarray(b.regime, dtype=np.int64)
+        scales = fp.regime_scale_arr[regimes]
+        nan_col = np.full(n, np.nan)
+        vol_ratio = nan_col if b.vol_ratio is None else np.ascontiguousarray(b.vol_ratio, dtype=np.float64)
+        bias = np.zeros(n) if b.behavior_bias is None else np.ascontiguousarray(b.behavior_bias, dtype=np.float64)
+        confirm = nan_col if confirm_s is None else np.ascontiguousarray(confirm_s, dtype=np.float64)
+
+        actions = np.empty(n, dtype=np.int8)
+        aggregate = np.empty(n, dtype=np.float64)
+        stops = np.empty(n, dtype=np.float64)
+        trend = np.empty(n, dtype=np.float64)
+        meanrev = np.empty(n, dtype=np.float64)
+
+        def col(x):
+            return np.ascontiguousarray(x, dtype=np.float64)
+
+        if NUMBA_AVAILABLE and n >= BATCH_PARALLEL_MIN_ROWS:
+            batch_kernel = _gate_decide_batch
+        elif NUMBA_AVAILABLE or KERNELS_AOT:
+            batch_kernel = _gate_decide_rows
+        else:
+            batch_kernel = _gate_decide_batch_numpy
+        batch_kernel(
+            col(b.trend_raw), col(b.momentum_raw), col(b.meanrev_raw), col(b.breakout_raw),
+            col(b.adx), col(b.atr), col(b.price),
+            vol_ratio, regimes, scales, bias, confirm, self._kernel_params,
+            actions, aggregate, stops, trend, meanrev,
         )
-        return dc
+
+        b.trend = trend
+        b.momentum = col(b.momentum_raw).copy()
+        b.meanrev = meanrev
+        b.breakout = col(b.breakout_raw).copy()
+        b.aggregate_s = aggregate
+        price = col(b.price)
+        with np.errstate(invalid="ignore"):
+            # same clamp as _sanitize_inputs: non-finite / negative price -> 0.0
+            entry = np.where((price >= 0.0) & (price < np.inf), price, 0.0)
+        entry[actions == ACTION_HOLD] = np.nan
+        b.entry = entry
+        return actions, stops
+
+    def decide_many(
+        self,
+        contexts: List[Tuple[DecisionContext, Optional[DecisionContext]]],
+    ) -> List[Tuple[str, Optional[Position]]]:
+        """
+        gate_and_weight(primary) + decide(primary, confirm) for many
+        (primary, confirm) pairs, e.g. K symbols x M timeframes. Confirm
+        contexts must already be gated, as for decide().
+
+        The pairs go through decide_batch() (one parallel pass with numba,
+        whole-array NumPy without); post-gate fields are written back to each
+        primary context but no reasons are produced.
+        """
+        n = len(contexts)
+        if n == 0:
+            return []
+        primaries = [dc for dc, _ in contexts]
+        b = DecisionBatch.from_contexts(primaries)
+        confirm_s = np.fromiter(
+            (np.nan if dcc is None else dcc.aggregate_s for _, dcc in contexts),
+            dtype=np.float64, count=n,
+        )
+        actions, stops = self.decide_batch(b, confirm_s)
+
+        out: List[Tuple[str, Optional[Position]]] = []
+        for i, dc in enumerate(primaries):
+            _sanitize_inputs(dc)  # same canonicalisation gate_and_weight() applies
+            dc.trend = float(b.trend[i])
+            dc.momentum = float(b.momentum[i])
+            dc.meanrev = float(b.meanrev[i])
+            dc.breakout = float(b.breakout[i])
+            dc.aggregate_s = float(b.aggregate_s[i])
+
+            a = actions[i]
+            if a == ACTION_BUY or a == ACTION_SELL:
+                stop = float(stops[i])
+                pos = Position(
+                    side="LONG" if a == ACTION_BUY else "SHORT",
+                    qty=0.0,
+                    entry_price=float(b.entry[i]),
+                    stop_price=None if math.isnan(stop) else stop,
+                )
+                out.append(("BUY" if a == ACTION_BUY else "SELL", pos))
+            else:
+                out.append(("HOLD", None))
+        return out
 
     # ---------------- MTF Confirmation ---------------- #
 
@@ -224,58 +714,65 @@ class SignalEngine:
         self,
         dc_primary: DecisionContext,
         dc_confirm: Optional[DecisionContext]
-    ) -> Tuple[bool, List[str]]:
+    ) -> bool:
         """
         Veto-style MTF confirmation (best practice):
         - require_mtf_agreement=False → PASS
         - require_mtf_agreement=True → confirm TF only vetoes when it is *strongly opposite*
         - missing confirm TF does NOT reject
+        Reasons go straight into dc_primary.reasons, only when
+        params.verbose_reasons and dc_primary.collect_reasons are set.
         """
-        p = self.params
-        reasons: List[str] = []
+        fp = self._p
+        verbose = fp.verbose_reasons and dc_primary.collect_reasons
 
-        if not p.require_mtf_agreement:
-            reasons.append("MTF agreement not required")
-            return True, reasons
+        if not fp.require_mtf:
+            if verbose:
+                dc_primary.get_reasons().append("MTF agreement not required")
+            return True
 
-        primary_s = float(dc_primary.aggregate_s)
+        primary_s = dc_primary.aggregate_s
 
         if dc_confirm is None:
-            reasons.append("MTF missing → PASS (no veto)")
-            return True, reasons
+            if verbose:
+                dc_primary.get_reasons().append("MTF missing → PASS (no veto)")
+            return True
 
-        confirm_s = float(dc_confirm.aggregate_s)
+        confirm_s = dc_confirm.aggregate_s
 
-        veto_bar = max(float(p.decision_buffer) * 2.0, float(p.mtf_confirm_bar) * 0.35, 0.05)
+        veto_bar = fp.veto_bar
 
         if primary_s > 0.0 and confirm_s < -veto_bar:
-            reasons.append(
-                f"MTF veto: primary={primary_s:.3f}, confirm={confirm_s:.3f}, veto_bar={veto_bar:.3f}"
-            )
-            return False, reasons
+            if verbose:
+                dc_primary.get_reasons().append(
+                    f"MTF veto: primary={primary_s:.3f}, confirm={confirm_s:.3f}, veto_bar={veto_bar:.3f}"
+                )
+            return False
 
         if primary_s < 0.0 and confirm_s > veto_bar:
-            reasons.append(
-                f"MTF veto: primary={primary_s:.3f}, confirm={confirm_s:.3f}, veto_bar={veto_bar:.3f}"
-            )
-            return False, reasons
+            if verbose:
+                dc_primary.get_reasons().append(
+                    f"MTF veto: primary={primary_s:.3f}, confirm={confirm_s:.3f}, veto_bar={veto_bar:.3f}"
+                )
+            return False
 
-        reasons.append(f"MTF pass (no veto): primary={primary_s:.3f}, confirm={confirm_s:.3f}")
-        return True, reasons
+        if verbose:
+            dc_primary.get_reasons().append(f"MTF pass (no veto): primary={primary_s:.3f}, confirm={confirm_s:.3f}")
+        return True
 
     # ---------------- Stop Builder ---------------- #
 
-    def _build_stop(self, side: str, entry: float, atr: float, atr_mult: float) -> Optional[float]:
-        if not (_is_finite_positive(entry) and math.isfinite(atr) and math.isfinite(atr_mult)):
-            return None
-        if atr <= 0.0 or atr_mult <= 0.0:
+    def _build_stop(self, is_long: bool, entry: float, atr: float) -> Optional[float]:
+        """
+        ATR stop for the side taken. entry / atr arrive canonicalised by
+        gate_and_weight() (finite, >= 0) and atr_mult validity is checked once
+        in refresh_params(), so only the per-bar conditions remain here.
+        """
+        fp = self._p
+        if not fp.atr_mult_ok or entry <= 0.0 or atr <= 0.0:
             return None
-
-        if side == "LONG":
-            stop = entry - atr_mult * atr
-        else:
-            stop = entry + atr_mult * atr
-
+        delta = fp.atr_mult * atr
+        stop = entry - delta if is_long else entry + delta
         if not math.isfinite(stop):
             return None
         return max(stop, 0.0)
@@ -292,66 +789,65 @@ class SignalEngine:
         - action در {"BUY", "SELL", "HOLD"}
         - position فقط برای BUY/SELL مقدار دارد (qty=0 تا main سایز را حساب کند)
         """
-        p = self.params
+        fp = self._p
         action = "HOLD"
         pos: Optional[Position] = None
 
-        # -------- Base thresholds (with buffer) --------
-        buf = float(p.decision_buffer) if math.isfinite(p.decision_buffer) else 0.0
-        base_buy_th = float(p.s_buy) - max(buf, 0.0)
-        base_sell_th = float(p.s_sell) - max(buf, 0.0)
+        # -------- Base thresholds (with buffer; precomputed in refresh_params) --------
+        base_buy_th = fp.base_buy_th
+        base_sell_th = fp.base_sell_th
 
         # -------- Volatility-aware threshold adaptation --------
-        vr: Optional[float] = None
-        if dc_primary.vol_ratio is not None and math.isfinite(dc_primary.vol_ratio):
+        if dc_primary.vol_ratio is not None:
             vr = float(dc_primary.vol_ratio)
+            vr_shift = _clamp(
+                (vr - 1.0) * fp.vr_adapt_k,
+                -fp.vr_adapt_clamp,
+                fp.vr_adapt_clamp,
+            )
+            # High vr => easier entries (lower thresholds). Low vr => stricter.
+            buy_th = base_buy_th - vr_shift
+            sell_th = base_sell_th - vr_shift
         else:
-            # fallback from regime (keeps compatibility if vol_ratio isn't provided)
-            vr = {"LOW": 0.85, "NEUTRAL": 1.0, "HIGH": 1.15}.get(dc_primary.regime or "NEUTRAL", 1.0)
+            # fallback from regime (keeps compatibility if vol_ratio isn't provided);
+            # everything here depends only on params + regime → precomputed
+            vr, vr_shift, buy_th, sell_th = fp.regime_thresholds[dc_primary.regime_code]
 
-        vr_shift = _clamp(
-            (vr - 1.0) * float(p.vr_adapt_k),
-            -float(p.vr_adapt_clamp),
-            float(p.vr_adapt_clamp),
-        )
-
-        # High vr => easier entries (lower thresholds). Low vr => stricter.
-        buy_th = base_buy_th - vr_shift
-        sell_th = base_sell_th - vr_shift
-
-        dc_primary.reasons.append(f"VR={vr:.3f} shift={vr_shift:+.3f} buy_th={buy_th:.3f} sell_th={sell_th:.3f}")
+        verbose = fp.verbose_reasons and dc_primary.collect_reasons
+        if verbose:
+            dc_primary.get_reasons().append(f"VR={vr:.3f} shift={vr_shift:+.3f} buy_th={buy_th:.3f} sell_th={sell_th:.3f}")
 
         # -------- MTF (veto-style) --------
-        mtf_ok, mtf_reasons = self._mtf_confirm_pass(dc_primary, dc_confirm)
-        dc_primary.reasons.extend(mtf_reasons)
+        mtf_ok = self._mtf_confirm_pass(dc_primary, dc_confirm)
 
-        primary_s = float(dc_primary.aggregate_s)
+        primary_s = dc_primary.aggregate_s
 
         # -------- Volatility trade guard (avoid low-vol chop) --------
-        low_vol_guard = (vr is not None) and math.isfinite(vr) and (vr < float(p.min_vr_trade))
-        if low_vol_guard:
-            dc_primary.reasons.append(
-                f"VOL_GUARD: vr={vr:.3f} < min_vr_trade={float(p.min_vr_trade):.3f}"
+        # vr is always finite here (finite vol_ratio or the regime fallback)
+        low_vol_guard = vr < fp.min_vr_trade
+        if low_vol_guard and verbose:
+            dc_primary.get_reasons().append(
+                f"VOL_GUARD: vr={vr:.3f} < min_vr_trade={fp.min_vr_trade:.3f}"
             )
 
-        entry = float(max(dc_primary.price, 0.0)) if math.isfinite(dc_primary.price) else 0.0
-        atr = float(max(dc_primary.atr, 0.0)) if math.isfinite(dc_primary.atr) else 0.0
+        # price / atr / adx were canonicalised by gate_and_weight()
+        entry = dc_primary.price
+        atr = dc_primary.atr
 
         # -------- FAST PATH: Trend + Breakout impulse --------
-        adx_val = float(dc_primary.adx) if math.isfinite(dc_primary.adx) else 0.0
-        trend_val = float(dc_primary.trend)
-        bo_val = float(dc_primary.breakout)
+        adx_val = dc_primary.adx
+        trend_val = dc_primary.trend
+        bo_val = dc_primary.breakout
 
+        # cheapest / most selective tests first: most bars stop at the regime check
         impulse = (
+            mtf_ok and
+            (not fp.impulse_only_high or dc_primary.regime_code == REGIME_HIGH) and
             abs(trend_val) >= 0.45 and
             abs(bo_val) >= 0.35 and
-            adx_val >= float(p.min_adx_for_trend) and
-            mtf_ok
+            adx_val >= fp.min_adx
         )
 
-        if bool(getattr(p, "impulse_only_high", True)):
-            impulse = impulse and (dc_primary.regime == "HIGH")
-
         if impulse and entry > 0.0:
             if trend_val > 0.0:
                 action = "BUY"
@@ -360,35 +856,40 @@ class SignalEngine:
                 action = "SELL"
                 side = "SHORT"
 
-            stop_price = self._build_stop(side, entry, atr, p.atr_stop_mult)
+            stop_price = self._build_stop(trend_val > 0.0, entry, atr)
             pos = Position(side=side, qty=0.0, entry_price=entry, stop_price=stop_price)
-            dc_primary.reasons.append(
-                f"FAST_DECISION: impulse trend={trend_val:.3f} breakout={bo_val:.3f} adx={adx_val:.1f}"
-            )
+            if verbose:
+                dc_primary.get_reasons().append(
+                    f"FAST_DECISION: impulse trend={trend_val:.3f} breakout={bo_val:.3f} adx={adx_val:.1f}"
+                )
             return action, pos
 
         # If volatility is too low and no impulse, stand down.
         if low_vol_guard:
-            dc_primary.reasons.append("VOL_GUARD: No impulse in low vr → HOLD")
+            if verbose:
+                dc_primary.get_reasons().append("VOL_GUARD: No impulse in low vr → HOLD")
             return "HOLD", None
 
         # -------- Normal threshold decision --------
         wants_long = (primary_s >= buy_th) and mtf_ok
         wants_short = (primary_s <= -sell_th) and mtf_ok
 
-        stop_long = self._build_stop("LONG", entry, atr, p.atr_stop_mult)
-        stop_short = self._build_stop("SHORT", entry, atr, p.atr_stop_mult)
-
+        # stop is built only for the side actually taken
         if wants_long:
             action = "BUY"
-            pos = Position(side="LONG", qty=0.0, entry_price=entry, stop_price=stop_long)
-            dc_primary.reasons.append(f"Decision BUY: s={primary_s:.3f} >= {buy_th:.3f}")
+            stop_price = self._build_stop(True, entry, atr)
+            pos = Position(side="LONG", qty=0.0, entry_price=entry, stop_price=stop_price)
+            if verbose:
+                dc_primary.get_reasons().append(f"Decision BUY: s={primary_s:.3f} >= {buy_th:.3f}")
         elif wants_short:
             action = "SELL"
-            pos = Position(side="SHORT", qty=0.0, entry_price=entry, stop_price=stop_short)
-            dc_primary.reasons.append(f"Decision SELL: s={primary_s:.3f} <= {-sell_th:.3f}")
+            stop_price = self._build_stop(False, entry, atr)
+            pos = Position(side="SHORT", qty=0.0, entry_price=entry, stop_price=stop_price)
+            if verbose:
+                dc_primary.get_reasons().append(f"Decision SELL: s={primary_s:.3f} <= {-sell_th:.3f}")
         else:
             action = "HOLD"
-            dc_primary.reasons.append(f"HOLD: s={primary_s:.3f}, thresholds=({buy_th:.3f}, {-sell_th:.3f})")
+            if verbose:
+                dc_primary.get_reasons().append(f"HOLD: s={primary_s:.3f}, thresholds=({buy_th:.3f}, {-sell_th:.3f})")
 
         return action, pos
@@ -0,0 +1,474 @@
+# trading_logic_kernels.py
+
+"""
+================================================================================
+Compiled kernels for SignalEngine (batch / backtest path)
+================================================================================
+- _gate_decide: gate_and_weight() + decide() for one bar, scalars only
+  (no lists, no exceptions, no Position objects)
+- _gate_decide_batch: the same over N bars, parallel with prange
+  (_gate_decide_batch_serial for small N)
+- _gate_decide_batch_numpy: whole-array NumPy version for installs without numba
+- make_gate: single-bar gate generated per parameter set (live path)
+- pack_params / P_*: the batch kernels' scalar parameters as one float64 vector
+- warmup_decision_kernels: compile the batch kernels up front (backtests)
+- Without numba (see numba_compat) the njit kernels run as plain Python.
+================================================================================
+"""
+
+import hashlib
+import math
+from enum import IntEnum
+from pathlib import Path
+
+import numpy as np
+
+from numba_compat import NUMBA_AVAILABLE, njit, prange
+
+# Action codes returned by the kernels
+ACTION_HOLD = 0
+ACTION_BUY = 1
+ACTION_SELL = -1
+
+
+class Regime(IntEnum):
+    """Regime ordinals (index into SignalEngine's regime_scale array)."""
+    LOW = 0
+    NEUTRAL = 1
+    HIGH = 2
+    OTHER = 3   # unknown / missing label: scale 1.0, vr fallback 1.0
+
+
+# plain ints for the kernels
+REGIME_LOW = int(Regime.LOW)
+REGIME_NEUTRAL = int(Regime.NEUTRAL)
+REGIME_HIGH = int(Regime.HIGH)
+REGIME_OTHER = int(Regime.OTHER)
+N_REGIMES = len(Regime)
+
+# Below this many rows the threaded kernel's launch overhead outweighs the
+# per-row work (a row is ~10 ns compiled), so the serial variant is used.
+BATCH_PARALLEL_MIN_ROWS = 1024
+
+REGIME_CODES = {"LOW": REGIME_LOW, "NEUTRAL": REGIME_NEUTRAL, "HIGH": REGIME_HIGH}
+
+
+# Layout of the packed float64 parameter vector the batch kernels take
+# (SignalEngine builds it once per params/weights change; flags are 0.0/1.0).
+P_MIN_ADX = 0
+P_W_TREND = 1
+P_W_MOM = 2
+P_W_MR = 3
+P_W_BO = 4
+P_W_BEHAVIOR = 5
+P_S_BUY = 6
+P_S_SELL = 7
+P_DECISION_BUFFER = 8
+P_VR_ADAPT_K = 9
+P_VR_ADAPT_CLAMP = 10
+P_MIN_VR_TRADE = 11
+P_REQUIRE_MTF = 12
+P_VETO_BAR = 13
+P_IMPULSE_ONLY_HIGH = 14
+P_ATR_MULT = 15
+N_PARAMS = 16
+
+
+def pack_params(
+    min_adx, w_trend, w_mom, w_mr, w_bo, w_behavior,
+    s_buy, s_sell, decision_buffer, vr_adapt_k, vr_adapt_clamp, min_vr_trade,
+    require_mtf, veto_bar, impulse_only_high, atr_mult,
+) -> np.ndarray:
+    """Scalar decision parameters -> float64[N_PARAMS] in P_* order."""
+    return np.array(
+        (
+            min_adx, w_trend, w_mom, w_mr, w_bo, w_behavior,
+            s_buy, s_sell, decision_buffer, vr_adapt_k, vr_adapt_clamp, min_vr_trade,
+            1.0 if require_mtf else 0.0, veto_bar, 1.0 if impulse_only_high else 0.0, atr_mult,
+        ),
+        dtype=np.float64,
+    )
+
+
+def source_hash() -> int:
+    """
+    Fingerprint of this file (63-bit int). build_kernels.py bakes it into the
+    AOT module so trading_logic can refuse an extension built from other code.
+    """
+    digest = hashlib.blake2b(Path(__file__).read_bytes(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") >> 1
+
+
+def regime_code(regime) -> int:
+    # missing/unknown labels share OTHER; for the kernels that behaves like
+    # NEUTRAL (vr fallback 1.0) but keeps the regime_scale default of 1.0
+    return REGIME_CODES.get(regime, REGIME_OTHER)
+
+
+@njit(cache=True, nogil=True, inline="always")
+def _finite_nonneg(x):
+    """x if 0 <= x < inf else 0.0 (NaN fails both comparisons): one chain, no isfinite + max."""
+    return x if 0.0 <= x < np.inf else 0.0
+
+
+@njit(cache=True, nogil=True)
+def _build_stop_njit(is_long, entry, atr, atr_mult):
+    """_build_stop(); NaN stands for None. entry / atr come through _finite_nonneg."""
+    if entry <= 0.0 or atr <= 0.0 or not (np.isfinite(atr_mult) and atr_mult > 0.0):
+        return np.nan
+    if is_long:
+        stop = entry - atr_mult * atr
+    else:
+        stop = entry + atr_mult * atr
+    if not np.isfinite(stop):
+        return np.nan
+    return max(stop, 0.0)
+
+
+@njit(cache=True, nogil=True)
+def _gate(
+    trend_raw, mom_raw, mr_raw, bo_raw, adx, regime_scale, behavior_bias,
+    min_adx, w_trend, w_mom, w_mr, w_bo, w_behavior,
+):
+    """
+    gate_and_weight() arithmetic for one bar. Returns
+    (adx, trend, meanrev, aggregate_s, trend_downscaled, mr_conflict);
+    momentum / breakout pass through unchanged.
+    """
+    adx_val = adx if math.isfinite(adx) else 0.0
+    low_adx = adx_val < min_adx
+    trend = trend_raw * 0.4 if low_adx else trend_raw
+    conflict = (trend_raw > 0.0 and mr_raw < -0.40) or (trend_raw < 0.0 and mr_raw > 0.40)
+    mr = mr_raw * 0.2 if conflict else mr_raw
+    scale = regime_scale if math.isfinite(regime_scale) else 1.0
+    aggregate = (
+        w_trend * trend +
+        w_mom * mom_raw +
+        w_mr * mr +
+        w_bo * bo_raw +
+        w_behavior * behavior_bias
+    )
+    return adx_val, trend, mr, aggregate * scale, low_adx, conflict
+
+
+# _gate with min_adx and the weights baked in as literals (see make_gate)
+_GATE_SPECIALIZED_SRC = """\
+def gate(trend_raw, mom_raw, mr_raw, bo_raw, adx, regime_scale, behavior_bias):
+    adx_val = adx if isfinite(adx) else 0.0
+    low_adx = adx_val < {min_adx}
+    trend = trend_raw * 0.4 if low_adx else trend_raw
+    conflict = (trend_raw > 0.0 and mr_raw < -0.40) or (trend_raw < 0.0 and mr_raw > 0.40)
+    mr = mr_raw * 0.2 if conflict else mr_raw
+    scale = regime_scale if isfinite(regime_scale) else 1.0
+    aggregate = (
+        {w_trend} * trend +
+        {w_mom} * mom_raw +
+        {w_mr} * mr +
+        {w_bo} * bo_raw +
+        {w_behavior} * behavior_bias
+    )
+    return adx_val, trend, mr, aggregate * scale, low_adx, conflict
+"""
+
+
+def make_gate(min_adx, w_trend, w_mom, w_mr, w_bo, w_behavior):
+    """
+    Build gate(trend_raw, mom_raw, mr_raw, bo_raw, adx, regime_scale,
+    behavior_bias) for one parameter set. Calling _gate from Python (jit
+    dispatch or AOT boxing of 13 args) costs more than its arithmetic, so the
+    scalar path runs this generated copy instead: same expression order, so
+    the same floats. Rebuild whenever min_adx or the weights change.
+    """
+    ns = {"isfinite": math.isfinite}
+    consts = {}
+    for name, value in (
+        ("min_adx", min_adx), ("w_trend", w_trend), ("w_mom", w_mom),
+        ("w_mr", w_mr), ("w_bo", w_bo), ("w_behavior", w_behavior),
+    ):
+        value = float(value)
+        if math.isfinite(value):
+            consts[name] = f"({value!r})"   # repr round-trips exactly
+        else:
+            ns["c_" + name] = value          # nan/inf have no literal form
+            consts[name] = "c_" + name
+    src = _GATE_SPECIALIZED_SRC.format(**consts)
+    exec(compile(src, "<make_gate>", "exec"), ns)
+    return ns["gate"]
+
+
+@njit(cache=True, nogil=True, inline="always")
+def _unpack_params(params):
+    return (
+        params[P_MIN_ADX], params[P_W_TREND], params[P_W_MOM],
+        params[P_W_MR], params[P_W_BO], params[P_W_BEHAVIOR],
+        params[P_S_BUY], params[P_S_SELL], params[P_DECISION_BUFFER],
+        params[P_VR_ADAPT_K], params[P_VR_ADAPT_CLAMP], params[P_MIN_VR_TRADE],
+        params[P_REQUIRE_MTF] != 0.0, params[P_VETO_BAR],
+        params[P_IMPULSE_ONLY_HIGH] != 0.0, params[P_ATR_MULT],
+    )
+
+
+@njit(cache=True, nogil=True)
+def _gate_decide(
+    trend_raw, mom_raw, mr_raw, bo_raw, adx, atr, price,
+    vol_ratio, regime, regime_scale, behavior_bias, confirm_s,
+    min_adx, w_trend, w_mom, w_mr, w_bo, w_behavior,
+    s_buy, s_sell, decision_buffer, vr_adapt_k, vr_adapt_clamp, min_vr_trade,
+    require_mtf, veto_bar, impulse_only_high, atr_mult,
+):
+    """
+    One bar of gate_and_weight() + decide(). NaN vol_ratio / confirm_s mean
+    "not provided". Returns (action, aggregate_s, stop, trend, meanrev) with
+    stop = NaN when there is no stop. veto_bar is precomputed by the caller
+    (max(2*decision_buffer, 0.35*mtf_confirm_bar, 0.05), once per batch).
+    """
+    # ---- gate_and_weight ----
+    adx_val, trend, mr, primary_s, _low_adx, _conflict = _gate(
+        trend_raw, mom_raw, mr_raw, bo_raw, adx, regime_scale, behavior_bias,
+        min_adx, w_trend, w_mom, w_mr, w_bo, w_behavior,
+    )
+
+    # ---- thresholds ----
+    buf = decision_buffer if np.isfinite(decision_buffer) else 0.0
+    base_buy_th = s_buy - max(buf, 0.0)
+    base_sell_th = s_sell - max(buf, 0.0)
+
+    if np.isfinite(vol_ratio):
+        vr = vol_ratio
+    elif regime == REGIME_LOW:
+        vr = 0.85
+    elif regime == REGIME_HIGH:
+        vr = 1.15
+    else:
+        vr = 1.0
+    vr_shift = max(-vr_adapt_clamp, min(vr_adapt_clamp, (vr - 1.0) * vr_adapt_k))
+    buy_th = base_buy_th - vr_shift
+    sell_th = base_sell_th - vr_shift
+
+    # ---- MTF veto ----
+    mtf_ok = True
+    # only NaN means "no confirm TF"; ±inf still vetoes like decide()
+    if require_mtf and not np.isnan(confirm_s):
+        if primary_s > 0.0 and confirm_s < -veto_bar:
+            mtf_ok = False
+        elif primary_s < 0.0 and confirm_s > veto_bar:
+            mtf_ok = False
+
+    low_vol_guard = np.isfinite(vr) and vr < min_vr_trade
+
+    entry = _finite_nonneg(price)
+    atr_v = _finite_nonneg(atr)
+
+    # ---- fast path: trend + breakout impulse ----
+    impulse = (
+        abs(trend) >= 0.45 and
+        abs(bo_raw) >= 0.35 and
+        adx_val >= min_adx and
+        mtf_ok
+    )
+    if impulse_only_high:
+        impulse = impulse and regime == REGIME_HIGH
+
+    if impulse and entry > 0.0:
+        is_long = trend > 0.0
+        stop = _build_stop_njit(is_long, entry, atr_v, atr_mult)
+        return (ACTION_BUY if is_long else ACTION_SELL), primary_s, stop, trend, mr
+
+    if low_vol_guard:
+        return ACTION_HOLD, primary_s, np.nan, trend, mr
+
+    # ---- normal threshold decision ----
+    if primary_s >= buy_th and mtf_ok:
+        return ACTION_BUY, primary_s, _build_stop_njit(True, entry, atr_v, atr_mult), trend, mr
+    if primary_s <= -sell_th and mtf_ok:
+        return ACTION_SELL, primary_s, _build_stop_njit(False, entry, atr_v, atr_mult), trend, mr
+    return ACTION_HOLD, primary_s, np.nan, trend, mr
+
+
+@njit(cache=True, nogil=True, parallel=True)
+def _gate_decide_batch(
+    trend_raw, mom_raw, mr_raw, bo_raw, adx, atr, price,
+    vol_ratio, regime, regime_scale, behavior_bias, confirm_s, params,
+    actions, aggregate_s, stops, trend_out, mr_out,
+):
+    """_gate_decide over N rows (column arrays in, preallocated outputs filled in place)."""
+    (min_adx, w_trend, w_mom, w_mr, w_bo, w_behavior,
+     s_buy, s_sell, decision_buffer, vr_adapt_k, vr_adapt_clamp, min_vr_trade,
+     require_mtf, veto_bar, impulse_only_high, atr_mult) = _unpack_params(params)
+    n = price.shape[0]
+    for i in prange(n):
+        a, s, st, t, m = _gate_decide(
+            trend_raw[i], mom_raw[i], mr_raw[i], bo_raw[i], adx[i], atr[i], price[i],
+            vol_ratio[i], regime[i], regime_scale[i], behavior_bias[i], confirm_s[i],
+            min_adx, w_trend, w_mom, w_mr, w_bo, w_behavior,
+            s_buy, s_sell, decision_buffer, vr_adapt_k, vr_adapt_clamp, min_vr_trade,
+            require_mtf, veto_bar, impulse_only_high, atr_mult,
+        )
+        actions[i] = a
+        aggregate_s[i] = s
+        stops[i] = st
+        trend_out[i] = t
+        mr_out[i] = m
+
+
+@njit(cache=True, nogil=True)
+def _gate_decide_batch_serial(
+    trend_raw, mom_raw, mr_raw, bo_raw, adx, atr, price,
+    vol_ratio, regime, regime_scale, behavior_bias, confirm_s, params,
+    actions, aggregate_s, stops, trend_out, mr_out,
+):
+    """_gate_decide_batch without threads (small N, where the parallel launch costs more than the rows)."""
+    (min_adx, w_trend, w_mom, w_mr, w_bo, w_behavior,
+     s_buy, s_sell, decision_buffer, vr_adapt_k, vr_adapt_clamp, min_vr_trade,
+     require_mtf, veto_bar, impulse_only_high, atr_mult) = _unpack_params(params)
+    n = price.shape[0]
+    for i in range(n):
+        a, s, st, t, m = _gate_decide(
+            trend_raw[i], mom_raw[i], mr_raw[i], bo_raw[i], adx[i], atr[i], price[i],
+            vol_ratio[i], regime[i], regime_scale[i], behavior_bias[i], confirm_s[i],
+            min_adx, w_trend, w_mom, w_mr, w_bo, w_behavior,
+            s_buy, s_sell, decision_buffer, vr_adapt_k, vr_adapt_clamp, min_vr_trade,
+            require_mtf, veto_bar, impulse_only_high, atr_mult,
+        )
+        actions[i] = a
+        aggregate_s[i] = s
+        stops[i] = st
+        trend_out[i] = t
+        mr_out[i] = m
+
+
+def _build_stops_numpy(entry, atr, atr_mult):
+    """
+    _build_stop_njit for both sides over arrays in one pass: atr_mult*atr and
+    the entry/atr checks are shared. entry / atr must already be finite and
+    >= 0 (as after _finite_nonneg). Returns (long_stops, short_stops), NaN =
+    no stop.
+    """
+    if not (np.isfinite(atr_mult) and atr_mult > 0.0):
+        nan = np.full(entry.shape, np.nan)
+        return nan, nan.copy()
+    with np.errstate(invalid="ignore", over="ignore"):
+        d = atr_mult * atr
+        d[(entry <= 0.0) | (atr <= 0.0)] = np.nan  # NaN carries "no stop" through both sides
+        out = []
+        for stop in (entry - d, entry + d):
+            stop[np.isinf(stop)] = np.nan
+            out.append(np.maximum(stop, 0.0, out=stop))
+    return out[0], out[1]
+
+
+def _gate_decide_batch_numpy(
+    trend_raw, mom_raw, mr_raw, bo_raw, adx, atr, price,
+    vol_ratio, regime, regime_scale, behavior_bias, confirm_s, params,
+    actions, aggregate_s, stops, trend_out, mr_out,
+):
+    """
+    _gate_decide_batch with whole-array NumPy ops (same arguments, same
+    results). Used when numba is missing, where the row loop above would
+    run as plain Python.
+    """
+    (min_adx, w_trend, w_mom, w_mr, w_bo, w_behavior,
+     s_buy, s_sell, decision_buffer, vr_adapt_k, vr_adapt_clamp, min_vr_trade,
+     require_mtf, veto_bar, impulse_only_high, atr_mult) = params.tolist()  # flags: 1.0 / 0.0
+    with np.errstate(invalid="ignore"):
+        # ---- gate_and_weight ----
+        adx_val = np.where(np.isfinite(adx), adx, 0.0)
+        low_adx = adx_val < min_adx
+        trend = np.where(low_adx, trend_raw * 0.4, trend_raw)
+        conflict = ((trend_raw > 0.0) & (mr_raw < -0.40)) | ((trend_raw < 0.0) & (mr_raw > 0.40))
+        mr = np.where(conflict, mr_raw * 0.2, mr_raw)
+        scale = np.where(np.isfinite(regime_scale), regime_scale, 1.0)
+        # Σ w·x accumulated in place into the output column, left to right like
+        # _gate (same rounding; a dot/einsum could reorder or fuse the adds)
+        primary_s = np.multiply(trend, w_trend, out=aggregate_s)
+        term = np.empty_like(primary_s)
+        for w, x in ((w_mom, mom_raw), (w_mr, mr), (w_bo, bo_raw), (w_behavior, behavior_bias)):
+            primary_s += np.multiply(x, w, out=term)
+        primary_s *= scale
+
+        # ---- thresholds ----
+        buf = decision_buffer if np.isfinite(decision_buffer) else 0.0
+        base_buy_th = s_buy - max(buf, 0.0)
+        base_sell_th = s_sell - max(buf, 0.0)
+
+        vr_fallback = np.where(regime == REGIME_LOW, 0.85, np.where(regime == REGIME_HIGH, 1.15, 1.0))
+        vr = np.where(np.isfinite(vol_ratio), vol_ratio, vr_fallback)
+        vr_shift = np.maximum(-vr_adapt_clamp, np.minimum(vr_adapt_clamp, (vr - 1.0) * vr_adapt_k))
+        buy_th = base_buy_th - vr_shift
+        sell_th = base_sell_th - vr_shift
+
+        # ---- MTF veto ----
+        if require_mtf:
+            vetoed = ~np.isnan(confirm_s) & (
+                ((primary_s > 0.0) & (confirm_s < -veto_bar)) |
+                ((primary_s < 0.0) & (confirm_s > veto_bar))
+            )
+            mtf_ok = ~vetoed
+        else:
+            mtf_ok = np.ones(primary_s.shape[0], dtype=np.bool_)
+
+        low_vol_guard = np.isfinite(vr) & (vr < min_vr_trade)
+
+        entry = np.where((price >= 0.0) & (price < np.inf), price, 0.0)
+        atr_v = np.where((atr >= 0.0) & (atr < np.inf), atr, 0.0)
+
+        # ---- fast path, low-vol guard, thresholds (first match wins) ----
+        impulse = (
+            (np.abs(trend) >= 0.45) &
+            (np.abs(bo_raw) >= 0.35) &
+            (adx_val >= min_adx) &
+            mtf_ok
+        )
+        if impulse_only_high:
+            impulse &= regime == REGIME_HIGH
+        impulse &= entry > 0.0
+
+        action = np.select(
+            [
+                impulse & (trend > 0.0),
+                impulse,
+                low_vol_guard,
+                (primary_s >= buy_th) & mtf_ok,
+                (primary_s <= -sell_th) & mtf_ok,
+            ],
+            [ACTION_BUY, ACTION_SELL, ACTION_HOLD, ACTION_BUY, ACTION_SELL],
+            ACTION_HOLD,
+        )
+
+    # ---- stops (_build_stop_njit for the side taken) ----
+    long_stop, short_stop = _build_stops_numpy(entry, atr_v, atr_mult)
+    actions[:] = action
+    stops.fill(np.nan)
+    np.copyto(stops, long_stop, where=action == ACTION_BUY)
+    np.copyto(stops, short_stop, where=action == ACTION_SELL)
+    trend_out[:] = trend
+    mr_out[:] = mr
+
+
+def warmup_decision_kernels(parallel: bool = True) -> None:
+    """
+    Run the njit batch kernels once on a few synthetic rows with the argument
+    types decide_batch() passes (float64 columns, int64 regimes, int8 actions,
+    the pack_params vector), so a backtest's first call doesn't pay the
+    JIT compile / cache load. parallel=False skips the prange kernel.
+    No-op without numba.
+    """
+    if not NUMBA_AVAILABLE:
+        return
+    n = 4
+    col = np.linspace(-1.0, 1.0, n)
+    ones = np.ones(n)
+    regime = np.arange(n, dtype=np.int64) % N_REGIMES
+    params = pack_params(
+        20.0, 0.2, 0.2, 0.2, 0.2, 0.2,
+        0.2, 0.2, 0.02, 0.25, 0.08, 0.88,
+        True, 0.05, True, 2.0,
+    )
+    args = (
+        col, col, col, col, ones * 25.0, ones, ones * 100.0,
+        ones, regime, ones, col, col, params,
+    )
+    outs = (np.empty(n, dtype=np.int8), np.empty(n), np.empty(n), np.empty(n), np.empty(n))
+    _gate_decide_batch_serial(*args, *outs)
+    if parallel:
+        _gate_decide_batch(*args, *outs)
@@ -7,29 +7,64 @@ Uses UDF history endpoint: /v1/udf/history?symbol=...&resolution=...&from=...&to
 ================================================================================
 """
 
+import asyncio
 import time
 import threading
 import logging
-from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from datetime import datetime, timedelta, timezone
 
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger("smart_trader")
 
 class RateLimiter:
+    """
+    Spaces calls at least 1/rate apart. A caller reserves the next free slot
+    (monotonic ns) under a lock held only for that update and sleeps outside
+    it, so concurrent callers queue up without blocking each other's sleeps.
+    """
+
     def __init__(self, rate_per_sec: float):
         self.interval = 1.0 / max(rate_per_sec, 0.1)
+        self.interval_ns = int(self.interval * 1e9)
         self._lock = threading.Lock()
-        self._last = 0.0
+        self._next_allowed = 0  # time.monotonic_ns() of the next free slot
 
     def wait(self):
         with self._lock:
-            now = time.time()
-            delta = now - self._last
-            if delta < self.interval:
-                time.sleep(self.interval - delta)
-            self._last = time.time()
+            now = time.monotonic_ns()
+            slot = max(now, self._next_allowed)
+            self._next_allowed = slot + self.interval_ns
+        if slot > now:
+            time.sleep((slot - now) / 1e9)
+
+# Keep-alive pool for the Wallex host: enough connections for concurrent
+# symbol/TF fetches to each reuse a warm TCP/TLS connection. urllib3 retries
+# stay off; _request has its own retry/backoff loop.
+WALLEX_POOL_CONNECTIONS = 32
+WALLEX_POOL_MAXSIZE = 32
+# Requests get_candles_many keeps in flight at once (the RateLimiter still
+# spaces their starts)
+WALLEX_FETCH_CONCURRENCY = 16
+
+_fetch_pool: Optional[ThreadPoolExecutor] = None
+_fetch_pool_lock = threading.Lock()
+
+
+def _get_fetch_pool() -> ThreadPoolExecutor:
+    global _fetch_pool
+    if _fetch_pool is None:
+        with _fetch_pool_lock:
+            if _fetch_pool is None:
+                _fetch_pool = ThreadPoolExecutor(
+                    max_workers=WALLEX_FETCH_CONCURRENCY, thread_name_prefix="wallex-fetch"
+                )
+    return _fetch_pool
+
 
 def _tf_minutes(tf_str: str) -> int:
     # Accept strings like "1","5","60","240","D" etc. Map D to 1440 if needed.
@@ -38,6 +73,40 @@ def _tf_minutes(tf_str: str) -> int:
         return 1440
     return int(s)
 
+# UDF history arrays -> column (SoA) candle layout: "time" int64 unix seconds,
+# price/volume float64
+_UDF_COLUMNS = (("open", "o"), ("high", "h"), ("low", "l"), ("close", "c"), ("volume", "v"))
+
+
+def _float_column(values: list) -> np.ndarray:
+    # slow path for arrays np.asarray rejects (stray non-numeric entries → NaN)
+    out = np.empty(len(values), dtype=np.float64)
+    for i, x in enumerate(values):
+        try:
+            out[i] = float(x)
+        except (TypeError, ValueError):
+            out[i] = np.nan
+    return out
+
+
+def _as_float_column(values: list) -> np.ndarray:
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return _float_column(values)
+
+
+def soa_to_candles(soa: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """Column arrays -> [{time, open, high, low, close, volume}] for the JSON/legacy API."""
+    return [
+        {"time": t, "open": o, "high": h, "low": lo, "close": c, "volume": v}
+        for t, o, h, lo, c, v in zip(
+            soa["time"].tolist(), soa["open"].tolist(), soa["high"].tolist(),
+            soa["low"].tolist(), soa["close"].tolist(), soa["volume"].tolist(),
+        )
+    ]
+
+
 class WallexClient:
     def __init__(self, base_url: str, api_key: str, timeout: int, retries: int, rate_limit_per_sec: float):
         self.base_url = base_url.rstrip("/")
@@ -47,6 +116,14 @@ class WallexClient:
         self.rate_limiter = RateLimiter(rate_limit_per_sec)
 
         self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=WALLEX_POOL_CONNECTIONS,
+            pool_maxsize=WALLEX_POOL_MAXSIZE,
+            max_retries=0,
+        )
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._session.headers.update({"Accept-Encoding": "gzip", "Connection": "keep-alive"})
         # Wallex UDF endpoints generally don’t need auth, keep header optional
         if self.api_key:
             # Some endpoints may require a header; keep it harmless
@@ -85,6 +162,18 @@ class WallexClient:
         return int(start.timestamp()), int(now.timestamp())
 
     def get_candles(self, symbol: str, tf_min: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Last `limit` candles as [{time, open, high, low, close, volume}] (see get_candles_soa)."""
+        soa = self.get_candles_soa(symbol, tf_min, limit)
+        if soa is None:
+            return None
+        return soa_to_candles(soa)
+
+    def get_candles_soa(self, symbol: str, tf_min: str, limit: int) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Last `limit` candles as column arrays {time: int64, open..volume: float64}.
+        Bars with a missing / non-numeric / non-finite value are dropped (no
+        "v" array at all means volume 0.0). None on request/status failure.
+        """
         # Call UDF history endpoint
         from_ts, to_ts = self._compute_window(tf_min, limit)
         data = self._request(
@@ -99,35 +188,52 @@ class WallexClient:
         if data.get("s") not in ("ok", "no_data"):
             logger.warning(f"Unexpected UDF status: {data.get('s')}")
             return None
-        if data.get("s") == "no_data":
-            return []
-
-        t = data.get("t", [])
-        o = data.get("o", [])
-        h = data.get("h", [])
-        l = data.get("l", [])
-        c = data.get("c", [])
-        v = data.get("v", []) or [0.0] * len(t)
-
-        n = min(len(t), len(o), len(h), len(l), len(c), len(v))
-        if n == 0:
-            return []
+
+        t = data.get("t", []) if data.get("s") == "ok" else []
+        raw = {key: data.get(k, []) for key, k in _UDF_COLUMNS}
+        if not raw["volume"]:
+            raw["volume"] = [0.0] * len(t)
+
+        n = min(len(t), *(len(col) for col in raw.values()))
         # keep only last `limit`
-        start_idx = max(0, n - limit)
-        result = []
-        for i in range(start_idx, n):
-            try:
-                result.append({
-                    "time": int(t[i]),
-                    "open": float(o[i]),
-                    "high": float(h[i]),
-                    "low": float(l[i]),
-                    "close": float(c[i]),
-                    "volume": float(v[i]) if i < len(v) else 0.0,
-                })
-            except Exception:
-                continue
-        return result
+        sl = slice(max(0, n - limit), n)
+        time_f = _as_float_column(t[sl])
+        soa = {key: _as_float_column(col[sl]) for key, col in raw.items()}
+
+        ok = np.isfinite(time_f)
+        for col in soa.values():
+            ok &= np.isfinite(col)
+        if not ok.all():
+            time_f = time_f[ok]
+            soa = {key: col[ok] for key, col in soa.items()}
+        return {"time": time_f.astype(np.int64), **soa}
+
+    def get_candles_many(
+        self, specs: Iterable[Tuple[str, str, int]]
+    ) -> List[Optional[Dict[str, np.ndarray]]]:
+        """
+        get_candles_soa() for many (symbol, tf_min, limit) specs with up to
+        WALLEX_FETCH_CONCURRENCY requests in flight, so N symbols x M
+        timeframes cost about one round-trip per wave instead of N*M.
+        Results come back in spec order.
+        """
+        specs = list(specs)
+        if len(specs) <= 1:
+            return [self.get_candles_soa(*spec) for spec in specs]
+        pool = _get_fetch_pool()
+        futures = [pool.submit(self.get_candles_soa, *spec) for spec in specs]
+        return [fut.result() for fut in futures]
+
+    async def aget_candles_many(
+        self, specs: Iterable[Tuple[str, str, int]]
+    ) -> List[Optional[Dict[str, np.ndarray]]]:
+        """get_candles_many() for async callers (event loop is not blocked)."""
+        loop = asyncio.get_running_loop()
+        specs = list(specs)
+        futures = [
+            loop.run_in_executor(_get_fetch_pool(), self.get_candles_soa, *spec) for spec in specs
+        ]
+        return list(await asyncio.gather(*futures))
 
     def get_ticker(self, symbol: str) -> Dict[str, Any]:
         # If you have a proper ticker endpoint, implement here.
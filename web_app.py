@@ -9,22 +9,23 @@ SmartTrader Web API + Dashboard
 این ماژول فقط خوانش می‌کند؛ نوشتن در database_setup و main.py انجام می‌شود.
 """
 
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 import logging
-
-import sqlite3
+import time
 
 logger = logging.getLogger(__name__)
 from fastapi import FastAPI, Query, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse as _StdJSONResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
 from database_setup import (
     get_db_path,
     get_db_connection,
+    acquire,
     TABLE_NAME,            # trading_logs
     TRADE_EVENTS_TABLE,    # trade_events
     ACCOUNT_STATE_TABLE,   # account_state
@@ -45,6 +46,19 @@ from behavior_engine import compute_behavior_score
 
 BASE_DIR = Path(__file__).resolve().parent
 
+# JSON با orjson (encoder در C) اگر نصب باشد؛ شکل خروجی‌ها همان است
+try:
+    import orjson  # type: ignore
+
+    class JSONResponse(_StdJSONResponse):
+        """JSONResponse rendered by orjson (NaN/inf -> null instead of a 500)."""
+
+        def render(self, content: Any) -> bytes:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+except ImportError:  # pragma: no cover - orjson is optional
+    JSONResponse = _StdJSONResponse
+
 app = FastAPI(title="SmartTrader API", version="1.0")
 
 # ----------------------------------------------------------------------
@@ -102,14 +116,75 @@ async def insights_page() -> HTMLResponse:
 
 
 def query_db(sql: str, params: Dict[str, Any] | None = None) -> List[Dict[str, Any]]:
-    """اجرای یک کوئری read-only و برگرداندن لیست dict."""
-    conn = get_db_connection()
-    try:
-        cur = conn.execute(sql, params or {})
+    """اجرای یک کوئری read-only روی اتصال pool و برگرداندن لیست dict."""
+    with acquire() as conn:
+        if conn is None:
+            return []
+        # plain tuples + column names once, instead of sqlite3.Row -> dict per row
+        # (row_factory only on this cursor; the pooled connection keeps Row)
+        cur = conn.cursor()
+        cur.row_factory = None
+        cur.execute(sql, params or {})
         rows = cur.fetchall()
-        return [dict(r) for r in rows]
-    finally:
-        conn.close()
+        if not rows:
+            return []
+        cols = tuple(d[0] for d in cur.description)
+        return [dict(zip(cols, r)) for r in rows]
+
+
+# Rows per fetchmany() round-trip for iter_db
+DB_FETCH_ARRAYSIZE = 256
+
+
+def iter_db(sql: str, params: Dict[str, Any] | None = None, arraysize: int = DB_FETCH_ARRAYSIZE) -> Iterator[Dict[str, Any]]:
+    """
+    query_db() as a generator: rows are fetched arraysize at a time, so a
+    caller that only reduces them (sums, counts, latest) never holds the
+    whole result. The pooled connection is held until the generator is
+    exhausted or closed.
+    """
+    with acquire() as conn:
+        if conn is None:
+            return
+        cur = conn.cursor()
+        cur.row_factory = None
+        cur.arraysize = arraysize
+        cur.execute(sql, params or {})
+        cols = tuple(d[0] for d in cur.description)
+        while True:
+            chunk = cur.fetchmany()
+            if not chunk:
+                return
+            for r in chunk:
+                yield dict(zip(cols, r))
+
+
+# ----------------------------------------------------------------------
+# Helper: short TTL cache for the endpoints the pages poll
+# ----------------------------------------------------------------------
+
+# Seconds a payload is served from memory (data changes at most once per bar)
+PRICES_CACHE_TTL = 2.0
+DECISIONS_CACHE_TTL = 2.0
+BTC_PRICE_CACHE_TTL = 5.0
+PERF_SUMMARY_CACHE_TTL = 30.0
+PERF_DAILY_CACHE_TTL = 60.0
+API_CACHE_MAX = 256
+
+# (endpoint, args...) -> (expires_at monotonic, payload); payloads are never mutated
+_api_cache: Dict[Tuple[Any, ...], Tuple[float, Any]] = {}
+
+
+def _cached(key: Tuple[Any, ...], ttl: float, build: Callable[[], Any]) -> Any:
+    now = time.monotonic()
+    hit = _api_cache.get(key)
+    if hit is not None and hit[0] > now:
+        return hit[1]
+    payload = build()
+    if len(_api_cache) >= API_CACHE_MAX:
+        _api_cache.pop(next(iter(_api_cache)), None)
+    _api_cache[key] = (now + ttl, payload)
+    return payload
 
 
 def _normalize_ts(ts: Any) -> Any:
@@ -140,11 +215,11 @@ async def health() -> JSONResponse:
     # Optimized: Return {"status":"ok"} immediately for deployment health checks
     try:
         db_path = str(get_db_path())
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-        cur = conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = [r["name"] for r in cur.fetchall()]
-        conn.close()
+        with acquire() as conn:
+            if conn is None:
+                raise RuntimeError("DB connection failed")
+            cur = conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
+            tables = [r["name"] for r in cur.fetchall()]
         return JSONResponse({"status": "ok", "db_path": db_path, "tables": tables})
     except Exception as e:
         # Still return ok status to avoid deployment failures
@@ -163,6 +238,10 @@ async def api_prices(
     آخرین n کندل / قیمت برای نمودار قیمت.
     از جدول trading_logs می‌خوانیم.
     """
+    return JSONResponse(_cached(("prices", limit), PRICES_CACHE_TTL, lambda: _load_prices(limit)))
+
+
+def _load_prices(limit: int) -> List[Dict[str, Any]]:
     rows = query_db(
         f"""
         SELECT
@@ -185,8 +264,8 @@ async def api_prices(
         r["timestamp"] = _normalize_ts(r.get("timestamp"))
 
     # برای نمودار، به ترتیب زمانی (قدیمی → جدید)
-    rows = list(reversed(rows))
-    return JSONResponse(rows)
+    rows.reverse()
+    return rows
 
 # ----------------------------------------------------------------------
 # Decisions (signals list + markers)
@@ -200,6 +279,12 @@ async def api_decisions(
     آخرین تصمیم‌های معاملاتی از trading_logs.
     فرانت انتظار دارد فیلدهایی مثل decision, price, regime, aggregate_s و ...
     """
+    return JSONResponse(
+        _cached(("decisions", limit), DECISIONS_CACHE_TTL, lambda: _load_decisions(limit))
+    )
+
+
+def _load_decisions(limit: int) -> List[Dict[str, Any]]:
     rows = query_db(
         f"""
         SELECT
@@ -233,9 +318,8 @@ async def api_decisions(
         r["timestamp"] = _normalize_ts(r.get("timestamp"))
 
     # برای هماهنگی با home.js: آرایه به صورت قدیم → جدید
-    rows = list(reversed(rows))
-
-    return JSONResponse(rows)
+    rows.reverse()
+    return rows
 
 # ----------------------------------------------------------------------
 # BTC last price + history (for sparkline)
@@ -247,6 +331,10 @@ async def api_btc_price() -> JSONResponse:
     Latest BTC/USDT price from trading_logs + short history.
     برای باکس "قیمت لحظه‌ای" و اسپارکلاین در home.js.
     """
+    return JSONResponse(_cached(("btc_price",), BTC_PRICE_CACHE_TTL, _load_btc_price))
+
+
+def _load_btc_price() -> Dict[str, Any]:
     # 60 رکورد آخر برای history
     rows = query_db(
         f"""
@@ -259,9 +347,7 @@ async def api_btc_price() -> JSONResponse:
     )
 
     if not rows:
-        return JSONResponse(
-            {"price": None, "price_usdt": None, "timestamp": None, "history": []}
-        )
+        return {"price": None, "price_usdt": None, "timestamp": None, "history": []}
 
     # نرمال‌سازی و برعکس کردن برای قدیم → جدید
     for r in rows:
@@ -270,14 +356,12 @@ async def api_btc_price() -> JSONResponse:
     history = list(reversed(rows))
     last = history[-1]
 
-    return JSONResponse(
-        {
-            "price": last["price"],
-            "price_usdt": last["price"],  # Price in USDT/USD
-            "timestamp": last["timestamp"],
-            "history": history,
-        }
-    )
+    return {
+        "price": last["price"],
+        "price_usdt": last["price"],  # Price in USDT/USD
+        "timestamp": last["timestamp"],
+        "history": history,
+    }
 
 # ----------------------------------------------------------------------
 # Trades (recent closed trades)
@@ -340,10 +424,13 @@ async def api_perf_summary() -> JSONResponse:
          - PnL را تقریبی از account_state (equity آخر - equity اول) حساب می‌کنیم
          تا داشبورد خالی نماند.
     """
-    db_path = str(get_db_path())
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    try:
+    return JSONResponse(_cached(("perf_summary",), PERF_SUMMARY_CACHE_TTL, _load_perf_summary))
+
+
+def _load_perf_summary() -> Dict[str, Any]:
+    with acquire() as conn:
+        if conn is None:
+            raise HTTPException(status_code=500, detail="Database connection failed")
         # مرحله ۱: فقط تریدهای بسته‌شده
         row = conn.execute(
             f"""
@@ -406,18 +493,13 @@ async def api_perf_summary() -> JSONResponse:
         if total_trades > 0:
             winrate = round(100.0 * wins / float(total_trades), 2)
 
-        return JSONResponse(
-            {
-                "total_trades": int(total_trades),
-                "wins": int(wins),
-                "losses": int(losses),
-                "winrate": winrate,
-                "total_pnl": total_pnl,
-            }
-        )
-
-    finally:
-        conn.close()
+        return {
+            "total_trades": int(total_trades),
+            "wins": int(wins),
+            "losses": int(losses),
+            "winrate": winrate,
+            "total_pnl": total_pnl,
+        }
 
 # ----------------------------------------------------------------------
 # Perf: Daily PnL
@@ -432,6 +514,12 @@ async def api_perf_daily(
     برای نمودار/لیست PnL روزانه در داشبورد.
     فرانت انتظار دارد: day, day_pnl, n_trades
     """
+    return JSONResponse(
+        _cached(("perf_daily", limit), PERF_DAILY_CACHE_TTL, lambda: _load_perf_daily(limit))
+    )
+
+
+def _load_perf_daily(limit: int) -> List[Dict[str, Any]]:
     rows = query_db(
         f"""
         SELECT
@@ -451,8 +539,7 @@ async def api_perf_daily(
     rows = list(reversed(rows))
     for r in rows:
         r["day_pnl"] = r.get("pnl", 0.0)
-
-    return JSONResponse(rows)
+    return rows
 
 # =====================================================================
 # SaaS: Auth Endpoints
@@ -744,6 +831,50 @@ async def api_admin_set_plan(
 # Command Center: Full Bot Brain Visualization
 # =====================================================================
 
+# Regime multipliers applied to the normalized base weights
+_REGIME_WEIGHT_ADJUST: Dict[str, Dict[str, float]] = {
+    "LOW": {"meanrev": 1.4, "trend": 0.7, "breakout": 0.8},
+    "HIGH": {"breakout": 1.3, "behavior": 1.2, "meanrev": 0.6, "trend": 1.1},
+}
+_WEIGHT_KEYS = ("trend", "momentum", "meanrev", "breakout", "behavior")
+
+
+@lru_cache(maxsize=8)
+def _dynamic_weights_cached(
+    base_weights: Tuple[Tuple[str, float], ...], regime: Optional[str]
+) -> Tuple[float, ...]:
+    """
+    Normalized weights (in _WEIGHT_KEYS order) for a base weight set and
+    regime. Keyed by the weights themselves, so a changed STRATEGY["weights"]
+    is a new entry rather than a stale hit; the tuple result can't be mutated.
+    """
+    # Normalize base weights
+    total = sum(v for _, v in base_weights)
+    if total > 0:
+        normalized = {k: v / total for k, v in base_weights}
+    else:
+        normalized = dict(base_weights)
+
+    # Apply regime-specific adjustments
+    for k, mult in _REGIME_WEIGHT_ADJUST.get(regime, {}).items():
+        normalized[k] *= mult
+
+    # Renormalize after adjustments
+    total = sum(normalized.values())
+    if total > 0:
+        normalized = {k: v / total for k, v in normalized.items()}
+
+    return tuple(float(normalized.get(k, 0.0)) for k in _WEIGHT_KEYS)
+
+
+def _dynamic_weights(regime: Optional[str]) -> Dict[str, float]:
+    from config import STRATEGY
+
+    # insertion order kept: the sums above must add in the same order
+    weights = _dynamic_weights_cached(tuple(STRATEGY["weights"].items()), regime)
+    return dict(zip(_WEIGHT_KEYS, weights))
+
+
 @app.get("/api/insights/command-center")
 async def api_command_center() -> JSONResponse:
     """
@@ -822,32 +953,9 @@ async def api_command_center() -> JSONResponse:
             "rvol": rvol,
         }
     
-    # Calculate dynamic weights based on regime (same logic as trading_logic.py)
+    # Dynamic weights based on regime (cached per regime)
     regime = latest.get("regime", "NEUTRAL")
-    base_weights = STRATEGY["weights"].copy()
-    
-    # Normalize base weights
-    total = sum(base_weights.values())
-    if total > 0:
-        normalized = {k: v / total for k, v in base_weights.items()}
-    else:
-        normalized = base_weights
-    
-    # Apply regime-specific adjustments
-    if regime == "LOW":
-        normalized["meanrev"] *= 1.4
-        normalized["trend"] *= 0.7
-        normalized["breakout"] *= 0.8
-    elif regime == "HIGH":
-        normalized["breakout"] *= 1.3
-        normalized["behavior"] *= 1.2
-        normalized["meanrev"] *= 0.6
-        normalized["trend"] *= 1.1
-    
-    # Renormalize after adjustments
-    total = sum(normalized.values())
-    if total > 0:
-        normalized = {k: v / total for k, v in normalized.items()}
+    dynamic_weights = _dynamic_weights(regime)
     
     # Get regime_scale
     regime_scale = STRATEGY["regime_scale"].get(regime, 1.0)
@@ -879,6 +987,9 @@ async def api_command_center() -> JSONResponse:
     # Process price history with VSA markers
     candles_with_vsa = []
     rvol_data = []
+    # whale_bias per timestamp, filled in the same pass (each behavior_json is parsed once);
+    # with duplicate timestamps the newest row wins, as the old per-candle lookup did
+    whale_bias_by_ts: Dict[Any, Optional[float]] = {}
     
     for candle in reversed(price_history):  # Oldest to newest
         candle_vsa = {
@@ -894,11 +1005,13 @@ async def api_command_center() -> JSONResponse:
         
         # Parse behavior_json for this candle
         candle_behavior_json = candle.get("behavior_json")
+        whale_bias_by_ts[candle_vsa["timestamp"]] = None
         if candle_behavior_json:
             try:
                 candle_behavior = json.loads(candle_behavior_json) if isinstance(candle_behavior_json, str) else candle_behavior_json
                 candle_vsa["vsa_signal"] = candle_behavior.get("vsa_signal", "NORMAL")
                 candle_whale_bias = float(candle_behavior.get("whale_bias", 0.0))
+                whale_bias_by_ts[candle_vsa["timestamp"]] = candle_whale_bias
                 
                 # Mark whale footprints (Absorption or Effort vs Result)
                 if candle_vsa["vsa_signal"] == "ABSORPTION":
@@ -923,23 +1036,12 @@ async def api_command_center() -> JSONResponse:
     # Get whale_bias history from price_history for flow chart
     whale_bias_history = []
     for candle in candles_with_vsa:
-        candle_behavior_json = None
-        # Find matching candle in price_history
-        for ph_candle in price_history:
-            if _normalize_ts(ph_candle.get("timestamp")) == candle["timestamp"]:
-                candle_behavior_json = ph_candle.get("behavior_json")
-                break
-        
-        if candle_behavior_json:
-            try:
-                candle_behavior = json.loads(candle_behavior_json) if isinstance(candle_behavior_json, str) else candle_behavior_json
-                candle_wb = float(candle_behavior.get("whale_bias", 0.0))
-                whale_bias_history.append({
-                    "timestamp": candle["timestamp"],
-                    "whale_bias": candle_wb,
-                })
-            except Exception:
-                pass
+        candle_wb = whale_bias_by_ts.get(candle["timestamp"])
+        if candle_wb is not None:
+            whale_bias_history.append({
+                "timestamp": candle["timestamp"],
+                "whale_bias": candle_wb,
+            })
     
     # Calculate confluence_factors (raw values for radar chart)
     confluence_factors = {
@@ -973,13 +1075,7 @@ async def api_command_center() -> JSONResponse:
         "rvol": rvol,
         "current_regime": regime,
         "regime_scale": regime_scale,
-        "dynamic_weights": {
-            "trend": float(normalized.get("trend", 0.0)),
-            "momentum": float(normalized.get("momentum", 0.0)),
-            "meanrev": float(normalized.get("meanrev", 0.0)),
-            "breakout": float(normalized.get("breakout", 0.0)),
-            "behavior": float(normalized.get("behavior", 0.0)),
-        },
+        "dynamic_weights": dynamic_weights,
         "confluence_factors": confluence_factors,
         "volatility_ratio": vr_estimate,
         "min_vr_trade": min_vr_trade,
@@ -997,30 +1093,38 @@ async def api_command_center() -> JSONResponse:
 # =====================================================================
 
 
-@app.get("/api/intelligence/summary")
-async def api_intelligence_summary() -> JSONResponse:
-    """
-    Aggregate ADX, ATR, and Regime data from last 100 trading_logs records.
-    Returns market DNA summary for intelligence dashboard.
-    """
-    rows = query_db(
+def _load_intelligence_summary() -> Dict[str, Any]:
+    # one streaming pass over the last 100 rows (newest first): sums, counts, latest
+    adx_sum = atr_sum = 0
+    adx_n = atr_n = 0
+    regime_counts: Dict[Any, int] = {}
+    latest = None
+    for r in iter_db(
         f"""
         SELECT
             adx,
             atr,
             regime,
-            aggregate_s,
-            decision,
-            timestamp
+            decision
         FROM {TABLE_NAME}
         WHERE adx IS NOT NULL AND atr IS NOT NULL
         ORDER BY timestamp DESC
         LIMIT 100
         """
-    )
+    ):
+        if latest is None:
+            latest = r
+        if r["adx"]:
+            adx_sum += float(r["adx"])
+            adx_n += 1
+        if r["atr"]:
+            atr_sum += float(r["atr"])
+            atr_n += 1
+        regime = r["regime"]
+        regime_counts[regime] = regime_counts.get(regime, 0) + 1
 
-    if not rows:
-        return JSONResponse({
+    if latest is None:
+        return {
             "adx_avg": 0.0,
             "adx_latest": 0.0,
             "atr_avg": 0.0,
@@ -1028,40 +1132,38 @@ async def api_intelligence_summary() -> JSONResponse:
             "regime_distribution": {},
             "trend_strength": 0.0,
             "volatility_shift": 0.0,
-        })
-
-    # Calculate averages and latest
-    adx_values = [float(r.get("adx", 0)) for r in rows if r.get("adx")]
-    atr_values = [float(r.get("atr", 0)) for r in rows if r.get("atr")]
+        }
 
-    latest = rows[0] if rows else {}
-    adx_latest = float(latest.get("adx", 0))
-    atr_latest = float(latest.get("atr", 0))
-
-    # Regime distribution
-    regime_counts = {}
-    for r in rows:
-        regime = r.get("regime", "NEUTRAL")
-        regime_counts[regime] = regime_counts.get(regime, 0) + 1
+    adx_latest = float(latest["adx"])
+    atr_latest = float(latest["atr"])
 
     # Volatility shift: compare latest ATR to average
-    atr_avg = sum(atr_values) / len(atr_values) if atr_values else 0.0
+    atr_avg = atr_sum / atr_n if atr_n else 0.0
     volatility_shift = ((atr_latest / atr_avg) - 1.0) * 100 if atr_avg > 0 else 0.0
 
     # Trend strength: ADX normalized (0-100 scale, assuming max ADX ~50)
     trend_strength = min(100.0, (adx_latest / 50.0) * 100) if adx_latest else 0.0
 
-    return JSONResponse({
-        "adx_avg": sum(adx_values) / len(adx_values) if adx_values else 0.0,
+    return {
+        "adx_avg": adx_sum / adx_n if adx_n else 0.0,
         "adx_latest": adx_latest,
         "atr_avg": atr_avg,
         "atr_latest": atr_latest,
         "regime_distribution": regime_counts,
         "trend_strength": trend_strength,
         "volatility_shift": volatility_shift,
-        "latest_regime": latest.get("regime", "NEUTRAL"),
-        "latest_decision": latest.get("decision", "HOLD"),
-    })
+        "latest_regime": latest["regime"],
+        "latest_decision": latest["decision"],
+    }
+
+
+@app.get("/api/intelligence/summary")
+async def api_intelligence_summary() -> JSONResponse:
+    """
+    Aggregate ADX, ATR, and Regime data from last 100 trading_logs records.
+    Returns market DNA summary for intelligence dashboard.
+    """
+    return JSONResponse(_load_intelligence_summary())
 
 
 # =====================================================================
@@ -1075,62 +1177,4 @@ async def api_intelligence_summary() -> JSONResponse:
     Aggregate ADX, ATR, and Regime data from last 100 trading_logs records.
     Returns market DNA summary for intelligence dashboard.
     """
-    rows = query_db(
-        f"""
-        SELECT
-            adx,
-            atr,
-            regime,
-            aggregate_s,
-            decision,
-            timestamp
-        FROM {TABLE_NAME}
-        WHERE adx IS NOT NULL AND atr IS NOT NULL
-        ORDER BY timestamp DESC
-        LIMIT 100
-        """
-    )
-
-    if not rows:
-        return JSONResponse({
-            "adx_avg": 0.0,
-            "adx_latest": 0.0,
-            "atr_avg": 0.0,
-            "atr_latest": 0.0,
-            "regime_distribution": {},
-            "trend_strength": 0.0,
-            "volatility_shift": 0.0,
-        })
-
-    # Calculate averages and latest
-    adx_values = [float(r.get("adx", 0)) for r in rows if r.get("adx")]
-    atr_values = [float(r.get("atr", 0)) for r in rows if r.get("atr")]
-
-    latest = rows[0] if rows else {}
-    adx_latest = float(latest.get("adx", 0))
-    atr_latest = float(latest.get("atr", 0))
-
-    # Regime distribution
-    regime_counts = {}
-    for r in rows:
-        regime = r.get("regime", "NEUTRAL")
-        regime_counts[regime] = regime_counts.get(regime, 0) + 1
-
-    # Volatility shift: compare latest ATR to average
-    atr_avg = sum(atr_values) / len(atr_values) if atr_values else 0.0
-    volatility_shift = ((atr_latest / atr_avg) - 1.0) * 100 if atr_avg > 0 else 0.0
-
-    # Trend strength: ADX normalized (0-100 scale, assuming max ADX ~50)
-    trend_strength = min(100.0, (adx_latest / 50.0) * 100) if adx_latest else 0.0
-
-    return JSONResponse({
-        "adx_avg": sum(adx_values) / len(adx_values) if adx_values else 0.0,
-        "adx_latest": adx_latest,
-        "atr_avg": atr_avg,
-        "atr_latest": atr_latest,
-        "regime_distribution": regime_counts,
-        "trend_strength": trend_strength,
-        "volatility_shift": volatility_shift,
-        "latest_regime": latest.get("regime", "NEUTRAL"),
-        "latest_decision": latest.get("decision", "HOLD"),
-    })
+    return JSONResponse(_load_intelligence_summary())